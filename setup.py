@@ -7,7 +7,7 @@ setup(name='shuup_public_api',
       author='unu GmbH',
       author_email='jonatan@unumotors.com',
       url='https://github.com/unumotors/shuup_public_api/',
-      packages=find_packages(),
+      packages=find_packages(exclude=['shuup_public_api_tests', 'shuup_public_api_tests.*']),
       install_requires=(
           'djangorestframework==3.5.3',
           'drf-extensions==0.3.1',
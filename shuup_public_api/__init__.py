@@ -18,4 +18,80 @@ class ShuupGuestApiAppConfig(AppConfig):
         'shuup.api',
     )
 
+    def ready(self):
+        from django.apps import apps
+        from django.db.models.signals import m2m_changed
+        from shuup.core.models import (
+            Category, PaymentMethod, Product, ProductAttribute, ProductMedia,
+            ProductPackageLink, ShippingMethod, Shop, ShopProduct, Supplier, Tax, TaxClass
+        )
+        from shuup.default_tax.models import TaxRule
+        from shuup_public_api.signal_handlers import (
+            bump_catalog_version, bump_product_version, bump_stock_version, connect_change_signals,
+            index_product_search_words, invalidate_product_search_index, invalidate_shop_cache,
+            invalidate_tax_class_cache, record_shop_product_change
+        )
+
+        connect_change_signals(invalidate_shop_cache, [Shop])
+        connect_change_signals(invalidate_product_search_index, [Product])
+        connect_change_signals(index_product_search_words, [Product])
+
+        # Invalidate rendered tax classes and cached tax groups
+        tax_models = [TaxClass, Tax, TaxRule]
+        connect_change_signals(invalidate_tax_class_cache, tax_models)
+        m2m_changed.connect(
+            invalidate_tax_class_cache,
+            sender=TaxRule.tax_classes.through,
+            dispatch_uid='shuup_public_api:invalidate_tax_class_cache_on_tax_rule_m2m_change'
+        )
+        m2m_changed.connect(
+            invalidate_tax_class_cache,
+            sender=TaxRule.customer_tax_groups.through,
+            dispatch_uid='shuup_public_api:invalidate_tax_class_cache_on_tax_rule_customer_tax_groups_change'
+        )
+
+        # Bump catalog versions used for the ETags
+        catalog_models = [
+            Product, ShopProduct, ProductMedia, ProductAttribute, ProductPackageLink,
+            Category, PaymentMethod, ShippingMethod
+        ] + tax_models
+        if apps.is_installed('shuup.campaigns'):
+            from shuup.campaigns.models import BasketCampaign, CatalogCampaign
+            catalog_models += [BasketCampaign, CatalogCampaign]
+        if apps.is_installed('shuup.customer_group_pricing'):
+            from shuup.customer_group_pricing.models import CgpPrice
+            catalog_models.append(CgpPrice)
+        connect_change_signals(bump_catalog_version, catalog_models)
+        m2m_changed.connect(
+            bump_catalog_version,
+            sender=TaxRule.tax_classes.through,
+            dispatch_uid='shuup_public_api:bump_catalog_version_on_tax_rule_m2m_change'
+        )
+
+        # Bump product versions used for the cached product representations.
+        # Tax changes have no single product so they bump all of them.
+        connect_change_signals(bump_product_version, [
+            Product, ShopProduct, ProductMedia, ProductAttribute, ProductPackageLink
+        ] + tax_models)
+        m2m_changed.connect(
+            bump_product_version,
+            sender=ProductMedia.shops.through,
+            dispatch_uid='shuup_public_api:bump_product_version_on_product_media_m2m_change'
+        )
+        m2m_changed.connect(
+            bump_product_version,
+            sender=TaxRule.tax_classes.through,
+            dispatch_uid='shuup_public_api:bump_product_version_on_tax_rule_m2m_change'
+        )
+
+        # Bump stock versions used for the basket ETags
+        stock_models = [Supplier]
+        if apps.is_installed('shuup.simple_supplier'):
+            from shuup.simple_supplier.models import StockCount
+            stock_models.append(StockCount)
+        connect_change_signals(bump_stock_version, stock_models)
+
+        # Record shop product changes and deletions for the product export
+        connect_change_signals(record_shop_product_change, [Product, ShopProduct])
+
 default_app_config = 'shuup_public_api.ShuupGuestApiAppConfig'
@@ -2,13 +2,27 @@ from rest_framework.relations import PrimaryKeyRelatedField
 from shuup.core.api.orders import AddressSerializer
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
-from shuup.core.models import Product, OrderLineType, Shop, PaymentMethod
-from shuup.core.pricing import PricingContext
+from shuup.core.models import Product, Shop, PaymentMethod, ShippingMethod
 
+from ...metrics import TimedSerializerMixin
 from ..tax import ExtendedTaxClassSerializer
-from ..product import PublicProductSerializer
+from ..product import PublicProductSerializer, get_product_fragments, prefetch_package_links
 
 
+class APIBasketLineListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        lines = list(data)
+        products = [line.product for line in lines if line.product]
+        product_serializer = self.child.fields['product']
+
+        def render(missing_products):
+            prefetch_package_links(missing_products)
+            return dict((product.pk, product_serializer.render(product)) for product in missing_products)
+
+        fragments = get_product_fragments(products, self.context.get('request'), render)
+        for product in products:
+            product._public_api_fragment = fragments[product.pk]
+        return super(APIBasketLineListSerializer, self).to_representation(lines)
 
 
 class APIBasketLineSerializer(serializers.Serializer):
@@ -28,6 +42,9 @@ class APIBasketLineSerializer(serializers.Serializer):
     def get_text(obj):
         return obj.product.safe_translation_getter("name", any_language=True)
 
+    class Meta:
+        list_serializer_class = APIBasketLineListSerializer
+
 
 class APIBasketDiscountSerializer(serializers.Serializer):
     discount_amount = serializers.DecimalField(decimal_places=2, max_digits=500)
@@ -47,28 +64,27 @@ class DestroyAPIBasketLineSerializer(serializers.Serializer):
     pass
 
 
-class APIBasketSerializer(serializers.Serializer):
+class APIBasketSerializer(TimedSerializerMixin, serializers.Serializer):
     lines = SerializerMethodField()
     key = serializers.CharField()
     product_count = serializers.IntegerField()
-    taxless_total_price = serializers.DecimalField(decimal_places=2, max_digits=500)
-    taxful_total_price = serializers.DecimalField(decimal_places=2, max_digits=500)
-    taxful_total_discount = serializers.DecimalField(decimal_places=2, max_digits=500)
+    taxless_total_price = serializers.DecimalField(
+        decimal_places=2, max_digits=500, source='pricing.taxless_total_price')
+    taxful_total_price = serializers.DecimalField(
+        decimal_places=2, max_digits=500, source='pricing.taxful_total_price')
+    taxful_total_discount = serializers.DecimalField(
+        decimal_places=2, max_digits=500, source='pricing.taxful_total_discount')
     currency = serializers.CharField()
     shop = serializers.PrimaryKeyRelatedField(queryset=Shop.objects.all())
     basket_name = serializers.CharField()
     discounts = serializers.SerializerMethodField()
 
     def get_lines(self, basket):
-        for line in basket.get_lines():
-            line.cache_info(PricingContext(basket.shop, basket.customer))
-            serializer = APIBasketLineSerializer(line, context={'request': self.context['request']})
-            yield serializer.data
+        return APIBasketLineSerializer(
+            basket.get_priced_lines(), many=True, context={'request': self.context['request']}).data
 
     def get_discounts(self, basket):
-        for line in basket.get_final_lines():
-            if line.type == OrderLineType.DISCOUNT:
-                yield APIBasketDiscountSerializer(line).data
+        return APIBasketDiscountSerializer(basket.pricing.discounts, many=True).data
 
 
 class CreateAPIBasketSerializer(serializers.Serializer):
@@ -81,6 +97,6 @@ class CouponAPIBasketSerializer(serializers.Serializer):
 
 class CheckoutSerializer(serializers.Serializer):
     payment_method = PrimaryKeyRelatedField(queryset=PaymentMethod.objects.all())
-    shipping_method = PrimaryKeyRelatedField(queryset=PaymentMethod.objects.all())
+    shipping_method = PrimaryKeyRelatedField(queryset=ShippingMethod.objects.all())
     shipping_address = AddressSerializer()
     billing_address = AddressSerializer()
@@ -1,7 +1,6 @@
 import uuid
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.http.response import Http404
 from django.utils.translation import ugettext as _
 from rest_framework.decorators import detail_route
 from rest_framework.exceptions import ValidationError
@@ -20,11 +19,15 @@ from . import APIBasketSerializer, APIBasketLineSerializer, \
     DestroyAPIBasketLineSerializer, CouponAPIBasketSerializer, \
     CreateAPIBasketSerializer, CheckoutSerializer
 
-from ..mixins import ShopAPIViewSetMixin, BasketAPIViewSetMixin
-from ...common.basket import APIBasket
+from ..conditional import ConditionalGetViewSetMixin, make_etag
+from ..mixins import ShopAPIViewSetMixin, BasketAPIViewSetMixin, BasketConflict, get_active_basket, \
+    save_basket_mutation
+from ...common.basket import APIBasket, BasketRevisionConflict
+from ...common.transaction import get_checkout_order, lock_stored_basket, record_checkout, run_atomic_with_retry
+from ...common.versions import get_catalog_version, get_stock_versions
 
 
-class APIBasketViewSet(GenericViewSet, ShopAPIViewSetMixin):
+class APIBasketViewSet(ConditionalGetViewSetMixin, GenericViewSet, ShopAPIViewSetMixin):
     lookup_field = 'key'
     permission_classes = [AllowAny]
 
@@ -38,17 +41,18 @@ class APIBasketViewSet(GenericViewSet, ShopAPIViewSetMixin):
         }[self.action]
 
     def get_basket(self, *args, **kwargs):
-        basket = APIBasket(self.kwargs['key'], self.get_shop())
-        if not basket.is_stored or not basket.is_active:
-            raise Http404
-        try:
-            basket.storage.load(basket)
-        except ShopMismatchBasketCompatibilityError:
-            raise ValidationError({
-                'error': _('The requested belongs to another shop'),
-                'code': 'shop_mismatch'
-            }, 'shop_mismatch')
-        return basket
+        if getattr(self, '_basket', None) is None:
+            self._basket = get_active_basket(self.kwargs['key'], self.get_shop())
+        return self._basket
+
+    def get_etag(self):
+        if self.action == 'retrieve':
+            basket = self.get_basket()
+            # Stock changes make lines orderable or not without a new catalog version
+            stock_versions = get_stock_versions(set(line.get('product_id') for line in basket._data_lines))
+            return make_etag(
+                'basket', basket.key, basket.revision, get_catalog_version(basket.shop.pk),
+                sorted(stock_versions.items()))
 
     def retrieve(self, request, *args, **kwargs):
         basket = self.get_basket()
@@ -65,34 +69,58 @@ class APIBasketViewSet(GenericViewSet, ShopAPIViewSetMixin):
         basket = self.get_basket()
         serializer = self.get_serializer_class()(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            result = handle_add_campaign_code(request, basket, serializer.validated_data['code'])
-            if not result['ok']:
-                raise ValidationError({
-                    'error': _('The entered code couldn\'t be applied to the basket'),
-                    'code': 'invalid_code'
-                }, 'invalid_code')
-            basket.save()
-            new_basket = self.get_basket()
-            return Response(APIBasketSerializer(new_basket, context={'request': request}).data)
+            def add_code(basket):
+                result = handle_add_campaign_code(request, basket, serializer.validated_data['code'])
+                if not result['ok']:
+                    raise ValidationError({
+                        'error': _('The entered code couldn\'t be applied to the basket'),
+                        'code': 'invalid_code'
+                    }, 'invalid_code')
+
+            basket = save_basket_mutation(basket, add_code)
+            return Response(APIBasketSerializer(basket, context={'request': request}).data)
 
     @detail_route(methods=['post'])
     def remove_discount(self, request, *args, **kwargs):
         basket = self.get_basket()
         serializer = self.get_serializer_class()(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            basket.remove_code(serializer.validated_data['code'])
-            basket.save()
-            new_basket = self.get_basket()
-            return Response(APIBasketSerializer(new_basket, context={'request': request}).data)
+            basket = save_basket_mutation(
+                basket, lambda basket: basket.remove_code(serializer.validated_data['code']))
+            return Response(APIBasketSerializer(basket, context={'request': request}).data)
 
     @detail_route(methods=['post'])
     def checkout(self, request, *args, **kwargs):
+        """
+        Create an order out of the basket.
+
+        The checkout runs in a transaction holding the lock of the stored
+        basket and is retried on lock failures. Retries of a checkout with
+        the same ``Idempotency-Key`` header return the order created first.
+        """
         serializer = CheckoutSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        idempotency_key = request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if idempotency_key:
+            order = get_checkout_order(self.kwargs['key'], idempotency_key)
+            if order:
+                return Response(OrderSerializer(order).data)
+        order = run_atomic_with_retry(self._checkout, serializer.validated_data, idempotency_key)
+        return Response(OrderSerializer(order).data)
+
+    def _checkout(self, data, idempotency_key):
+        lock_stored_basket(self.kwargs['key'])
+        if idempotency_key:
+            # A concurrent checkout with the same key may have held the lock
+            order = get_checkout_order(self.kwargs['key'], idempotency_key)
+            if order:
+                return order
+        # Load the basket under the lock, also when the transaction is retried
+        self._basket = None
         basket = self.get_basket()
         basket.verify_orderability()
-        basket.shipping_method = serializer.validated_data['shipping_method']
-        basket.payment_method = serializer.validated_data['payment_method']
+        basket.shipping_method = data['shipping_method']
+        basket.payment_method = data['payment_method']
         if basket.product_count < 1:
             raise ValidationError({
                 'code': 'empty_basket',
@@ -101,10 +129,14 @@ class APIBasketViewSet(GenericViewSet, ShopAPIViewSetMixin):
         basket.status = OrderStatus.objects.get_default_initial()
         order_creator = get_basket_order_creator()
         order = order_creator.create_order(basket)
+        if idempotency_key:
+            record_checkout(basket.key, idempotency_key, order)
         basket.finalize()
-        basket.save()
-
-        return Response(OrderSerializer(order).data)
+        try:
+            basket.save()
+        except BasketRevisionConflict:
+            raise BasketConflict()
+        return order
 
 
 class APIBasketLineViewSet(GenericViewSet, ShopAPIViewSetMixin, BasketAPIViewSetMixin):
@@ -126,30 +158,28 @@ class APIBasketLineViewSet(GenericViewSet, ShopAPIViewSetMixin, BasketAPIViewSet
         return request
 
     def create(self, request, *args, **kwargs):
-        basket = self.get_basket()
+        basket = self.request.basket
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
             product = serializer.validated_data['product']
             product.get_shop_instance(shop=self.request.shop)
         except ObjectDoesNotExist:
-            return ValidationError({
+            raise ValidationError({
                 'code': 'product_not_available',
                 'error': [_('The requested product does not exists or is not available in the current store')]
             })
         try:
-            handle_add(PricingContext(self.request.shop, basket.customer),
-                       basket, product.id, serializer.validated_data['quantity'])
-            basket.save()
+            basket = save_basket_mutation(basket, lambda basket: handle_add(
+                PricingContext(self.request.shop, basket.customer),
+                basket, product.id, serializer.validated_data['quantity']))
         except ShopMismatchBasketCompatibilityError:
             raise ValidationError({
                 'code': 'shop_mismatch',
                 'error': _('The requested belongs to another shop')
             })
 
-        # trigger reload, otherwise we have a cached version
-        new_basket = self.get_basket()
-        return Response(APIBasketSerializer(new_basket, context={'request': self.request}).data)
+        return Response(APIBasketSerializer(basket, context={'request': self.request}).data)
 
     def partial_update(self, request, *args, **kwargs):
         serializer = self.get_serializer_class()(data=request.data)
@@ -159,18 +189,18 @@ class APIBasketLineViewSet(GenericViewSet, ShopAPIViewSetMixin, BasketAPIViewSet
             update_args = {
                 update_command: serializer.validated_data['quantity']
             }
-            handle_update(request, request.basket, **update_args)
-            request.basket.save()
-            new_basket = self.get_basket()
-            return Response(APIBasketSerializer(new_basket, context={'request': self.request}).data)
+            basket = save_basket_mutation(
+                request.basket, lambda basket: handle_update(request, basket, **update_args))
+            return Response(APIBasketSerializer(basket, context={'request': self.request}).data)
 
     def destroy(self, request, *args, **kwargs):
-        result = handle_del(self.request, self.request.basket, kwargs['line_id'])
-        if not result['ok']:
-            raise ValidationError({
-                'code': 'line_not_found',
-                'error': _('Couldn\'t delete the line')
-            })
-        self.request.basket.save()
-        new_basket = self.get_basket()
-        return Response(APIBasketSerializer(new_basket, context={'request': self.request}).data)
+        def delete_line(basket):
+            result = handle_del(self.request, basket, kwargs['line_id'])
+            if not result['ok']:
+                raise ValidationError({
+                    'code': 'line_not_found',
+                    'error': _('Couldn\'t delete the line')
+                })
+
+        basket = save_basket_mutation(self.request.basket, delete_line)
+        return Response(APIBasketSerializer(basket, context={'request': self.request}).data)
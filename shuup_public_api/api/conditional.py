@@ -0,0 +1,65 @@
+import hashlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.http import parse_etags, quote_etag
+from django.utils.translation import get_language
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+
+class NotModified(Exception):
+    pass
+
+
+def make_etag(*parts):
+    """
+    Make a strong ETag out of the version stamps a response depends on.
+
+    :rtype: str
+    """
+    return quote_etag(hashlib.sha1(force_bytes(repr(parts))).hexdigest())
+
+
+class ConditionalGetViewSetMixin(object):
+    """
+    Answer GET requests with ``304 Not Modified`` when the client already has the current response.
+
+    Views implement `get_etag` to return an ETag for the current action,
+    computed from version stamps without rendering the response. The
+    language and the host the response is rendered for are added to it,
+    as they change the rendered texts and URLs.
+    """
+    _etag = None
+
+    def get_etag(self):
+        """
+        :return: ETag of the response to the current request or None
+        :rtype: str|None
+        """
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        super(ConditionalGetViewSetMixin, self).initial(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            return
+        etag = self.get_etag()
+        if etag:
+            self._etag = make_etag(etag, get_language(), request.build_absolute_uri('/'))
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match:
+                etags = parse_etags(if_none_match)
+                if '*' in etags or self._etag in [quote_etag(value) for value in etags]:
+                    raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=HTTP_304_NOT_MODIFIED)
+        return super(ConditionalGetViewSetMixin, self).handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(ConditionalGetViewSetMixin, self).finalize_response(request, response, *args, **kwargs)
+        if self._etag and response.status_code in (HTTP_200_OK, HTTP_304_NOT_MODIFIED):
+            response['ETag'] = self._etag
+            patch_vary_headers(response, ('Accept-Language',))
+        return response
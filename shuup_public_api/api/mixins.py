@@ -1,12 +1,23 @@
+from django.conf import settings
 from django.http.response import Http404
 from django.shortcuts import get_object_or_404
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.status import HTTP_409_CONFLICT
 from rest_framework_extensions.mixins import NestedViewSetMixin
 from shuup.core.models import Shop, Order
 from shuup.front.basket.storage import ShopMismatchBasketCompatibilityError
 from django.utils.translation import ugettext as _
 
-from ..common.basket import APIBasket
+from ..common.basket import APIBasket, BasketRevisionConflict
+from ..common.shop import get_shop_by_identifier
+
+
+class BasketConflict(APIException):
+    status_code = HTTP_409_CONFLICT
+    default_detail = {
+        'code': 'basket_conflict',
+        'error': _('The basket was modified concurrently, please try again')
+    }
 
 
 class ShopAPIViewSetMixin(NestedViewSetMixin):
@@ -16,11 +27,18 @@ class ShopAPIViewSetMixin(NestedViewSetMixin):
         return request
 
     def get_shop(self):
-        shop = get_object_or_404(
-            Shop,
-            identifier=super(ShopAPIViewSetMixin, self).get_parents_query_dict()['shop__identifier']
-        )
-        return shop
+        """
+        Get the shop of the current request.
+
+        The shop is resolved only once per request.
+        """
+        if getattr(self, '_shop', None) is None:
+            identifier = super(ShopAPIViewSetMixin, self).get_parents_query_dict()['shop__identifier']
+            try:
+                self._shop = get_shop_by_identifier(identifier)
+            except Shop.DoesNotExist:
+                raise Http404
+        return self._shop
 
 
 class OrderAPIViewSetMixin(NestedViewSetMixin):
@@ -30,11 +48,18 @@ class OrderAPIViewSetMixin(NestedViewSetMixin):
         return request
 
     def get_order(self):
-        order = get_object_or_404(
-            Order,
-            key=super(OrderAPIViewSetMixin, self).get_parents_query_dict()['order__key']
-        )
-        return order
+        """
+        Get the order of the current request.
+
+        The order is resolved only once per request, along with its
+        shop and payment method.
+        """
+        if getattr(self, '_order', None) is None:
+            self._order = get_object_or_404(
+                Order.objects.select_related('shop', 'payment_method', 'payment_method__payment_processor'),
+                key=super(OrderAPIViewSetMixin, self).get_parents_query_dict()['order__key']
+            )
+        return self._order
 
 
 class BasketAPIViewSetMixin(NestedViewSetMixin):
@@ -48,14 +73,48 @@ class BasketAPIViewSetMixin(NestedViewSetMixin):
         except KeyError:
             raise Exception('Couldn\'t find basket__key in parent query dict - '
                             'make sure this ViewSet is is a nested route of basket')
-        basket = APIBasket(basket_key, self.get_shop())
-        if not basket.is_stored or not basket.is_active:
+        return get_active_basket(basket_key, self.get_shop())
+
+
+def get_active_basket(key, shop):
+    """
+    Get the active basket with the given key.
+
+    :raises: `Http404` if there is no active basket with the given key.
+    :raises: `ValidationError` if the basket belongs to another shop.
+    """
+    basket = APIBasket(key, shop)
+    try:
+        if not basket.load_active():
             raise Http404
+    except ShopMismatchBasketCompatibilityError:
+        raise ValidationError({
+            'error': _('The requested belongs to another shop'),
+            'code': 'shop_mismatch'
+        }, 'shop_mismatch')
+    return basket
+
+
+def save_basket_mutation(basket, mutate):
+    """
+    Apply a mutation to the basket and save it.
+
+    When the basket has been saved concurrently since it was loaded, it
+    is loaded again and the mutation is applied on top of the saved
+    changes, at most ``SHUUP_PUBLIC_API_BASKET_SAVE_RETRIES`` times.
+
+    :param mutate: Callable applying the changes to the given basket
+    :return: The saved basket
+    :rtype: shuup_public_api.common.basket.APIBasket
+    :raises: `BasketConflict` if the basket couldn't be saved.
+    """
+    for attempt in range(settings.SHUUP_PUBLIC_API_BASKET_SAVE_RETRIES + 1):
+        if attempt:
+            basket = get_active_basket(basket.key, basket.shop)
+        mutate(basket)
         try:
-            basket.storage.load(basket)
-        except ShopMismatchBasketCompatibilityError:
-            raise ValidationError({
-                'error': _('The requested belongs to another shop'),
-                'code': 'shop_mismatch'
-            }, 'shop_mismatch')
-        return basket
+            basket.save()
+            return basket
+        except BasketRevisionConflict:
+            continue
+    raise BasketConflict()
@@ -1,6 +1,8 @@
 
 from shuup.core.api.orders import OrderSerializer
 
+from ...metrics import TimedSerializerMixin
 
-class PublicOrderSerializer(OrderSerializer):
+
+class PublicOrderSerializer(TimedSerializerMixin, OrderSerializer):
     pass
@@ -4,13 +4,20 @@ from rest_framework.viewsets import GenericViewSet
 from shuup.core.models import Order
 
 from ._serializers import OrderSerializer
+from ..conditional import ConditionalGetViewSetMixin, make_etag
 from ..mixins import ShopAPIViewSetMixin
 
 
-class PublicOrderViewSet(GenericViewSet, ShopAPIViewSetMixin, RetrieveModelMixin):
+class PublicOrderViewSet(ConditionalGetViewSetMixin, GenericViewSet, ShopAPIViewSetMixin, RetrieveModelMixin):
     serializer_class = OrderSerializer
     permission_classes = [AllowAny]
     lookup_field = 'key'
 
+    def get_etag(self):
+        modified_on = self.get_queryset().filter(
+            key=self.kwargs[self.lookup_field]).values_list('modified_on', flat=True).first()
+        if modified_on:
+            return make_etag('order', self.kwargs[self.lookup_field], modified_on.isoformat())
+
     def get_queryset(self, *args, **kwargs):
         return Order.objects.filter(shop=self.get_shop())
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on the primary key.
+
+    Pages are fetched by seeking on the primary key index, so the cost of
+    a page doesn't grow with its position. The total count is only
+    included when requested with ``count=true``.
+    """
+    ordering = 'pk'
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+
+    def get_page_size(self, request):
+        default_page_size = settings.SHUUP_PUBLIC_API_KEYSET_PAGE_SIZE
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default_page_size
+        if page_size <= 0:
+            return default_page_size
+        return min(page_size, settings.SHUUP_PUBLIC_API_KEYSET_MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+        return super(KeysetPagination, self).paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['next'] = self.get_next_link()
+        response_data['previous'] = self.get_previous_link()
+        response_data['results'] = data
+        return Response(response_data)
+
+
+class KeysetPaginationViewSetMixin(object):
+    """
+    Use `KeysetPagination` when requested with ``pagination=cursor``
+    or a cursor, otherwise the pagination class of the view.
+    """
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            query_params = self.request.query_params
+            cursor_param = self.keyset_pagination_class.cursor_query_param
+            if query_params.get('pagination') == 'cursor' or cursor_param in query_params:
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super(KeysetPaginationViewSetMixin, self).paginator
+        return self._paginator
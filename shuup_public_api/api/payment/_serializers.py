@@ -1,5 +1,8 @@
+from enumfields.fields import EnumField
 from rest_framework import serializers
 
+from ...models import PaymentJob, PaymentJobStatus
+
 
 class CreateOrderPaymentSerializer(serializers.Serializer):
     return_url = serializers.URLField(required=False)
@@ -9,3 +12,17 @@ class CreateOrderPaymentSerializer(serializers.Serializer):
 
 class TransactionSerializer(serializers.Serializer):
     payment_url = serializers.URLField()
+
+
+class PaymentJobSerializer(serializers.ModelSerializer):
+    status = EnumField(enum=PaymentJobStatus)
+
+    class Meta:
+        model = PaymentJob
+        fields = [
+            'id',
+            'status',
+            'payment_url',
+            'created_on',
+            'modified_on',
+        ]
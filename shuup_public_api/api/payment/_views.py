@@ -4,14 +4,19 @@ from rest_framework.decorators import list_route
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework.status import HTTP_500_INTERNAL_SERVER_ERROR
+from rest_framework.status import HTTP_202_ACCEPTED, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR
 from rest_framework.viewsets import GenericViewSet
+from django.conf import settings
 from shuup.core.models import Payment
 from shuup.core.api.orders import PaymentSerializer
-from shuup.core.models import PaymentUrls
 
+from ...common.payment import (
+    enqueue_payment_initiation, get_payment_callback_key, initiate_payment,
+    PaymentCallbackInProgress, process_payment_callback
+)
+from ...models import PaymentJob
 from ...utils import convert_to_secure_url
-from ._serializers import CreateOrderPaymentSerializer, TransactionSerializer
+from ._serializers import CreateOrderPaymentSerializer, PaymentJobSerializer, TransactionSerializer
 from ..mixins import ShopAPIViewSetMixin, OrderAPIViewSetMixin
 
 
@@ -20,7 +25,8 @@ class OrderPaymentViewSet(GenericViewSet,
                           OrderAPIViewSetMixin,
                           RetrieveModelMixin,
                           ListModelMixin):
-    lookup_field = 'identifier'
+    lookup_field = 'payment_identifier'
+    lookup_url_kwarg = 'identifier'
     permission_classes = [AllowAny]
 
     def get_serializer_class(self, *args, **kwargs):
@@ -45,33 +51,56 @@ class OrderPaymentViewSet(GenericViewSet,
         serializer = self.get_serializer_class()(data=self.request.data)
         if serializer.is_valid(raise_exception=True):
             order = self.get_order()
-            transaction_redirect = order.payment_method.get_payment_process_response(
-                order=order,
-                urls=PaymentUrls(
-                    return_url=serializer.validated_data.get(
-                        'return_url',
-                        convert_to_secure_url(
-                            request.build_absolute_uri(self._reverse_url('public_api:payments-callback-list'))),
-                        ),
-                        cancel_url=serializer.validated_data.get(
-                        'cancel_url',
-                        convert_to_secure_url(
-                            request.build_absolute_uri(self._reverse_url('public_api:payments-cancel-list'))),
-                        ),
-                        payment_url=None
-                )
+            return_url = serializer.validated_data.get(
+                'return_url',
+                convert_to_secure_url(
+                    request.build_absolute_uri(self._reverse_url('public_api:payments-callback-list'))),
             )
+            cancel_url = serializer.validated_data.get(
+                'cancel_url',
+                convert_to_secure_url(
+                    request.build_absolute_uri(self._reverse_url('public_api:payments-cancel-list'))),
+            )
+            if settings.SHUUP_PUBLIC_API_ASYNC_PAYMENT_INITIATION:
+                job = enqueue_payment_initiation(order, return_url, cancel_url)
+                data = PaymentJobSerializer(job).data
+                data['status_url'] = request.build_absolute_uri(reverse('public_api:payment_jobs-detail', kwargs={
+                    'parent_lookup_shop__identifier': self.get_shop().identifier,
+                    'parent_lookup_order__key': order.key,
+                    'pk': job.pk
+                }))
+                return Response(data, status=HTTP_202_ACCEPTED)
             return Response(TransactionSerializer({
-                'payment_url': transaction_redirect.url
+                'payment_url': initiate_payment(order, return_url, cancel_url)
             }).data)
 
     @list_route(methods=['post'])
     def callback(self, request, *args, **kwargs):
         order = self.get_order()
-        payment_method = order.payment_method
-        payment_method.process_payment_return_request(order=order, request=request)
+        key = get_payment_callback_key(order, request)
+        try:
+            process_payment_callback(order, request, key)
+        except PaymentCallbackInProgress:
+            return Response(
+                'Callback is already being processed', status=HTTP_409_CONFLICT, headers={'Retry-After': '1'})
         return Response('ok')
 
     @list_route(methods=['post'])
     def cancel(self, request, *args, **kwargs):
-        return Response('Server method not implemented', status=HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response('Server method not implemented', status=HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PaymentJobViewSet(GenericViewSet,
+                        ShopAPIViewSetMixin,
+                        OrderAPIViewSetMixin,
+                        RetrieveModelMixin):
+    """
+    Status of the queued payment initiations of an order.
+
+    Clients poll a job until it has succeeded and redirect to its ``payment_url``.
+    """
+    serializer_class = PaymentJobSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self, *args, **kwargs):
+        return PaymentJob.objects.filter(order=self.get_order())
@@ -2,8 +2,10 @@ from parler_rest.fields import TranslatedFieldsField
 from parler_rest.serializers import TranslatableModelSerializer
 from shuup.core.models import PaymentMethod
 
+from ...metrics import TimedSerializerMixin
 
-class PaymentMethodSerializer(TranslatableModelSerializer):
+
+class PaymentMethodSerializer(TimedSerializerMixin, TranslatableModelSerializer):
     translations = TranslatedFieldsField(shared_model=PaymentMethod)
 
     class Meta:
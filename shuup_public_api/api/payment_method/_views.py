@@ -4,13 +4,19 @@ from rest_framework.viewsets import GenericViewSet
 from shuup.core.models import PaymentMethod
 
 from ._serializers import PaymentMethodSerializer
+from ...common.versions import get_catalog_version
+from ..conditional import ConditionalGetViewSetMixin, make_etag
 from ..mixins import ShopAPIViewSetMixin
 
 
-class PaymentMethodViewSet(GenericViewSet, ShopAPIViewSetMixin, ListModelMixin):
+class PaymentMethodViewSet(ConditionalGetViewSetMixin, GenericViewSet, ShopAPIViewSetMixin, ListModelMixin):
     lookup_field = 'identifier'
     serializer_class = PaymentMethodSerializer
     permission_classes = [AllowAny]
 
+    def get_etag(self):
+        shop = self.get_shop()
+        return make_etag('payment_methods', shop.pk, get_catalog_version(shop.pk), self.request.get_full_path())
+
     def get_queryset(self, *args, **kwargs):
         return PaymentMethod.objects.filter(shop=self.get_shop(), enabled=True)
@@ -0,0 +1,93 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils.translation import ugettext as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from ...common.search import get_product_search_queries, search_product_ids, use_in_process_search_index
+
+# SQLite limits the number of variables in a query, so larger sets of
+# matches from the in-process index are looked up from the database
+MAX_INDEXED_SEARCH_MATCHES = 500
+
+
+def _get_list(query_params, name):
+    values = []
+    for value in query_params.getlist(name):
+        values.extend(item.strip() for item in value.split(',') if item.strip())
+    return values
+
+
+def _get_decimal(query_params, name):
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: _('Enter a number.')})
+
+
+def _get_boolean(query_params, name):
+    value = query_params.get(name, '').lower()
+    if value in ('1', 'true'):
+        return True
+    if value in ('0', 'false'):
+        return False
+    return None
+
+
+class PublicShopProductFilter(BaseFilterBackend):
+    """
+    Filter shop products by the query parameters.
+
+    * ``category``: Comma separated category ids, matched against the primary and other categories.
+    * ``sku``: Comma separated product SKUs.
+    * ``price_min`` and ``price_max``: Inclusive range of the default price.
+    * ``visible``: ``true`` or ``false``.
+    * ``search``: Words that each start a word of the translated product name.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query_params = request.query_params
+
+        category_ids = _get_list(query_params, 'category')
+        if category_ids:
+            if not all(category_id.isdigit() for category_id in category_ids):
+                raise ValidationError({'category': _('Enter a list of category ids.')})
+            queryset = queryset.filter(
+                Q(primary_category_id__in=category_ids) | Q(categories__id__in=category_ids)
+            ).distinct()
+
+        skus = _get_list(query_params, 'sku')
+        if skus:
+            queryset = queryset.filter(product__sku__in=skus)
+
+        price_min = _get_decimal(query_params, 'price_min')
+        if price_min is not None:
+            queryset = queryset.filter(default_price_value__gte=price_min)
+        price_max = _get_decimal(query_params, 'price_max')
+        if price_max is not None:
+            queryset = queryset.filter(default_price_value__lte=price_max)
+
+        visible = _get_boolean(query_params, 'visible')
+        if visible is not None:
+            queryset = queryset.filter(visible=visible)
+
+        search = query_params.get('search', '').strip()
+        if search:
+            queryset = self.filter_search(queryset, search)
+        return queryset
+
+    def filter_search(self, queryset, search):
+        if use_in_process_search_index():
+            product_ids = search_product_ids(search)
+            if len(product_ids) <= MAX_INDEXED_SEARCH_MATCHES:
+                return queryset.filter(product_id__in=product_ids)
+        queries = get_product_search_queries(search)
+        if not queries:
+            return queryset.none()
+        for product_ids in queries:
+            queryset = queryset.filter(product_id__in=product_ids)
+        return queryset
@@ -1,6 +1,13 @@
 from shuup.core.api.category import CategorySerializer
 from shuup.core.api.product_media import ProductMediaSerializer
 from shuup.core.api.products import ProductAttributeSerializer, ProductPackageLinkSerializer
+import hashlib
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils.encoding import force_bytes
+from django.utils.translation import get_language
 from rest_framework import serializers
 from enumfields.fields import EnumField
 from parler_rest.fields import TranslatedFieldsField
@@ -8,10 +15,100 @@ from parler_rest.serializers import TranslatableModelSerializer
 from shuup.core.models import Product, ProductPackageLink, ShippingMode
 from shuup.core.models import ShopProduct
 
+from ...common.versions import get_product_versions
+from ...metrics import TimedSerializerMixin
 from ..tax import ExtendedTaxClassSerializer
 
 
+def _prefixed(prefix, fields):
+    return tuple('{}__{}'.format(prefix, field) for field in fields)
+
+
+def prefetch_package_links(products):
+    """
+    Fetch the package links of the given products with a single query.
+
+    The links are stored on the products and used by
+    `PublicProductSerializer.get_package_content`.
+    """
+    links = defaultdict(list)
+    parent_ids = [product.pk for product in products]
+    for link in ProductPackageLink.objects.filter(parent_id__in=parent_ids).select_related('child'):
+        links[link.parent_id].append(link)
+    for product in products:
+        product._package_links = links[product.pk]
+
+
+def get_product_fragments(products, request, render):
+    """
+    Get the rendered representations of the given products.
+
+    Representations are cached per product, shop, language and host
+    until the product version changes.
+
+    :type products: list[shuup.core.models.Product]
+    :param render: Callable rendering a list of products not in the cache to a dict by product id
+    :return: Dict of product id to rendered representation
+    :rtype: dict[int, dict]
+    """
+    shop = getattr(request, 'shop', None)
+    host = (request.build_absolute_uri('/') if request else '')
+    language = get_language()
+    cache_keys = {}
+    for product_id, version in get_product_versions([product.pk for product in products]).items():
+        parts = (product_id, version, getattr(shop, 'pk', None), language, host)
+        cache_keys[product_id] = 'shuup_public_api:product_fragment:%s' % hashlib.sha1(
+            force_bytes(repr(parts))).hexdigest()
+
+    fragments = {}
+    cached_fragments = cache.get_many(list(cache_keys.values()))
+    for product in products:
+        fragment = cached_fragments.get(cache_keys[product.pk])
+        if fragment is not None:
+            fragments[product.pk] = fragment
+    missing_products = [product for product in products if product.pk not in fragments]
+    if missing_products:
+        rendered_fragments = render(missing_products)
+        cache.set_many(
+            dict((cache_keys[product_id], fragment) for (product_id, fragment) in rendered_fragments.items()),
+            timeout=settings.SHUUP_PUBLIC_API_PRODUCT_FRAGMENT_CACHE_TIMEOUT
+        )
+        fragments.update(rendered_fragments)
+    return fragments
+
+
+class PublicShopProductListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    def to_representation(self, data):
+        shop_products = list(data.all() if isinstance(data, models.Manager) else data)
+        products = [shop_product.product for shop_product in shop_products]
+        product_serializer = self.child.fields['product']
+
+        def render(missing_products):
+            prefetch_package_links(missing_products)
+            return dict((product.pk, product_serializer.render(product)) for product in missing_products)
+
+        fragments = get_product_fragments(products, self.context.get('request'), render)
+        for product in products:
+            product._public_api_fragment = fragments[product.pk]
+        return super(PublicShopProductListSerializer, self).to_representation(shop_products)
+
+
 class PublicProductSerializer(TranslatableModelSerializer):
+    #: Product relations rendered by this serializer
+    select_related_fields = ('primary_image', 'primary_image__file', 'tax_class')
+    prefetch_related_fields = (
+        'translations',
+        'primary_image__translations',
+        'primary_image__shops',
+        'media',
+        'media__translations',
+        'media__shops',
+        'media__file',
+        'attributes',
+        'attributes__translations',
+        'tax_class__translations',
+    )
+
     sku = serializers.CharField()
     translations = TranslatedFieldsField(shared_model=Product)
     primary_image = ProductMediaSerializer(read_only=True)
@@ -21,8 +118,26 @@ class PublicProductSerializer(TranslatableModelSerializer):
     package_content = serializers.SerializerMethodField()
     tax_class = ExtendedTaxClassSerializer()
 
+    def to_representation(self, product):
+        fragment = getattr(product, '_public_api_fragment', None)
+        if fragment is None:
+            fragment = get_product_fragments(
+                [product], self.context.get('request'),
+                lambda products: dict((p.pk, self.render(p)) for p in products)
+            )[product.pk]
+        return fragment
+
+    def render(self, product):
+        """
+        Render the product without the fragment cache.
+        """
+        return super(PublicProductSerializer, self).to_representation(product)
+
     def get_package_content(self, product):
-        return ProductPackageLinkSerializer(ProductPackageLink.objects.filter(parent=product),
+        links = getattr(product, '_package_links', None)
+        if links is None:
+            links = ProductPackageLink.objects.filter(parent=product).select_related('child')
+        return ProductPackageLinkSerializer(links,
                                             many=True,
                                             context={'request': self.context['request']}).data
 
@@ -41,12 +156,33 @@ class PublicProductSerializer(TranslatableModelSerializer):
         ]
 
 
-class PublicShopProductSerializer(TranslatableModelSerializer):
+class PublicShopProductSerializer(TimedSerializerMixin, TranslatableModelSerializer):
+    #: Shop product relations rendered by this serializer
+    select_related_fields = (
+        'product',
+        'primary_category',
+        'primary_category__image',
+    ) + _prefixed('product', PublicProductSerializer.select_related_fields)
+    prefetch_related_fields = (
+        'primary_category__translations',
+        'primary_category__visibility_groups',
+    ) + _prefixed('product', PublicProductSerializer.prefetch_related_fields)
+
     product = PublicProductSerializer()
     default_price = serializers.DecimalField(max_digits=500, decimal_places=2)
     primary_category = CategorySerializer()
 
+    @classmethod
+    def prefetch(cls, queryset):
+        """
+        Fetch everything rendered by this serializer along with the given shop products.
+
+        :type queryset: django.db.models.QuerySet
+        """
+        return queryset.select_related(*cls.select_related_fields).prefetch_related(*cls.prefetch_related_fields)
+
     class Meta:
+        list_serializer_class = PublicShopProductListSerializer
         model = ShopProduct
         fields = [
             'product',
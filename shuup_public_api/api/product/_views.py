@@ -1,15 +1,106 @@
 
+from itertools import chain
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import get_language, override
+from django.utils.translation import ugettext as _
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.viewsets import GenericViewSet
 
+from ...common.versions import get_catalog_version
+from ...models import ShopProductChange
+from ..conditional import ConditionalGetViewSetMixin, make_etag
 from ..mixins import ShopAPIViewSetMixin
+from ..pagination import KeysetPaginationViewSetMixin
+from ._filters import PublicShopProductFilter
 from ._serializers import PublicShopProductSerializer
 
 
-class PublicShopProductViewSet(GenericViewSet, ListModelMixin, RetrieveModelMixin, ShopAPIViewSetMixin):
+class PublicShopProductViewSet(ConditionalGetViewSetMixin, KeysetPaginationViewSetMixin, GenericViewSet,
+                               ListModelMixin, RetrieveModelMixin, ShopAPIViewSetMixin):
     serializer_class = PublicShopProductSerializer
     permission_classes = [AllowAny]
+    filter_backends = [PublicShopProductFilter]
+
+    def get_etag(self):
+        shop = self.get_shop()
+        return make_etag('products', shop.pk, get_catalog_version(shop.pk), self.request.get_full_path())
 
     def get_queryset(self):
-        return self.get_shop().shop_products.all()
+        return PublicShopProductSerializer.prefetch(self.get_shop().shop_products.all())
+
+    @list_route(methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream all products of the shop as newline delimited JSON.
+
+        Products are fetched in chunks ordered by the primary key, so
+        memory use doesn't depend on the size of the catalog. The
+        listing filters apply and deleted products are left out.
+
+        With ``updated_since`` only products whose product or shop product
+        changed since the given ISO 8601 timestamp are exported. Products
+        changed since then that the export no longer includes follow as
+        tombstones: ``{"product": {"id": <id>}, "deleted": true}``.
+        """
+        shop = self.get_shop()
+        queryset = self.filter_queryset(shop.shop_products.all()).exclude(product__deleted=True)
+        lines = self._export_lines(queryset)
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            updated_since = self._parse_updated_since(updated_since)
+            changes = ShopProductChange.objects.filter(shop_id=shop.pk, modified_on__gte=updated_since)
+            changed_queryset = queryset.filter(
+                Q(product__modified_on__gte=updated_since) | Q(pk__in=changes.values('shop_product_id')))
+            removed_changes = changes.exclude(shop_product_id__in=queryset.values('pk'))
+            lines = chain(self._export_lines(changed_queryset), self._export_tombstones(removed_changes))
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="products.ndjson"'
+        return response
+
+    def _parse_updated_since(self, value):
+        try:
+            updated_since = parse_datetime(value)
+        except ValueError:
+            updated_since = None
+        if updated_since is None:
+            raise ValidationError({'updated_since': _('Enter a valid ISO 8601 date and time.')})
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since, timezone.get_current_timezone())
+        return updated_since
+
+    def _export_lines(self, queryset):
+        # The response is consumed after the view returns, so the chunks
+        # are rendered with the language of the request explicitly
+        language = get_language()
+        context = self.get_serializer_context()
+        chunk_size = settings.SHUUP_PUBLIC_API_EXPORT_CHUNK_SIZE
+        renderer = JSONRenderer()
+        queryset = queryset.order_by('pk')
+        last_pk = None
+        while True:
+            chunk = (queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)
+            shop_products = list(PublicShopProductSerializer.prefetch(chunk[:chunk_size]))
+            if not shop_products:
+                return
+            with override(language):
+                records = PublicShopProductSerializer(shop_products, many=True, context=context).data
+            for record in records:
+                yield renderer.render(record) + b'\n'
+            last_pk = shop_products[-1].pk
+            if len(shop_products) < chunk_size:
+                return
+
+    def _export_tombstones(self, changes):
+        renderer = JSONRenderer()
+        product_ids = changes.order_by('product_id').values_list('product_id', flat=True).distinct()
+        for product_id in product_ids.iterator():
+            yield renderer.render({'product': {'id': product_id}, 'deleted': True}) + b'\n'
@@ -2,8 +2,10 @@ from parler_rest.fields import TranslatedFieldsField
 from parler_rest.serializers import TranslatableModelSerializer
 from shuup.core.models import ShippingMethod
 
+from ...metrics import TimedSerializerMixin
 
-class ShippingMethodSerializer(TranslatableModelSerializer):
+
+class ShippingMethodSerializer(TimedSerializerMixin, TranslatableModelSerializer):
     translations = TranslatedFieldsField(shared_model=ShippingMethod)
 
     class Meta:
@@ -1,8 +1,10 @@
 from rest_framework.serializers import ModelSerializer
 from shuup.core.models import Shop
 
+from ...metrics import TimedSerializerMixin
 
-class PublicShopSerializer(ModelSerializer):
+
+class PublicShopSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         fields = '__all__'
         model = Shop
\ No newline at end of file
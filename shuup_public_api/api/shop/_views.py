@@ -1,9 +1,11 @@
+from django.http.response import Http404
 from django.utils.translation import ugettext_lazy as _
 from rest_framework.mixins import RetrieveModelMixin
 from rest_framework.permissions import AllowAny
 from rest_framework.viewsets import GenericViewSet
 from shuup.core.models import Shop
 
+from ...common.shop import get_shop_by_identifier
 from ._serializers import PublicShopSerializer
 
 
@@ -17,5 +19,10 @@ class PublicShopViewSet(RetrieveModelMixin, GenericViewSet):
     def get_view_name(self):
         return _('Shops')
 
-    def retrieve(self, request, *args, **kwargs):
-        raise Exception('Boom bam')
+    def get_object(self):
+        try:
+            shop = get_shop_by_identifier(self.kwargs[self.lookup_url_kwarg])
+        except Shop.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, shop)
+        return shop
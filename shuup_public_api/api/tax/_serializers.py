@@ -4,6 +4,8 @@ from parler_rest.serializers import TranslatableModelSerializer
 from rest_framework import serializers
 from shuup.core.models import Tax
 
+from ...common.tax import get_rendered_tax_class
+
 
 class TaxSerializer(TranslatableModelSerializer):
     translations = TranslatedFieldsField()
@@ -27,6 +29,9 @@ class TaxSerializer(TranslatableModelSerializer):
 class ExtendedTaxClassSerializer(TaxClassSerializer):
     rules = serializers.SerializerMethodField()
 
+    def to_representation(self, tax_class):
+        return get_rendered_tax_class(tax_class, super(ExtendedTaxClassSerializer, self).to_representation)
+
     def get_rules(self, tax_class):
-        for rule in tax_class.taxrule_set.filter(enabled=True):
-            yield TaxSerializer(rule.tax).data
+        rules = tax_class.taxrule_set.filter(enabled=True).select_related('tax').prefetch_related('tax__translations')
+        return [TaxSerializer(rule.tax).data for rule in rules]
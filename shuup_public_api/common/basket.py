@@ -1,38 +1,88 @@
+import hashlib
+import time
 import uuid
 
 import six
-from collections import Counter
+from collections import Counter, defaultdict
+from datetime import timedelta
 
 from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache, caches
 from django.core.exceptions import ValidationError
-from django.utils.translation import ugettext_lazy as _
+from django.db import IntegrityError, transaction
+from django.utils.encoding import force_bytes
+from django.utils.timezone import now
+from django.utils.translation import get_language, ugettext_lazy as _
 from shuup.core.models import OrderLineType
 from shuup.core.models import PaymentMethod
+from shuup.core.models import Product
 from shuup.core.models import ShippingMethod
+from shuup.core.models import Supplier
 from shuup.core.order_creator import OrderSource, SourceLine
 from shuup.core.pricing import PricingContext
+from shuup.core.taxing import get_tax_module
 from shuup.core.utils.users import real_user_or_none
+from shuup.default_tax.module import DefaultTaxModule
 from shuup.front.basket.objects import BasketLine
 from shuup.front.basket.storage import BasketStorage, ShopMismatchBasketCompatibilityError, _price_units_diff, \
     PriceUnitMismatchBasketCompatibilityError
 from shuup.front.models.stored_basket import StoredBasket
+from shuup.utils.importing import cached_load
 from shuup.utils.numbers import parse_decimal_string
 from shuup.utils.objects import compare_partial_dicts
 
+from ..metrics import timed
+from ..models import BasketRevision
+from .orderability import get_orderability_checker
+from .pricing import get_price_info
+from .tax import CachedDefaultTaxModule
+from .versions import get_catalog_version
+
+#: Seconds the revisions claimed by `CacheAPIBasketStorage` are kept,
+#: they only need to outlive the race between two concurrent saves.
+#: Claims are scoped to the generation of the cached basket, so claims
+#: left over from before the cache lost the basket never conflict.
+REVISION_CLAIM_TIMEOUT = 60
+
+#: Key of the stored basket data holding the pricing fingerprint of the
+#: basket as its derived columns were last written.
+STORED_FINGERPRINT_KEY = "stored_pricing_fingerprint"
+
+#: Cached in place of basket pricing whose discount texts are translated
+#: and therefore cached per language.
+TRANSLATED_PRICING = "translated"
+
+#: Keys of the baskets created through the API are uuid4 hex digests,
+#: which tells them apart from the mixed case keys of the shop front.
+API_BASKET_KEY_REGEX = r"^[0-9a-f]{32}$"
+
+
+class BasketRevisionConflict(Exception):
+    """
+    The basket was saved concurrently since it was loaded.
+    """
+
 
 class APIBasket(OrderSource):
     def __init__(self, key, shop, ip_address=None, customer=None, orderer=None, creator=None, basket_name="basket"):
         super(APIBasket, self).__init__(shop)
         self.basket_name = basket_name
         self.ip_address = ip_address
-        self.storage = DatabaseAPIBasketStorage()
+        self.storage = get_storage()
         self._data = None
+        self._stored_basket = None
         self.customer = customer
         self.orderer = orderer
         self.creator = creator
         self._orderable_lines_cache = None
         self._unorderable_lines_cache = None
         self._lines_cached = False
+        self._line_index = None
+        self._pricing = None
+        self._lines_priced = False
+        self._available_methods = {}
+        self._customer_price_key = None
         self.key = key
 
     @property
@@ -43,6 +93,23 @@ class APIBasket(OrderSource):
     def is_stored(self):
         return self.storage.is_saved(self)
 
+    def load_active(self):
+        """
+        Load the persisted data for this basket if it is stored and active.
+
+        :return: Whether an active basket was found.
+        :rtype: bool
+        :raises:
+          `BasketCompatibilityError` if the stored basket is not
+          compatible with this basket.
+        """
+        with timed("basket_load"):
+            data = self.storage.load_active(basket=self)
+        if data is None:
+            return False
+        self._data = data
+        return True
+
     def _load(self):
         """
         Get the currently persisted data for this basket.
@@ -54,15 +121,31 @@ class APIBasket(OrderSource):
         :rtype: dict
         """
         if self._data is None:
-            self._data = self.storage.load(basket=self)
+            with timed("basket_load"):
+                self._data = self.storage.load(basket=self)
         return self._data
 
+    @property
+    def revision(self):
+        """
+        Revision of the basket data, increased on every save.
+
+        :rtype: int
+        """
+        return self._load().get("revision", 0)
+
     def save(self):
         """
         Persist any changes made into the basket to storage.
+
+        :raises:
+          `BasketRevisionConflict` if the basket has been saved
+          since it was loaded.
         """
         self.clean_empty_lines()
-        self.storage.save(basket=self, data=self._data)
+        self._load()["revision"] = self.revision + 1
+        with timed("basket_save"):
+            self.storage.save(basket=self, data=self._data)
 
     def delete(self):
         """
@@ -85,6 +168,7 @@ class APIBasket(OrderSource):
         Clear all data for this basket.
         """
         self._data = {}
+        self.uncache()
 
     @property
     def _data_lines(self):
@@ -113,6 +197,7 @@ class APIBasket(OrderSource):
         :type new_lines: list[dict]
         """
         self._load()["lines"] = new_lines
+        self.uncache()
 
     def add_line(self, **kwargs):
         line = self.create_line(**kwargs)
@@ -147,8 +232,30 @@ class APIBasket(OrderSource):
     def is_empty(self):
         return not bool(self.get_lines())
 
+    def _prime_object_cache(self):
+        """
+        Fetch the products and suppliers of all lines with one query per model.
+        """
+        querysets = (
+            (Product, "product_id", Product.objects.select_related("tax_class")),
+            (Supplier, "supplier_id", Supplier.objects.all()),
+        )
+        for model, field, queryset in querysets:
+            ids = set(line[field] for line in self._data_lines if line.get(field))
+            ids -= set(pk for (cached_model, pk) in self._object_cache if cached_model is model)
+            if ids:
+                for obj in queryset.filter(pk__in=ids):
+                    self._object_cache[(model, obj.pk)] = obj
+
     def _cache_lines(self):
+        with timed("basket_orderability"):
+            self._cache_orderable_lines()
+
+    def _cache_orderable_lines(self):
+        self._prime_object_cache()
         lines = [BasketLine.from_dict(self, line) for line in self._data_lines]
+        checker = get_orderability_checker(
+            self.shop, self.customer, [line.product for line in lines if line.type == OrderLineType.PRODUCT])
         orderable_counter = Counter()
         orderable_lines = []
         for line in lines:
@@ -157,16 +264,14 @@ class APIBasket(OrderSource):
             else:
                 product = line.product
                 quantity = line.quantity + orderable_counter[product.id]
-                if line.shop_product.is_orderable(line.supplier, self.customer, quantity, allow_cache=False):
+                if checker.is_orderable(product, line.supplier, quantity):
                     if product.is_package_parent():
-                        quantity_map = product.get_package_child_to_quantity_map()
+                        quantity_map = checker.get_package_child_to_quantity_map(product)
                         orderable = True
                         for child_product, child_quantity in six.iteritems(quantity_map):
-                            sp = child_product.get_shop_instance(shop=self.shop)
                             in_basket_child_qty = orderable_counter[child_product.id]
                             total_child_qty = ((quantity * child_quantity) + in_basket_child_qty)
-                            if not sp.is_orderable(
-                                    line.supplier, self.customer, total_child_qty, allow_cache=False):
+                            if not checker.is_orderable(child_product, line.supplier, total_child_qty):
                                 orderable = False
                                 break
                         if orderable:
@@ -181,6 +286,156 @@ class APIBasket(OrderSource):
         self._unorderable_lines_cache = [line for line in lines if line not in orderable_lines]
         self._lines_cached = True
 
+    def uncache(self):
+        super(APIBasket, self).uncache()
+        self._orderable_lines_cache = None
+        self._unorderable_lines_cache = None
+        self._lines_cached = False
+        self._pricing = None
+        self._lines_priced = False
+
+    @property
+    def pricing_fingerprint(self):
+        """
+        Fingerprint of everything the prices of this basket depend on.
+
+        Like the keys of the shared price cache, it includes the catalog
+        version of the shop and the groups of the customer, so prices,
+        campaigns and customer group changes give a new fingerprint.
+        The language isn't included, see `pricing`.
+
+        :rtype: str
+        """
+        state = (
+            self.shop.pk,
+            get_catalog_version(self.shop.pk),
+            getattr(self.customer, "pk", None),
+            self._get_customer_price_key(),
+            self.shipping_method_id,
+            self.payment_method_id,
+            sorted(self._codes),
+            [sorted(line.items()) for line in self._data_lines],
+        )
+        return hashlib.sha1(force_bytes(repr(state))).hexdigest()
+
+    @property
+    def pricing(self):
+        """
+        Get the prices of the current basket revision.
+
+        Prices are computed once per basket revision and shared between
+        requests for `SHUUP_PUBLIC_API_BASKET_PRICING_CACHE_TIMEOUT` seconds.
+        Only the texts of discount lines, the translated campaign names,
+        depend on the language. Pricing with discounts is therefore shared
+        per language, pricing without them between all languages.
+
+        :rtype: BasketPricing
+        """
+        if self._pricing is None:
+            timeout = settings.SHUUP_PUBLIC_API_BASKET_PRICING_CACHE_TIMEOUT
+            cache_key = "shuup_public_api:basket_pricing:%s" % self.pricing_fingerprint
+            language_cache_key = "%s:%s" % (cache_key, get_language())
+            pricing = cache.get(cache_key)
+            if pricing == TRANSLATED_PRICING:
+                pricing = cache.get(language_cache_key)
+            if pricing is None:
+                with timed("basket_pricing"):
+                    pricing = self._compute_pricing()
+                if pricing.discounts:
+                    cache.set_many({cache_key: TRANSLATED_PRICING, language_cache_key: pricing}, timeout=timeout)
+                else:
+                    cache.set(cache_key, pricing, timeout=timeout)
+            self._pricing = pricing
+        return self._pricing
+
+    def _get_customer_price_key(self):
+        """
+        Key of the customers sharing the prices of this basket.
+
+        Anonymous customers all share the same prices. Campaigns may have
+        conditions on single contacts, so contacts are keyed by themselves
+        along with their groups.
+        """
+        customer = self.customer
+        if not customer or customer.is_anonymous:
+            return None
+        if self._customer_price_key is None or self._customer_price_key[0] != customer.pk:
+            self._customer_price_key = (customer.pk, tuple(sorted(customer.groups.values_list("pk", flat=True))))
+        return self._customer_price_key
+
+    def _cache_line_info(self, line, pricing_context, catalog_version):
+        """
+        Cache the info of a line like `BasketLine.cache_info` through the shared price cache.
+        """
+        product = line.product
+        price_info = get_price_info(
+            pricing_context, product, line.quantity, self._get_customer_price_key(), catalog_version)
+        line.base_unit_price = price_info.base_unit_price
+        line.discount_amount = price_info.discount_amount
+        line.net_weight = product.net_weight
+        line.gross_weight = product.gross_weight
+        line.shipping_mode = product.shipping_mode
+        line.sku = product.sku
+        line.text = product.safe_translation_getter("name", any_language=True)
+
+    def _compute_pricing(self):
+        pricing_context = PricingContext(self.shop, self.customer)
+        catalog_version = get_catalog_version(self.shop.pk)
+        line_prices = {}
+        for line in self.get_lines():
+            if line.product:
+                self._cache_line_info(line, pricing_context, catalog_version)
+                line_prices[line.line_id] = (line.base_unit_price, line.discount_amount)
+        self._lines_priced = True
+        discounts = [
+            {"text": line.text, "discount_amount": line.discount_amount}
+            for line in self.get_final_lines() if line.type == OrderLineType.DISCOUNT
+        ]
+        return BasketPricing(
+            line_prices=line_prices,
+            discounts=discounts,
+            taxless_total_price=self.taxless_total_price,
+            taxful_total_price=self.taxful_total_price,
+            taxful_total_discount=self.taxful_total_discount
+        )
+
+    def _calculate_taxes(self, lines):
+        """
+        Add the taxes of the lines, with the default tax rules looked up once per tax class.
+        """
+        tax_module = get_tax_module()
+        if type(tax_module) is DefaultTaxModule:
+            tax_module = CachedDefaultTaxModule()
+        tax_module.add_taxes(self, lines)
+
+    def get_priced_lines(self):
+        """
+        Get the orderable lines with their info cached with the current prices.
+
+        :rtype: list[BasketLine]
+        """
+        pricing = self.pricing
+        lines = self.get_lines()
+        if not self._lines_priced:
+            pricing_context = PricingContext(self.shop, self.customer)
+            catalog_version = get_catalog_version(self.shop.pk)
+            for line in lines:
+                product = line.product
+                if not product:
+                    continue
+                prices = pricing.line_prices.get(line.line_id)
+                if prices is None:
+                    self._cache_line_info(line, pricing_context, catalog_version)
+                    continue
+                (line.base_unit_price, line.discount_amount) = prices
+                line.net_weight = product.net_weight
+                line.gross_weight = product.gross_weight
+                line.shipping_mode = product.shipping_mode
+                line.sku = product.sku
+                line.text = product.safe_translation_getter("name", any_language=True)
+            self._lines_priced = True
+        return lines
+
     def get_unorderable_lines(self):
         return self._unorderable_lines_cache
 
@@ -207,6 +462,17 @@ class APIBasket(OrderSource):
         if len(new_lines) != len(self._data_lines):
             self._data_lines = new_lines
 
+    def _get_line_index(self):
+        """
+        Get the index of the line data, (re)building it if the line list was replaced.
+
+        :rtype: BasketLineIndex
+        """
+        lines = self._data_lines
+        if self._line_index is None or self._line_index.lines is not lines:
+            self._line_index = BasketLineIndex(lines)
+        return self._line_index
+
     def _compare_line_for_addition(self, current_line_data, product, supplier, shop, extra):
         """
         Compare raw line data for coalescing.
@@ -238,11 +504,13 @@ class APIBasket(OrderSource):
         Find the underlying basket data dict for a given product and line-specific extra data.
         This uses _compare_line_for_addition internally, which is nice to override in a project-specific basket class.
 
+        Only the lines with the same product, supplier and shop are compared.
+
         :param product: Product object
         :param extra: optional dict of extra data
         :return: dict of line or None
         """
-        for line_data in self._data_lines:
+        for line_data in self._get_line_index().get_product_lines(product.id, supplier.id, shop.id):
             if self._compare_line_for_addition(line_data, product, supplier, shop, extra):
                 return line_data
 
@@ -250,14 +518,8 @@ class APIBasket(OrderSource):
         if isinstance(data_line, SourceLine):
             data_line = data_line.to_dict()
         assert isinstance(data_line, dict)
-        line_ids = [x["line_id"] for x in self._data_lines]
-        try:
-            index = line_ids.index(data_line["line_id"])
-        except ValueError:
-            index = len(line_ids)
-        self.delete_line(data_line["line_id"])
-        self._data_lines.insert(index, data_line)
-        self._data_lines = list(self._data_lines)  # This will set the dirty bit and call uncache.
+        self._get_line_index().add_or_replace(data_line)
+        self.uncache()
 
     def add_product(self, supplier, shop, product, quantity, force_new_line=False, extra=None, parent_line=None):
         if not extra:
@@ -286,7 +548,7 @@ class APIBasket(OrderSource):
         if new_quantity is not None:
             line.set_quantity(new_quantity)
         line.update(**kwargs)
-        line.cache_info(PricingContext(self.shop, self.customer))
+        self._cache_line_info(line, PricingContext(self.shop, self.customer), get_catalog_version(self.shop.pk))
         self._add_or_replace_line(line)
         return line
 
@@ -320,15 +582,10 @@ class APIBasket(OrderSource):
         return False
 
     def find_line_by_line_id(self, line_id):
-        for line in self._data_lines:
-            if six.text_type(line.get("line_id")) == six.text_type(line_id):
-                return line
-        return None
+        return self._get_line_index().get(line_id)
 
     def find_lines_by_parent_line_id(self, parent_line_id):
-        for line in self._data_lines:
-            if six.text_type(line.get("parent_line_id")) == six.text_type(parent_line_id):
-                yield line
+        return self._get_line_index().get_child_lines(parent_line_id)
 
     def _get_orderable(self):
         return (sum(l.quantity for l in self.get_lines()) > 0)
@@ -365,17 +622,66 @@ class APIBasket(OrderSource):
                 q_counter[line.product.id] += line.quantity
         return dict(q_counter)
 
+    @property
+    def method_availability_fingerprint(self):
+        """
+        Fingerprint of everything the availability of shipping and payment methods depends on.
+
+        :rtype: str
+        """
+        state = (
+            self.shop.pk,
+            get_catalog_version(self.shop.pk),
+            getattr(self.customer, "pk", None),
+            _get_address_state(self.shipping_address),
+            _get_address_state(self.billing_address),
+            sorted(self._codes),
+            sorted(
+                (line.get("product_id"), line.get("supplier_id"), six.text_type(line.get("quantity")))
+                for line in self._data_lines
+            ),
+        )
+        return hashlib.sha1(force_bytes(repr(state))).hexdigest()
+
+    def _get_available_methods(self, model):
+        """
+        Get the methods of the given model available for this basket.
+
+        Availability is computed once per basket fingerprint and shared
+        between requests for `SHUUP_PUBLIC_API_METHOD_AVAILABILITY_CACHE_TIMEOUT`
+        seconds.
+
+        :type model: type[shuup.core.models.ShippingMethod]|type[shuup.core.models.PaymentMethod]
+        """
+        fingerprint = (model.__name__, self.method_availability_fingerprint)
+        methods = self._available_methods.get(fingerprint)
+        if methods is not None:
+            return methods
+        cache_key = "shuup_public_api:available_methods:%s:%s" % fingerprint
+        method_ids = cache.get(cache_key)
+        if method_ids is None:
+            methods = [
+                m for m
+                in model.objects.available(shop=self.shop, products=self.product_ids)
+                if m.is_available_for(self)
+            ]
+            cache.set(
+                cache_key, [m.pk for m in methods],
+                timeout=settings.SHUUP_PUBLIC_API_METHOD_AVAILABILITY_CACHE_TIMEOUT
+            )
+        else:
+            methods_by_id = model.objects.in_bulk(method_ids)
+            methods = [methods_by_id[method_id] for method_id in method_ids if method_id in methods_by_id]
+        self._available_methods[fingerprint] = methods
+        return methods
+
     def get_available_shipping_methods(self):
         """
         Get available shipping methods.
 
         :rtype: list[ShippingMethod]
         """
-        return [
-            m for m
-            in ShippingMethod.objects.available(shop=self.shop, products=self.product_ids)
-            if m.is_available_for(self)
-        ]
+        return self._get_available_methods(ShippingMethod)
 
     def get_available_payment_methods(self):
         """
@@ -383,11 +689,106 @@ class APIBasket(OrderSource):
 
         :rtype: list[PaymentMethod]
         """
-        return [
-            m for m
-            in PaymentMethod.objects.available(shop=self.shop, products=self.product_ids)
-            if m.is_available_for(self)
-        ]
+        return self._get_available_methods(PaymentMethod)
+
+
+def _get_address_state(address):
+    if not address:
+        return None
+    return (address.pk, tuple(address.as_string_list()))
+
+
+class BasketPricing(object):
+    """
+    Prices of a basket revision.
+
+    :ivar line_prices: Base unit price and discount amount by line id
+    :type line_prices: dict
+    :ivar discounts: Text and discount amount of the discount lines
+    :type discounts: list[dict]
+    """
+
+    def __init__(self, line_prices, discounts, taxless_total_price, taxful_total_price, taxful_total_discount):
+        self.line_prices = line_prices
+        self.discounts = discounts
+        self.taxless_total_price = taxless_total_price
+        self.taxful_total_price = taxful_total_price
+        self.taxful_total_discount = taxful_total_discount
+
+
+class BasketLineIndex(object):
+    """
+    Index of basket line data by line id, parent line id and product.
+
+    The index keeps the given list of line data dicts in sync when lines
+    are added or replaced through it. Line data mutated or removed
+    in place requires a new index.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._build()
+
+    def _build(self):
+        self._positions = {}
+        self._product_line_ids = defaultdict(list)
+        self._child_line_ids = defaultdict(list)
+        for position, line in enumerate(self.lines):
+            self._add_to_index(position, line)
+
+    @staticmethod
+    def _get_product_key(line):
+        return (line.get("product_id"), line.get("supplier_id"), line.get("shop_id"))
+
+    def _add_to_index(self, position, line):
+        line_id = six.text_type(line.get("line_id"))
+        self._positions[line_id] = position
+        self._product_line_ids[self._get_product_key(line)].append(line_id)
+        if line.get("parent_line_id") is not None:
+            self._child_line_ids[six.text_type(line["parent_line_id"])].append(line_id)
+
+    def _remove_from_index(self, line):
+        line_id = six.text_type(line.get("line_id"))
+        del self._positions[line_id]
+        self._product_line_ids[self._get_product_key(line)].remove(line_id)
+        if line.get("parent_line_id") is not None:
+            self._child_line_ids[six.text_type(line["parent_line_id"])].remove(line_id)
+
+    def get(self, line_id):
+        position = self._positions.get(six.text_type(line_id))
+        return (self.lines[position] if position is not None else None)
+
+    def get_product_lines(self, product_id, supplier_id, shop_id):
+        return [self.get(line_id) for line_id in self._product_line_ids.get((product_id, supplier_id, shop_id), ())]
+
+    def get_child_lines(self, parent_line_id):
+        return [self.get(line_id) for line_id in self._child_line_ids.get(six.text_type(parent_line_id), ())]
+
+    def add_or_replace(self, line):
+        """
+        Replace the line with the same line id or append the line.
+
+        Like in shuup's basket, the child lines of a replaced line are
+        removed. The index is then rebuilt, other changes keep it in sync.
+
+        :type line: dict
+        """
+        line_id = six.text_type(line["line_id"])
+        position = self._positions.get(line_id)
+        if position is None:
+            self.lines.append(line)
+            self._add_to_index(len(self.lines) - 1, line)
+            return
+        self._remove_from_index(self.lines[position])
+        self.lines[position] = line
+        self._add_to_index(position, line)
+        child_line_ids = set(self._child_line_ids.get(line_id, ()))
+        if child_line_ids:
+            self.lines[:] = [
+                kept_line for kept_line in self.lines
+                if six.text_type(kept_line.get("line_id")) not in child_line_ids
+            ]
+            self._build()
 
 
 class DatabaseAPIBasketStorage(BasketStorage):
@@ -400,18 +801,65 @@ class DatabaseAPIBasketStorage(BasketStorage):
 
     def save(self, basket, data):
         """
-        :type basket: shuup_public_api.models.APIBasket
+        Save the basket data if its revision is newer than the stored one.
+
+        :type basket: shuup_public_api.common.basket.APIBasket
+        :raises: `BasketRevisionConflict` if the revision is already saved.
+        """
+        with transaction.atomic():
+            self._claim_revision(basket, data.get("revision", 0))
+            self._save_stored_basket(basket, data)
+
+    @staticmethod
+    def _claim_revision(basket, revision):
+        claimed = BasketRevision.objects.filter(basket_key=basket.key, revision__lt=revision).update(
+            revision=revision)
+        if claimed:
+            return
+        if BasketRevision.objects.filter(basket_key=basket.key).exists():
+            raise BasketRevisionConflict()
+        try:
+            with transaction.atomic():
+                BasketRevision.objects.create(basket_key=basket.key, revision=revision)
+        except IntegrityError:
+            raise BasketRevisionConflict()
+
+    def _save_stored_basket(self, basket, data):
+        """
+        Write the basket data and the columns derived from its lines.
+
+        The totals, product count and products are only updated if the
+        lines, codes or methods of the basket have changed since the
+        stored basket was last written, and the products relation is
+        updated by adding and removing the changed products only.
         """
         stored_basket = self._get_stored_basket(basket)
+        fingerprint = basket.pricing_fingerprint
+        stored_fingerprint = ((stored_basket.data or {}).get(STORED_FINGERPRINT_KEY) if stored_basket.pk else None)
+        lines_changed = (fingerprint != stored_fingerprint)
+        data[STORED_FINGERPRINT_KEY] = fingerprint
         stored_basket.data = data
-        stored_basket.taxless_total_price = basket.taxless_total_price_or_none
-        stored_basket.taxful_total_price = basket.taxful_total_price_or_none
-        stored_basket.product_count = basket.product_count
+        if lines_changed:
+            stored_basket.taxless_total_price = basket.taxless_total_price_or_none
+            stored_basket.taxful_total_price = basket.taxful_total_price_or_none
+            stored_basket.product_count = basket.product_count
         stored_basket.customer = (basket.customer or None)
         stored_basket.orderer = (basket.orderer or None)
         stored_basket.creator = real_user_or_none(basket.creator)
+        is_new = (stored_basket.pk is None)
         stored_basket.save()
-        stored_basket.products = set(basket.product_ids)
+        if lines_changed:
+            self._sync_products(stored_basket, set(basket.product_ids), is_new)
+
+    @staticmethod
+    def _sync_products(stored_basket, product_ids, is_new):
+        stored_product_ids = (set() if is_new else set(stored_basket.products.values_list("pk", flat=True)))
+        added_product_ids = product_ids - stored_product_ids
+        removed_product_ids = stored_product_ids - product_ids
+        if added_product_ids:
+            stored_basket.products.add(*added_product_ids)
+        if removed_product_ids:
+            stored_basket.products.remove(*removed_product_ids)
 
     def load(self, basket):
         """
@@ -426,6 +874,32 @@ class DatabaseAPIBasketStorage(BasketStorage):
         stored_basket = self._load_stored_basket(basket)
         if not stored_basket:
             return {}
+        self._check_compatibility(stored_basket, basket)
+        return stored_basket.data or {}
+
+    def load_active(self, basket):
+        """
+        Load the given basket's data dictionary if the basket is stored and active.
+
+        The stored basket is fetched with a single query and kept on the
+        basket, so saving the basket later on doesn't fetch it again.
+
+        :type basket: shuup_public_api.api_basket.APIBasket
+        :return: Data dict or None if there is no active stored basket.
+        :rtype: dict|None
+        :raises:
+          `BasketCompatibilityError` if basket loaded from the storage
+          is not compatible with the requested basket.
+        """
+        stored_basket = StoredBasket.objects.filter(key=basket.key).first()
+        if not stored_basket or stored_basket.deleted or stored_basket.finished:
+            return None
+        self._check_compatibility(stored_basket, basket)
+        basket._stored_basket = stored_basket
+        return stored_basket.data or {}
+
+    @staticmethod
+    def _check_compatibility(stored_basket, basket):
         if stored_basket.shop_id != basket.shop.id:
             msg = (
                 "Cannot load basket of a different Shop ("
@@ -439,7 +913,6 @@ class DatabaseAPIBasketStorage(BasketStorage):
                 type(stored_basket).__name__, stored_basket.id,
                 price_unit_diff)
             raise PriceUnitMismatchBasketCompatibilityError(msg)
-        return stored_basket.data or {}
 
     def _load_stored_basket(self, basket):
         return self._get_stored_basket(basket)
@@ -457,11 +930,29 @@ class DatabaseAPIBasketStorage(BasketStorage):
             stored_basket.finished = True
             stored_basket.save()
 
+    def evict(self, keys):
+        """
+        Drop the state kept outside of `StoredBasket` for the given baskets.
+
+        :type keys: list[str]
+        """
+        pass
+
+    def flush(self, keys):
+        """
+        Write the state kept outside of `StoredBasket` through for the given baskets.
+
+        :type keys: list[str]
+        :return: Keys of the written baskets
+        :rtype: list[str]
+        """
+        return []
+
     @staticmethod
     def _get_stored_basket(basket):
-        stored_basket = StoredBasket.objects.filter(key=basket.key)
-        if stored_basket:
-            stored_basket = stored_basket.first()
+        if basket._stored_basket is not None:
+            return basket._stored_basket
+        stored_basket = StoredBasket.objects.filter(key=basket.key).first()
         if not stored_basket:
             stored_basket = StoredBasket(
                 key=basket.key,
@@ -469,4 +960,268 @@ class DatabaseAPIBasketStorage(BasketStorage):
                 currency=basket.currency,
                 prices_include_tax=basket.prices_include_tax,
             )
+        basket._stored_basket = stored_basket
         return stored_basket
+
+
+class CachedStoredBasket(object):
+    """
+    The state of a basket kept in the cache by `CacheAPIBasketStorage`.
+    """
+
+    #: Baskets cached before generations were introduced have none
+    generation = None
+
+    def __init__(self, key, shop_id, currency, prices_include_tax, data,
+                 deleted=False, finished=False, persisted_on=None, generation=None):
+        self.key = key
+        self.shop_id = shop_id
+        self.currency = currency
+        self.prices_include_tax = prices_include_tax
+        self.data = (data or {})
+        self.deleted = deleted
+        self.finished = finished
+        self.persisted_on = persisted_on
+        self.generation = (generation or uuid.uuid4().hex)
+
+    @property
+    def revision(self):
+        return self.data.get("revision", 0)
+
+    @property
+    def id(self):
+        return self.key
+
+    @classmethod
+    def from_stored_basket(cls, stored_basket):
+        return cls(
+            key=stored_basket.key,
+            shop_id=stored_basket.shop_id,
+            currency=stored_basket.currency,
+            prices_include_tax=stored_basket.prices_include_tax,
+            data=stored_basket.data,
+            deleted=stored_basket.deleted,
+            finished=stored_basket.finished,
+            persisted_on=time.time()
+        )
+
+    @classmethod
+    def from_basket_and_data(cls, basket, data):
+        stored_basket = basket._stored_basket
+        return cls(
+            key=basket.key,
+            shop_id=basket.shop.id,
+            currency=basket.currency,
+            prices_include_tax=basket.prices_include_tax,
+            data=data,
+            deleted=bool(stored_basket and stored_basket.deleted),
+            finished=bool(stored_basket and stored_basket.finished)
+        )
+
+
+class CacheAPIBasketStorage(DatabaseAPIBasketStorage):
+    """
+    Basket storage keeping the live basket data in the cache.
+
+    Baskets are written through to `StoredBasket` when they are
+    checked out or deleted, and on save only if the last write is older
+    than `SHUUP_PUBLIC_API_BASKET_PERSIST_INTERVAL` seconds. Baskets
+    missing from the cache are loaded from the database.
+
+    Saves of a cached basket claim the revision following the cached one
+    with an atomic cache add, instead of `BasketRevision`. The claims
+    are scoped to the generation of the cached basket, which changes
+    whenever the basket is put in the cache again from the database.
+    Saves of a basket missing from the cache claim their revision with
+    `BasketRevision` and are written through to the database.
+
+    Changes saved in between two writes exist only in the cache until
+    the basket is saved again after the interval or `flush_baskets`
+    writes them. Should the cache drop the basket before, they are lost,
+    so the ``flush_baskets`` management command must run regularly and
+    before the cache is cleared. The changes lost are then bounded by
+    the time between two flushes.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.SHUUP_PUBLIC_API_BASKET_CACHE_ALIAS]
+
+    @staticmethod
+    def _get_cache_key_for(key):
+        return "shuup_public_api:basket:%s" % key
+
+    @classmethod
+    def _get_cache_key(cls, basket):
+        return cls._get_cache_key_for(basket.key)
+
+    def _get_cached_basket(self, basket):
+        return self.cache.get(self._get_cache_key(basket))
+
+    def _set_cached_basket(self, basket, cached_basket):
+        self.cache.set(
+            self._get_cache_key(basket), cached_basket,
+            timeout=settings.SHUUP_PUBLIC_API_BASKET_CACHE_TIMEOUT
+        )
+
+    def is_active(self, basket):
+        cached_basket = self._get_cached_basket(basket)
+        if cached_basket is None:
+            return super(CacheAPIBasketStorage, self).is_active(basket)
+        return not (cached_basket.deleted or cached_basket.finished)
+
+    def is_saved(self, basket):
+        if self._get_cached_basket(basket) is not None:
+            return True
+        return super(CacheAPIBasketStorage, self).is_saved(basket)
+
+    def save(self, basket, data):
+        """
+        :type basket: shuup_public_api.common.basket.APIBasket
+        :raises: `BasketRevisionConflict` if the revision is already saved.
+        """
+        previous = self._get_cached_basket(basket)
+        if previous is None:
+            super(CacheAPIBasketStorage, self).save(basket, data)
+            cached_basket = CachedStoredBasket.from_basket_and_data(basket, data)
+            cached_basket.persisted_on = time.time()
+            self._set_cached_basket(basket, cached_basket)
+            return
+        self._claim_cached_revision(basket, previous, data.get("revision", 0))
+        cached_basket = CachedStoredBasket.from_basket_and_data(basket, data)
+        cached_basket.generation = previous.generation
+        cached_basket.persisted_on = previous.persisted_on
+        interval = settings.SHUUP_PUBLIC_API_BASKET_PERSIST_INTERVAL
+        if previous.persisted_on is None or time.time() - previous.persisted_on >= interval:
+            self._save_stored_basket(basket, data)
+            cached_basket.persisted_on = time.time()
+        self._set_cached_basket(basket, cached_basket)
+
+    def _claim_cached_revision(self, basket, cached_basket, revision):
+        if revision != cached_basket.revision + 1:
+            raise BasketRevisionConflict()
+        claim_key = "%s:revision:%s:%d" % (self._get_cache_key(basket), cached_basket.generation, revision)
+        if not self.cache.add(claim_key, True, timeout=REVISION_CLAIM_TIMEOUT):
+            raise BasketRevisionConflict()
+
+    def load(self, basket):
+        cached_basket = self._get_cached_basket(basket)
+        if cached_basket is None:
+            return super(CacheAPIBasketStorage, self).load(basket)
+        self._check_compatibility(cached_basket, basket)
+        return cached_basket.data
+
+    def load_active(self, basket):
+        cached_basket = self._get_cached_basket(basket)
+        if cached_basket is None:
+            data = super(CacheAPIBasketStorage, self).load_active(basket)
+            if data is not None:
+                # Adding keeps the basket another request has put in the
+                # cache meanwhile, and possibly saved already
+                self.cache.add(
+                    self._get_cache_key(basket), CachedStoredBasket.from_stored_basket(basket._stored_basket),
+                    timeout=settings.SHUUP_PUBLIC_API_BASKET_CACHE_TIMEOUT
+                )
+            return data
+        if cached_basket.deleted or cached_basket.finished:
+            return None
+        self._check_compatibility(cached_basket, basket)
+        return cached_basket.data
+
+    def delete(self, basket):
+        self._persist(basket)
+        super(CacheAPIBasketStorage, self).delete(basket)
+        self.cache.delete(self._get_cache_key(basket))
+
+    def finalize(self, basket):
+        self._persist(basket)
+        super(CacheAPIBasketStorage, self).finalize(basket)
+        self.cache.delete(self._get_cache_key(basket))
+
+    def evict(self, keys):
+        self.cache.delete_many([self._get_cache_key_for(key) for key in keys])
+
+    def flush(self, keys):
+        """
+        Write the cached baskets ahead of their `StoredBasket` through to the database.
+
+        A basket is written if its cached revision is newer than the
+        stored one. The stored basket is locked while it is written, the
+        cached basket is left untouched so concurrent saves are kept.
+
+        :type keys: list[str]
+        :return: Keys of the written baskets
+        :rtype: list[str]
+        """
+        cached_baskets = dict(
+            (cached_basket.key, cached_basket)
+            for cached_basket in self.cache.get_many([self._get_cache_key_for(key) for key in keys]).values()
+            if not (cached_basket.deleted or cached_basket.finished)
+        )
+        stale_keys = [
+            stored_basket.key
+            for stored_basket in StoredBasket.objects.filter(
+                key__in=list(cached_baskets), deleted=False, finished=False)
+            if _is_stale(stored_basket, cached_baskets[stored_basket.key])
+        ]
+        flushed_keys = []
+        for key in stale_keys:
+            with transaction.atomic():
+                stored_basket = StoredBasket.objects.select_for_update().select_related("shop").filter(
+                    key=key, deleted=False, finished=False).first()
+                if not (stored_basket and _is_stale(stored_basket, cached_baskets[key])):
+                    continue
+                basket = APIBasket(key, stored_basket.shop)
+                basket._stored_basket = stored_basket
+                basket._data = cached_baskets[key].data
+                self._save_stored_basket(basket, basket._data)
+            flushed_keys.append(key)
+        return flushed_keys
+
+    def _persist(self, basket):
+        """
+        Write basket data not yet persisted through to the database.
+        """
+        cached_basket = self._get_cached_basket(basket)
+        if cached_basket is not None and basket._data is not None:
+            self._save_stored_basket(basket, basket._data)
+
+
+def _is_stale(stored_basket, cached_basket):
+    return (stored_basket.data or {}).get("revision", 0) < cached_basket.data.get("revision", 0)
+
+
+def get_storage():
+    """
+    Retrieve an API basket storage object.
+
+    :rtype: DatabaseAPIBasketStorage
+    """
+    storage_class = cached_load("SHUUP_PUBLIC_API_BASKET_STORAGE_CLASS_SPEC")
+    return storage_class()
+
+
+def flush_baskets(batch_size=1000):
+    """
+    Write the basket changes kept only by the basket storage through to the database.
+
+    Only baskets updated within the cache timeout and persist interval
+    of `CacheAPIBasketStorage` may have such changes, they are handed to
+    the storage a batch at a time.
+
+    :return: Number of baskets written
+    :rtype: int
+    """
+    storage = get_storage()
+    max_age = timedelta(seconds=(
+        settings.SHUUP_PUBLIC_API_BASKET_CACHE_TIMEOUT + settings.SHUUP_PUBLIC_API_BASKET_PERSIST_INTERVAL))
+    queryset = StoredBasket.objects.filter(
+        deleted=False, finished=False, updated_on__gte=now() - max_age).order_by("pk")
+    flushed = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).values_list("pk", "key")[:batch_size])
+        if not batch:
+            return flushed
+        last_pk = batch[-1][0]
+        flushed += len(storage.flush([key for (pk, key) in batch]))
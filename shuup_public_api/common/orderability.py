@@ -0,0 +1,149 @@
+from collections import defaultdict
+
+import six
+from django.conf import settings
+from shuup.core.models import ProductPackageLink, ProductVisibility, ShopProduct
+
+
+class ShopProductOrderabilityChecker(object):
+    """
+    Check the orderability of basket products one by one through the shop products.
+    """
+
+    def __init__(self, shop, customer):
+        self.shop = shop
+        self.customer = customer
+
+    def is_orderable(self, product, supplier, quantity):
+        shop_product = product.get_shop_instance(shop=self.shop)
+        return shop_product.is_orderable(supplier, self.customer, quantity, allow_cache=False)
+
+    def get_package_child_to_quantity_map(self, product):
+        return product.get_package_child_to_quantity_map()
+
+
+class BulkOrderabilityChecker(object):
+    """
+    Check the orderability of basket products in bulk.
+
+    The shop products, their suppliers, package links and stock statuses
+    of all given products, including package children, are fetched with a
+    constant number of queries and the rules of
+    `ShopProduct.get_orderability_errors` are evaluated in memory.
+    Variation parents are checked through their shop products.
+    """
+
+    def __init__(self, shop, customer, products):
+        self.shop = shop
+        self.customer = customer
+        self._package_children = defaultdict(dict)
+        self._stock_statuses = {}
+        self._customer_group_ids = None
+
+        parent_ids = [product.id for product in products if product.is_package_parent()]
+        if parent_ids:
+            for link in ProductPackageLink.objects.filter(parent_id__in=parent_ids).select_related("child"):
+                self._package_children[link.parent_id][link.child] = link.quantity
+
+        self._product_ids = set(product.id for product in products)
+        for child_to_quantity in six.itervalues(self._package_children):
+            self._product_ids.update(child.id for child in child_to_quantity)
+
+        shop_products = ShopProduct.objects.filter(
+            shop=shop, product_id__in=self._product_ids
+        ).select_related("product").prefetch_related("suppliers", "visibility_groups")
+        self._shop_products = dict((shop_product.product_id, shop_product) for shop_product in shop_products)
+
+    def is_orderable(self, product, supplier, quantity):
+        shop_product = self._shop_products.get(product.id)
+        if shop_product is None:
+            return False
+        if product.is_variation_parent():
+            return shop_product.is_orderable(supplier, self.customer, quantity, allow_cache=False)
+        if not supplier:
+            suppliers = shop_product.suppliers.all()
+            supplier = (suppliers[0] if suppliers else None)
+        for error_code in self._get_orderability_error_codes(shop_product, supplier, quantity):
+            return False
+        return True
+
+    def get_package_child_to_quantity_map(self, product):
+        return self._package_children.get(product.id, {})
+
+    def _get_orderability_error_codes(self, shop_product, supplier, quantity):
+        for error_code in self._get_visibility_error_codes(shop_product):
+            yield error_code
+
+        supplier_ids = set(s.pk for s in shop_product.suppliers.all())
+        if supplier is None and not supplier_ids:
+            yield "no_supplier"
+
+        if quantity < shop_product.minimum_purchase_quantity:
+            yield "purchase_quantity_not_met"
+
+        if supplier and supplier.pk not in supplier_ids:
+            yield "invalid_supplier"
+
+        if shop_product.product.is_package_parent():
+            for child_product, child_quantity in six.iteritems(
+                    self.get_package_child_to_quantity_map(shop_product.product)):
+                child_shop_product = self._shop_products.get(child_product.id)
+                if child_shop_product is None:
+                    yield "invalid_shop"
+                    continue
+                for error_code in self._get_orderability_error_codes(
+                        child_shop_product, supplier, quantity * child_quantity):
+                    yield error_code
+        elif supplier:
+            stock_status = self._get_stock_status(supplier, shop_product.product_id)
+            if stock_status.error:
+                yield "stock_error"
+            backorder_maximum = shop_product.backorder_maximum
+            if supplier.stock_managed and backorder_maximum is not None:
+                if quantity > stock_status.logical_count + backorder_maximum:
+                    yield "stock_insufficient"
+
+        purchase_multiple = shop_product.purchase_multiple
+        if quantity > 0 and purchase_multiple > 0 and (quantity % purchase_multiple) != 0:
+            yield "invalid_purchase_multiple"
+
+    def _get_visibility_error_codes(self, shop_product):
+        if shop_product.product.deleted:
+            yield "product_deleted"
+
+        customer = self.customer
+        if customer and customer.is_all_seeing:
+            return
+
+        if not shop_product.visible:
+            yield "product_not_visible"
+
+        is_logged_in = (bool(customer) and not customer.is_anonymous)
+        if not is_logged_in and shop_product.visibility_limit != ProductVisibility.VISIBLE_TO_ALL:
+            yield "product_not_visible_to_anonymous"
+
+        if is_logged_in and shop_product.visibility_limit == ProductVisibility.VISIBLE_TO_GROUPS:
+            visibility_group_ids = set(group.pk for group in shop_product.visibility_groups.all())
+            if not (self._get_customer_group_ids() & visibility_group_ids):
+                yield "product_not_visible_to_group"
+
+    def _get_customer_group_ids(self):
+        if self._customer_group_ids is None:
+            self._customer_group_ids = set(self.customer.groups.values_list("pk", flat=True))
+        return self._customer_group_ids
+
+    def _get_stock_status(self, supplier, product_id):
+        if supplier.pk not in self._stock_statuses:
+            self._stock_statuses[supplier.pk] = supplier.get_stock_statuses(self._product_ids)
+        return self._stock_statuses[supplier.pk][product_id]
+
+
+def get_orderability_checker(shop, customer, products):
+    """
+    Get the orderability checker for the given basket products.
+
+    :type products: list[shuup.core.models.Product]
+    """
+    if settings.SHUUP_PUBLIC_API_CHECK_ORDERABILITY_IN_BULK:
+        return BulkOrderabilityChecker(shop, customer, products)
+    return ShopProductOrderabilityChecker(shop, customer)
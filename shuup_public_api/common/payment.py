@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.encoding import force_bytes
+from django.utils.timezone import now
+from shuup.core.models import PaymentUrls
+
+from ..models import PaymentCallback, PaymentJob, PaymentJobStatus
+
+LOGGER = logging.getLogger(__name__)
+
+
+def initiate_payment(order, return_url, cancel_url):
+    """
+    Initiate the payment of an order with its payment method.
+
+    :type order: shuup.core.models.Order
+    :return: URL the customer is redirected to for paying
+    :rtype: str
+    """
+    transaction_redirect = order.payment_method.get_payment_process_response(
+        order=order,
+        urls=PaymentUrls(return_url=return_url, cancel_url=cancel_url, payment_url=None)
+    )
+    return transaction_redirect.url
+
+
+def enqueue_payment_initiation(order, return_url, cancel_url):
+    """
+    Queue the payment initiation of an order for `process_payment_jobs`.
+
+    :type order: shuup.core.models.Order
+    :rtype: shuup_public_api.models.PaymentJob
+    """
+    return PaymentJob.objects.create(order=order, return_url=return_url, cancel_url=cancel_url)
+
+
+def process_payment_job(job):
+    """
+    Run a payment job unless another worker has already claimed it.
+
+    :type job: shuup_public_api.models.PaymentJob
+    :return: Whether the job was run
+    :rtype: bool
+    """
+    claimed = PaymentJob.objects.filter(pk=job.pk, status=PaymentJobStatus.PENDING).update(
+        status=PaymentJobStatus.RUNNING, modified_on=now()
+    )
+    if not claimed:
+        return False
+    job.status = PaymentJobStatus.RUNNING
+    try:
+        job.payment_url = initiate_payment(job.order, job.return_url, job.cancel_url)
+        job.status = PaymentJobStatus.SUCCEEDED
+    except Exception:
+        LOGGER.exception("Payment initiation of order %s failed", job.order_id)
+        job.error = traceback.format_exc()
+        job.status = PaymentJobStatus.FAILED
+    job.save(update_fields=("status", "payment_url", "error", "modified_on"))
+    return True
+
+
+def fail_stale_payment_jobs():
+    """
+    Mark the payment jobs running for longer than ``SHUUP_PUBLIC_API_PAYMENT_JOB_TIMEOUT`` failed.
+
+    The worker running them has died. They are not run again, as the
+    payment may already have been initiated with the payment provider.
+
+    :return: Number of jobs marked failed
+    :rtype: int
+    """
+    deadline = now() - timedelta(seconds=settings.SHUUP_PUBLIC_API_PAYMENT_JOB_TIMEOUT)
+    failed = PaymentJob.objects.filter(status=PaymentJobStatus.RUNNING, modified_on__lt=deadline).update(
+        status=PaymentJobStatus.FAILED, error="The payment initiation timed out.", modified_on=now()
+    )
+    if failed:
+        LOGGER.warning("Marked %d timed out payment jobs failed", failed)
+    return failed
+
+
+def process_pending_payment_jobs(limit=None):
+    """
+    Run the pending payment jobs in the order they were created.
+
+    Jobs left running by a dead worker are marked failed first.
+
+    :param limit: Maximum number of jobs to run
+    :type limit: int|None
+    :return: Number of jobs run
+    :rtype: int
+    """
+    fail_stale_payment_jobs()
+    jobs = PaymentJob.objects.filter(status=PaymentJobStatus.PENDING).order_by("created_on").select_related(
+        "order", "order__shop", "order__payment_method", "order__payment_method__payment_processor"
+    )
+    if limit:
+        jobs = jobs[:limit]
+    return sum(1 for job in jobs if process_payment_job(job))
+
+
+class PaymentCallbackInProgress(Exception):
+    pass
+
+
+def get_payment_callback_key(order, request):
+    """
+    Get the key identifying duplicates of a payment return request.
+
+    The key is made of the order, its payment processor and either the
+    ``Idempotency-Key`` header or, without one, the request body.
+
+    :type order: shuup.core.models.Order
+    :rtype: str
+    """
+    payment_method = order.payment_method
+    idempotency_key = request.META.get("HTTP_IDEMPOTENCY_KEY")
+    parts = (
+        order.key,
+        (payment_method.payment_processor_id if payment_method else None),
+        (force_bytes(idempotency_key) if idempotency_key else request.body),
+    )
+    return hashlib.sha1(force_bytes(repr(parts))).hexdigest()
+
+
+def process_payment_callback(order, request, key):
+    """
+    Process a payment return request unless it is a duplicate.
+
+    The first request with the key claims it by inserting a
+    `PaymentCallback` row. Duplicates of a completed callback are
+    answered right away, duplicates of one still being processed are
+    rejected right away instead of holding a worker while they wait.
+    Failed callbacks release the key so the provider can retry them.
+
+    :type order: shuup.core.models.Order
+    :return: Whether the request was processed, False for duplicates
+    :rtype: bool
+    :raises: `PaymentCallbackInProgress` if a duplicate is still being processed
+    """
+    try:
+        with transaction.atomic():
+            callback = PaymentCallback.objects.create(key=key, order=order)
+    except IntegrityError:
+        _check_payment_callback(key)
+        return False
+
+    try:
+        order.payment_method.process_payment_return_request(order=order, request=request)
+    except Exception:
+        callback.delete()
+        raise
+    PaymentCallback.objects.filter(pk=callback.pk).update(completed=True, completed_on=now())
+    return True
+
+
+def _check_payment_callback(key):
+    callback = PaymentCallback.objects.filter(key=key).values_list("completed", "created_on").first()
+    if callback is None:  # The first request failed
+        raise PaymentCallbackInProgress()
+    (completed, created_on) = callback
+    if completed:
+        return
+    if created_on < now() - timedelta(seconds=settings.SHUUP_PUBLIC_API_PAYMENT_CALLBACK_LOCK_TIMEOUT):
+        # The process handling the first request has died, release the key
+        PaymentCallback.objects.filter(key=key, completed=False).delete()
+    raise PaymentCallbackInProgress()
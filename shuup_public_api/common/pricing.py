@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+
+import six
+from django.conf import settings
+
+_price_cache = OrderedDict()
+_price_cache_lock = threading.Lock()
+
+
+def get_price_info(pricing_context, product, quantity, customer_key, catalog_version):
+    """
+    Get the price info of a product, shared between baskets of the same customers.
+
+    Price infos are kept in a process-wide LRU cache of at most
+    ``SHUUP_PUBLIC_API_PRICE_CACHE_SIZE`` entries for
+    ``SHUUP_PUBLIC_API_PRICE_CACHE_TIMEOUT`` seconds. Keys include the
+    catalog version of the shop, so changes to prices and campaigns
+    invalidate them.
+
+    :type pricing_context: shuup.core.pricing.PricingContext
+    :type product: shuup.core.models.Product
+    :param customer_key: Key of the customers getting the same prices
+    :param catalog_version: Catalog version of the shop of the context
+    :rtype: shuup.core.pricing.PriceInfo
+    """
+    key = (pricing_context.shop.pk, customer_key, product.pk, six.text_type(quantity), catalog_version)
+    current_time = time.time()
+    with _price_cache_lock:
+        entry = _price_cache.get(key)
+        if entry is not None:
+            (price_info, expires_at) = entry
+            if expires_at > current_time:
+                _price_cache[key] = _price_cache.pop(key)  # Most recently used last
+                return price_info
+            del _price_cache[key]
+
+    price_info = product.get_price_info(pricing_context, quantity=quantity)
+    expires_at = current_time + settings.SHUUP_PUBLIC_API_PRICE_CACHE_TIMEOUT
+    if price_info.expires_on:
+        expires_at = min(expires_at, price_info.expires_on)
+    with _price_cache_lock:
+        _price_cache[key] = (price_info, expires_at)
+        while len(_price_cache) > settings.SHUUP_PUBLIC_API_PRICE_CACHE_SIZE:
+            _price_cache.popitem(last=False)
+    return price_info
+
+
+def clear_price_cache():
+    with _price_cache_lock:
+        _price_cache.clear()
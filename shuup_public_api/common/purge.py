@@ -0,0 +1,160 @@
+import time
+
+from django.db import transaction
+from django.utils.timezone import now
+from shuup.front.models import StoredBasket
+
+from ..models import BasketCheckout, BasketRevision, PaymentCallback, PaymentJob, PaymentJobStatus
+from .basket import API_BASKET_KEY_REGEX, get_storage
+
+
+class BasketPurgeStats(object):
+    def __init__(self):
+        self.purged = 0
+        self.archived = 0
+        self.records_purged = 0
+        self.batches = 0
+        self.started_on = time.time()
+        self.duration = 0
+
+    @property
+    def rate(self):
+        """
+        Baskets purged or archived per second.
+
+        :rtype: float
+        """
+        if not self.duration:
+            return 0.0
+        return (self.purged + self.archived) / self.duration
+
+
+def _iterate_batches(queryset, batch_size):
+    """
+    Yield the primary keys and keys of the matching baskets a batch at a time.
+
+    Every batch is fetched with a fresh query, so the handled baskets
+    must no longer match the queryset.
+    """
+    queryset = queryset.order_by("pk")
+    while True:
+        batch = list(queryset.values_list("pk", "key")[:batch_size])
+        if not batch:
+            return
+        yield batch
+
+
+def _iterate_record_batches(queryset, batch_size):
+    """
+    Yield the primary keys of the matching records a batch at a time.
+    """
+    queryset = queryset.order_by("pk")
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+
+
+def _purge_batch(pks, keys):
+    products_field = StoredBasket._meta.get_field("products")
+    through = products_field.rel.through
+    with transaction.atomic():
+        through.objects.filter(**{"%s__in" % products_field.m2m_field_name(): pks}).delete()
+        StoredBasket.objects.filter(pk__in=pks).delete()
+        BasketRevision.objects.filter(basket_key__in=keys).delete()
+
+
+def _archive_batch(pks):
+    products_field = StoredBasket._meta.get_field("products")
+    through = products_field.rel.through
+    with transaction.atomic():
+        through.objects.filter(**{"%s__in" % products_field.m2m_field_name(): pks}).delete()
+        StoredBasket.objects.filter(pk__in=pks).update(deleted=True)
+
+
+def _finish_batch(stats, progress, batch_delay):
+    stats.batches += 1
+    stats.duration = time.time() - stats.started_on
+    if progress:
+        progress(stats)
+    if batch_delay:
+        time.sleep(batch_delay)
+
+
+def purge_baskets(abandoned_age, deleted_age, finished_age, archive=False, batch_size=1000,
+                  batch_delay=0, progress=None, callback_age=None, checkout_age=None, payment_job_age=None):
+    """
+    Remove old stored baskets and the records of their checkouts and payments in batches.
+
+    Only baskets created through the API are purged. Finished and
+    deleted baskets not updated within their ages are deleted. Active
+    baskets not saved as persistent and not updated within
+    ``abandoned_age`` are deleted too or, when archiving, marked deleted
+    and stripped of their product relations, so a later run purges
+    them. Processed payment callbacks, checkout idempotency records and
+    completed payment jobs older than their ages are deleted as well.
+    Every batch runs in a transaction of its own to keep the locks short.
+
+    :param abandoned_age: Age of abandoned baskets to purge or None to keep them
+    :type abandoned_age: datetime.timedelta|None
+    :param deleted_age: Age of deleted baskets to purge or None to keep them
+    :type deleted_age: datetime.timedelta|None
+    :param finished_age: Age of checked out baskets to purge or None to keep them
+    :type finished_age: datetime.timedelta|None
+    :param batch_delay: Seconds to sleep between batches
+    :param progress: Callable called with the stats after every batch
+    :param callback_age: Age of payment callbacks to purge or None to keep them
+    :type callback_age: datetime.timedelta|None
+    :param checkout_age: Age of checkout idempotency records to purge or None to keep them
+    :type checkout_age: datetime.timedelta|None
+    :param payment_job_age: Age of succeeded and failed payment jobs to purge or None to keep them
+    :type payment_job_age: datetime.timedelta|None
+    :rtype: BasketPurgeStats
+    """
+    stats = BasketPurgeStats()
+    storage = get_storage()
+    current_time = now()
+    baskets = StoredBasket.objects.filter(key__regex=API_BASKET_KEY_REGEX)
+    querysets = []
+    if finished_age is not None:
+        querysets.append((baskets.filter(
+            finished=True, updated_on__lt=current_time - finished_age), False))
+    if deleted_age is not None:
+        querysets.append((baskets.filter(
+            deleted=True, finished=False, updated_on__lt=current_time - deleted_age), False))
+    if abandoned_age is not None:
+        querysets.append((baskets.filter(
+            deleted=False, finished=False, persistent=False, updated_on__lt=current_time - abandoned_age), archive))
+
+    for queryset, archive_batch in querysets:
+        for batch in _iterate_batches(queryset, batch_size):
+            pks = [pk for (pk, key) in batch]
+            keys = [key for (pk, key) in batch]
+            if archive_batch:
+                _archive_batch(pks)
+                stats.archived += len(batch)
+            else:
+                _purge_batch(pks, keys)
+                stats.purged += len(batch)
+            storage.evict(keys)
+            _finish_batch(stats, progress, batch_delay)
+
+    record_querysets = []
+    if callback_age is not None:
+        record_querysets.append(PaymentCallback.objects.filter(created_on__lt=current_time - callback_age))
+    if checkout_age is not None:
+        record_querysets.append(BasketCheckout.objects.filter(created_on__lt=current_time - checkout_age))
+    if payment_job_age is not None:
+        record_querysets.append(PaymentJob.objects.filter(
+            status__in=(PaymentJobStatus.SUCCEEDED, PaymentJobStatus.FAILED),
+            modified_on__lt=current_time - payment_job_age))
+
+    for queryset in record_querysets:
+        for pks in _iterate_record_batches(queryset, batch_size):
+            with transaction.atomic():
+                queryset.model.objects.filter(pk__in=pks).delete()
+            stats.records_purged += len(pks)
+            _finish_batch(stats, progress, batch_delay)
+    stats.duration = time.time() - stats.started_on
+    return stats
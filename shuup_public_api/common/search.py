@@ -0,0 +1,175 @@
+import bisect
+import itertools
+import re
+
+from django.conf import settings
+from django.db import connection
+from shuup.core.models import Product
+
+from ..models import ProductSearchWord
+from .versions import bump_search_version, get_search_version
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+#: Words are cut to the length of `ProductSearchWord.word`, in the index
+#: and in queries alike, so both search paths match the same products.
+MAX_WORD_LENGTH = 64
+
+_product_name_index = {}
+
+
+def tokenize(text):
+    """
+    Split a text into lower case words.
+
+    :type text: str
+    :rtype: list[str]
+    """
+    return [word[:MAX_WORD_LENGTH] for word in _WORD_RE.findall((text or "").lower())]
+
+
+def use_in_process_search_index():
+    """
+    :rtype: bool
+    """
+    setting = settings.SHUUP_PUBLIC_API_IN_PROCESS_SEARCH_INDEX
+    if setting is None:
+        return (connection.vendor == "sqlite")
+    return bool(setting)
+
+
+def _build_product_name_index():
+    translations = Product._parler_meta.root_model.objects.values_list("master_id", "name")
+    return _index_product_names(translations.iterator())
+
+
+def _index_product_names(product_names):
+    product_ids_by_word = {}
+    for product_id, name in product_names:
+        for word in tokenize(name):
+            product_ids_by_word.setdefault(word, set()).add(product_id)
+    return {
+        "words": sorted(product_ids_by_word),
+        "product_ids_by_word": product_ids_by_word,
+    }
+
+
+def _get_product_name_index():
+    version = get_search_version()
+    index = _product_name_index.get(version)
+    if index is None:
+        # Build the index before publishing it, so concurrent searches
+        # only ever see a complete index
+        index = _build_product_name_index()
+        _product_name_index.clear()
+        _product_name_index[version] = index
+    return index
+
+
+def search_product_ids(query):
+    """
+    Get the ids of the products whose name in any language contains
+    words starting with every word of the query.
+
+    The index is built per process for the current search version, which
+    is shared by all processes through the Django cache and bumped whenever
+    products or their translations are saved or deleted.
+
+    :type query: str
+    :rtype: set[int]
+    """
+    return _search_index(_get_product_name_index(), query)
+
+
+def _search_index(name_index, query):
+    words = name_index["words"]
+    product_ids_by_word = name_index["product_ids_by_word"]
+
+    product_ids = None
+    for query_word in tokenize(query):
+        matches = set()
+        index = bisect.bisect_left(words, query_word)
+        while index < len(words) and words[index].startswith(query_word):
+            matches.update(product_ids_by_word[words[index]])
+            index += 1
+        product_ids = (matches if product_ids is None else product_ids & matches)
+        if not product_ids:
+            break
+    return (product_ids or set())
+
+
+def clear_product_search_index():
+    bump_search_version()
+    _product_name_index.clear()
+
+
+def get_product_search_queries(query):
+    """
+    Get the queries of the ids of the products with a name word starting with each word of the query.
+
+    Products in all of the queries match the query, like the products
+    returned by `search_product_ids`. The words are looked up by their
+    prefix from `ProductSearchWord`, whose word index serves prefix
+    lookups: Django adds a ``varchar_pattern_ops`` index for it on
+    PostgreSQL and MySQL serves case insensitive ``LIKE`` prefixes
+    from its index.
+
+    :type query: str
+    :rtype: list[django.db.models.QuerySet]
+    """
+    lookup = ("word__istartswith" if connection.vendor == "mysql" else "word__startswith")
+    return [
+        ProductSearchWord.objects.filter(**{lookup: word}).values("product_id")
+        for word in tokenize(query)
+    ]
+
+
+def update_product_search_words(product_id):
+    """
+    Write the words of the names of the given product to `ProductSearchWord`.
+
+    :type product_id: int
+    """
+    names = Product._parler_meta.root_model.objects.filter(master_id=product_id).values_list("name", flat=True)
+    words = set(word for name in names for word in tokenize(name))
+    stored_words = set(ProductSearchWord.objects.filter(product_id=product_id).values_list("word", flat=True))
+    removed_words = (stored_words - words)
+    if removed_words:
+        ProductSearchWord.objects.filter(product_id=product_id, word__in=removed_words).delete()
+    ProductSearchWord.objects.bulk_create([
+        ProductSearchWord(product_id=product_id, word=word) for word in sorted(words - stored_words)
+    ])
+
+
+def iterate_product_search_words(product_names):
+    """
+    Get the distinct words of the names of each product.
+
+    :param product_names: Pairs of product id and name, ordered by the product id
+    :return: Iterable of product id and word pairs
+    """
+    for product_id, names in itertools.groupby(product_names, key=lambda product_name: product_name[0]):
+        for word in sorted(set(word for (_, name) in names for word in tokenize(name))):
+            yield (product_id, word)
+
+
+def rebuild_product_search_words(batch_size=500):
+    """
+    Write the words of the names of all products to `ProductSearchWord` from scratch.
+
+    :return: Number of words written
+    :rtype: int
+    """
+    ProductSearchWord.objects.all().delete()
+    translations = Product._parler_meta.root_model.objects.order_by("master_id").values_list("master_id", "name")
+    search_words = iterate_product_search_words(translations.iterator())
+    count = 0
+    while True:
+        batch = [
+            ProductSearchWord(product_id=product_id, word=word)
+            for (product_id, word) in itertools.islice(search_words, batch_size)
+        ]
+        if not batch:
+            return count
+        ProductSearchWord.objects.bulk_create(batch)
+        count += len(batch)
@@ -0,0 +1,34 @@
+from shuup.core.models import Shop
+
+from .versions import bump_shop_version, get_shop_version
+
+_shop_cache = {}
+
+
+def get_shop_by_identifier(identifier):
+    """
+    Get a shop by its identifier.
+
+    Shops are cached per process for the current shop version, which is
+    shared by all processes through the Django cache and bumped whenever
+    a shop is saved or deleted.
+
+    :type identifier: str
+    :rtype: shuup.core.models.Shop
+    :raises: `Shop.DoesNotExist` if there is no shop with the given identifier
+    """
+    version = get_shop_version()
+    shops = _shop_cache.get(version)
+    if shops is None:
+        _shop_cache.clear()
+        shops = _shop_cache.setdefault(version, {})
+    shop = shops.get(identifier)
+    if shop is None:
+        shop = Shop.objects.get(identifier=identifier)
+        shops[identifier] = shop
+    return shop
+
+
+def clear_shop_cache():
+    bump_shop_version()
+    _shop_cache.clear()
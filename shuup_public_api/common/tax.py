@@ -0,0 +1,78 @@
+from shuup.core.taxing.utils import calculate_compounded_added_taxes
+from shuup.default_tax.module import _get_enabled_tax_rules, DefaultTaxModule, get_taxes_of_effective_rules
+
+from .versions import bump_tax_version, get_tax_version
+
+_tax_class_cache = {}
+_tax_groups_cache = {}
+
+
+def get_rendered_tax_class(tax_class, render):
+    """
+    Get the rendered representation of a tax class.
+
+    Representations are cached per process for the current tax version,
+    which is shared by all processes through the Django cache and bumped
+    whenever tax classes, taxes or tax rules change.
+
+    :type tax_class: shuup.core.models.TaxClass
+    :param render: Callable rendering the tax class if it is not cached
+    :rtype: dict
+    """
+    version = get_tax_version()
+    representations = _tax_class_cache.get(version)
+    if representations is None:
+        _tax_class_cache.clear()
+        representations = _tax_class_cache.setdefault(version, {})
+    representation = representations.get(tax_class.pk)
+    if representation is None:
+        representation = render(tax_class)
+        representations[tax_class.pk] = representation
+    return representation
+
+
+def get_tax_groups(taxing_context, tax_class):
+    """
+    Get the taxes of the effective default tax rules, grouped by priority.
+
+    Tax groups are cached per process for the current tax version and the
+    parts of the taxing context the tax rules match on, so the rules are
+    looked up once per tax class rather than once per basket line.
+
+    :type taxing_context: shuup.core.taxing.TaxingContext
+    :type tax_class: shuup.core.models.TaxClass
+    :rtype: list[list[shuup.core.models.Tax]]
+    """
+    version = get_tax_version()
+    tax_groups_by_key = _tax_groups_cache.get(version)
+    if tax_groups_by_key is None:
+        _tax_groups_cache.clear()
+        tax_groups_by_key = _tax_groups_cache.setdefault(version, {})
+    key = (
+        tax_class.pk,
+        getattr(taxing_context.customer_tax_group, "pk", None),
+        taxing_context.country_code,
+        taxing_context.region_code,
+        taxing_context.postal_code,
+    )
+    tax_groups = tax_groups_by_key.get(key)
+    if tax_groups is None:
+        tax_rules = _get_enabled_tax_rules(taxing_context, tax_class).select_related("tax")
+        tax_groups = get_taxes_of_effective_rules(taxing_context, tax_rules)
+        tax_groups_by_key[key] = tax_groups
+    return tax_groups
+
+
+class CachedDefaultTaxModule(DefaultTaxModule):
+    """
+    Default tax module taking the tax groups from `get_tax_groups`.
+    """
+
+    def get_taxed_price(self, context, price, tax_class):
+        return calculate_compounded_added_taxes(price, get_tax_groups(context, tax_class))
+
+
+def clear_tax_class_cache():
+    bump_tax_version()
+    _tax_class_cache.clear()
+    _tax_groups_cache.clear()
@@ -0,0 +1,67 @@
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from shuup.core.models import Order
+from shuup.front.models import StoredBasket
+
+from ..models import BasketCheckout
+
+
+def run_atomic_with_retry(func, *args, **kwargs):
+    """
+    Run a function in a transaction and retry it on lock and serialization failures.
+
+    Databases report deadlocks, lock wait timeouts and serialization
+    failures as `OperationalError`. The function is retried at most
+    ``SHUUP_PUBLIC_API_TRANSACTION_RETRIES`` times with exponential
+    backoff. Inside an outer transaction the function only runs once,
+    as retrying can't help there.
+    """
+    retries = settings.SHUUP_PUBLIC_API_TRANSACTION_RETRIES
+    if transaction.get_connection().in_atomic_block:
+        retries = 0
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError:
+            if attempt >= retries:
+                raise
+        delay = settings.SHUUP_PUBLIC_API_TRANSACTION_RETRY_DELAY * (2 ** attempt)
+        time.sleep(delay * (0.5 + random.random() / 2))
+        attempt += 1
+
+
+def lock_stored_basket(key):
+    """
+    Lock the stored basket row with the given key until the end of the transaction.
+
+    :type key: str
+    """
+    list(StoredBasket.objects.select_for_update().filter(key=key).values_list("pk", flat=True))
+
+
+def get_checkout_order(basket_key, idempotency_key):
+    """
+    Get the order created by an earlier checkout with the idempotency key.
+
+    :type basket_key: str
+    :type idempotency_key: str
+    :rtype: shuup.core.models.Order|None
+    """
+    return Order.objects.filter(
+        pk__in=BasketCheckout.objects.filter(
+            basket_key=basket_key, idempotency_key=idempotency_key).values("order_id")
+    ).first()
+
+
+def record_checkout(basket_key, idempotency_key, order):
+    """
+    :type basket_key: str
+    :type idempotency_key: str
+    :type order: shuup.core.models.Order
+    """
+    BasketCheckout.objects.create(basket_key=basket_key, idempotency_key=idempotency_key, order=order)
@@ -0,0 +1,169 @@
+import time
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = "shuup_public_api:catalog_version"
+SHOP_CATALOG_VERSION_KEY = "shuup_public_api:catalog_version:%s"
+PRODUCTS_VERSION_KEY = "shuup_public_api:product_version"
+PRODUCT_VERSION_KEY = "shuup_public_api:product_version:%s"
+STOCKS_VERSION_KEY = "shuup_public_api:stock_version"
+STOCK_VERSION_KEY = "shuup_public_api:stock_version:%s"
+SHOP_VERSION_KEY = "shuup_public_api:shop_version"
+TAX_VERSION_KEY = "shuup_public_api:tax_version"
+SEARCH_VERSION_KEY = "shuup_public_api:search_version"
+
+
+def _get_initial_version():
+    # Versions restart from the current time, so a lost cache entry
+    # never brings back a version clients have already seen.
+    return int(time.time() * 1000)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _get_initial_version(), timeout=None)
+
+
+def _get_many(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = _get_initial_version()
+            if not cache.add(key, versions[key], timeout=None):
+                versions[key] = cache.get(key, versions[key])
+    return versions
+
+
+def bump_catalog_version(shop_id=None):
+    """
+    Bump the catalog version of the given shop or, without a shop, of all shops.
+
+    :type shop_id: int|None
+    """
+    _bump(SHOP_CATALOG_VERSION_KEY % shop_id if shop_id else CATALOG_VERSION_KEY)
+
+
+def get_catalog_version(shop_id):
+    """
+    Get the catalog version of the given shop.
+
+    The version changes whenever products, categories, taxes or the
+    payment and shipping methods change.
+
+    :type shop_id: int
+    :rtype: str
+    """
+    keys = [CATALOG_VERSION_KEY, SHOP_CATALOG_VERSION_KEY % shop_id]
+    versions = _get_many(keys)
+    return "%s.%s" % tuple(versions[key] for key in keys)
+
+
+def bump_product_version(product_id=None):
+    """
+    Bump the version of the given product or, without a product, of all products.
+
+    :type product_id: int|None
+    """
+    _bump(PRODUCT_VERSION_KEY % product_id if product_id else PRODUCTS_VERSION_KEY)
+
+
+def get_product_versions(product_ids):
+    """
+    Get the versions of the given products.
+
+    A product version changes whenever the product, its shop products,
+    media, attributes, package links or the taxes change.
+
+    :type product_ids: Iterable[int]
+    :return: Dict of product id to version
+    :rtype: dict[int, str]
+    """
+    return _get_product_versions(PRODUCTS_VERSION_KEY, PRODUCT_VERSION_KEY, product_ids)
+
+
+def _get_product_versions(all_key, key_pattern, product_ids):
+    keys = dict((product_id, key_pattern % product_id) for product_id in product_ids)
+    versions = _get_many([all_key] + list(keys.values()))
+    return dict(
+        (product_id, "%s.%s" % (versions[all_key], versions[key]))
+        for (product_id, key) in keys.items()
+    )
+
+
+def bump_stock_version(product_id=None):
+    """
+    Bump the stock version of the given product or, without a product, of all products.
+
+    :type product_id: int|None
+    """
+    _bump(STOCK_VERSION_KEY % product_id if product_id else STOCKS_VERSION_KEY)
+
+
+def get_stock_versions(product_ids):
+    """
+    Get the stock versions of the given products.
+
+    A stock version changes whenever the stock of the product or of
+    the children of the package changes, or the suppliers change.
+
+    :type product_ids: Iterable[int]
+    :return: Dict of product id to stock version
+    :rtype: dict[int, str]
+    """
+    return _get_product_versions(STOCKS_VERSION_KEY, STOCK_VERSION_KEY, product_ids)
+
+
+def bump_shop_version():
+    """
+    Bump the version of the shops.
+    """
+    _bump(SHOP_VERSION_KEY)
+
+
+def get_shop_version():
+    """
+    Get the version of the shops.
+
+    The version changes whenever a shop is saved or deleted.
+
+    :rtype: int
+    """
+    return _get_many([SHOP_VERSION_KEY])[SHOP_VERSION_KEY]
+
+
+def bump_tax_version():
+    """
+    Bump the version of the taxes.
+    """
+    _bump(TAX_VERSION_KEY)
+
+
+def get_tax_version():
+    """
+    Get the version of the taxes.
+
+    The version changes whenever tax classes, taxes or tax rules change.
+
+    :rtype: int
+    """
+    return _get_many([TAX_VERSION_KEY])[TAX_VERSION_KEY]
+
+
+def bump_search_version():
+    """
+    Bump the version of the product search index.
+    """
+    _bump(SEARCH_VERSION_KEY)
+
+
+def get_search_version():
+    """
+    Get the version of the product search index.
+
+    The version changes whenever products or their translations change.
+
+    :rtype: int
+    """
+    return _get_many([SEARCH_VERSION_KEY])[SEARCH_VERSION_KEY]
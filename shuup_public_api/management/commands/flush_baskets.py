@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shuup_public_api.common.basket import flush_baskets
+
+
+class Command(BaseCommand):
+    help = "Write basket changes kept only in the basket cache through to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of baskets flushed at a time.")
+
+    def handle(self, *args, **options):
+        flushed = flush_baskets(batch_size=options["batch_size"])
+        self.stdout.write("Flushed %d baskets" % flushed)
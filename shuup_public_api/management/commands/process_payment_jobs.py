@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shuup_public_api.common.payment import process_pending_payment_jobs
+
+
+class Command(BaseCommand):
+    help = "Run the queued payment initiations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Maximum number of jobs run at a time.")
+        parser.add_argument(
+            "--interval", type=float, default=None,
+            help="Keep running and look for new jobs every given number of seconds."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_payment_jobs(limit=options["limit"])
+            if options["verbosity"] > 1 or (processed and not options["interval"]):
+                self.stdout.write("Processed %d payment jobs" % processed)
+            if not options["interval"]:
+                return
+            if not processed:
+                time.sleep(options["interval"])
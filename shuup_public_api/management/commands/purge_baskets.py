@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shuup_public_api.common.purge import purge_baskets
+
+
+class Command(BaseCommand):
+    help = "Purge old abandoned, deleted and checked out baskets and old checkout and payment records."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--abandoned-days", type=int, default=settings.SHUUP_PUBLIC_API_ABANDONED_BASKET_AGE_DAYS,
+            help="Age in days of the abandoned baskets to purge."
+        )
+        parser.add_argument(
+            "--deleted-days", type=int, default=settings.SHUUP_PUBLIC_API_DELETED_BASKET_AGE_DAYS,
+            help="Age in days of the deleted baskets to purge."
+        )
+        parser.add_argument(
+            "--finished-days", type=int, default=settings.SHUUP_PUBLIC_API_FINISHED_BASKET_AGE_DAYS,
+            help="Age in days of the checked out baskets to purge."
+        )
+        parser.add_argument(
+            "--callback-days", type=int, default=settings.SHUUP_PUBLIC_API_PAYMENT_CALLBACK_AGE_DAYS,
+            help="Age in days of the payment callbacks to purge."
+        )
+        parser.add_argument(
+            "--checkout-days", type=int, default=settings.SHUUP_PUBLIC_API_BASKET_CHECKOUT_AGE_DAYS,
+            help="Age in days of the checkout idempotency records to purge."
+        )
+        parser.add_argument(
+            "--payment-job-days", type=int, default=settings.SHUUP_PUBLIC_API_PAYMENT_JOB_AGE_DAYS,
+            help="Age in days of the succeeded and failed payment jobs to purge."
+        )
+        parser.add_argument(
+            "--archive", action="store_true", default=False,
+            help="Mark abandoned baskets deleted instead of purging them."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of baskets purged at a time.")
+        parser.add_argument(
+            "--batch-delay", type=float, default=0, help="Seconds to sleep between batches."
+        )
+
+    def handle(self, *args, **options):
+        def get_age(days):
+            return (timedelta(days=days) if days is not None else None)
+
+        def report(stats):
+            if options["verbosity"] > 1:
+                self.stdout.write("%d purged, %d archived (%.1f baskets/s)" % (
+                    stats.purged, stats.archived, stats.rate))
+
+        stats = purge_baskets(
+            abandoned_age=get_age(options["abandoned_days"]),
+            deleted_age=get_age(options["deleted_days"]),
+            finished_age=get_age(options["finished_days"]),
+            callback_age=get_age(options["callback_days"]),
+            checkout_age=get_age(options["checkout_days"]),
+            payment_job_age=get_age(options["payment_job_days"]),
+            archive=options["archive"],
+            batch_size=options["batch_size"],
+            batch_delay=options["batch_delay"],
+            progress=report
+        )
+        self.stdout.write(
+            "Purged %d and archived %d baskets and purged %d records in %d batches, %.1f seconds (%.1f baskets/s)" % (
+                stats.purged, stats.archived, stats.records_purged, stats.batches, stats.duration, stats.rate))
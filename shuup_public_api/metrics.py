@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import six
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_local = threading.local()
+
+
+class Histogram(object):
+    """
+    Cumulative histogram of observed values per label set, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    values["buckets"][index] += 1
+            values["sum"] += value
+            values["count"] += 1
+
+    def render(self):
+        """
+        :rtype: list[str]
+        """
+        lines = [
+            "# HELP %s %s" % (self.name, self.help_text),
+            "# TYPE %s histogram" % self.name,
+        ]
+        with self._lock:
+            for labels, values in self._values.items():
+                label_pairs = list(zip(self.label_names, labels))
+                for bucket, count in zip(self.buckets, values["buckets"]):
+                    lines.append("%s_bucket%s %d" % (self.name, _format_labels(label_pairs + [("le", bucket)]), count))
+                lines.append("%s_bucket%s %d" % (
+                    self.name, _format_labels(label_pairs + [("le", "+Inf")]), values["count"]))
+                lines.append("%s_sum%s %r" % (self.name, _format_labels(label_pairs), values["sum"]))
+                lines.append("%s_count%s %d" % (self.name, _format_labels(label_pairs), values["count"]))
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _format_labels(label_pairs):
+    if not label_pairs:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"' % (name, six.text_type(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for (name, value) in label_pairs
+    )
+
+
+REQUEST_DURATION = Histogram(
+    "shuup_public_api_request_duration_seconds", "Time spent handling requests.",
+    ["route", "method"], DURATION_BUCKETS)
+DB_QUERIES = Histogram(
+    "shuup_public_api_db_queries", "Database queries run per request.",
+    ["route", "method"], COUNT_BUCKETS)
+DB_DURATION = Histogram(
+    "shuup_public_api_db_duration_seconds", "Time spent in database queries per request.",
+    ["route", "method"], DURATION_BUCKETS)
+STAGE_DURATION = Histogram(
+    "shuup_public_api_stage_duration_seconds",
+    "Time spent per request in serializers and in loading, checking, pricing and saving baskets.",
+    ["route", "method", "stage"], DURATION_BUCKETS)
+
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, STAGE_DURATION]
+
+
+def is_enabled():
+    """
+    :rtype: bool
+    """
+    return settings.SHUUP_PUBLIC_API_METRICS_ENABLED
+
+
+def can_read_metrics(request):
+    """
+    Whether the request may read the collected metrics.
+
+    Staff users, the addresses in `SHUUP_PUBLIC_API_METRICS_ALLOWED_IPS`
+    and requests authorized with the bearer token in
+    `SHUUP_PUBLIC_API_METRICS_TOKEN` may.
+
+    :type request: django.http.HttpRequest
+    :rtype: bool
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    if request.META.get("REMOTE_ADDR") in settings.SHUUP_PUBLIC_API_METRICS_ALLOWED_IPS:
+        return True
+    token = settings.SHUUP_PUBLIC_API_METRICS_TOKEN
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(token) and constant_time_compare(authorization, "Bearer %s" % token)
+
+
+def start_request():
+    """
+    Start collecting the stage durations and database queries of a request in this thread.
+    """
+    _local.stages = {}
+    _local.active_stages = set()
+    _local.queries = [0, 0.0]
+
+
+def finish_request():
+    """
+    Stop collecting the stage durations and database queries of the request in this thread.
+
+    :return: Dict of stage name to the seconds spent in it, the number
+      of database queries and the seconds spent in them
+    :rtype: (dict[str, float], int, float)
+    """
+    stages = getattr(_local, "stages", None)
+    (query_count, query_duration) = (getattr(_local, "queries", None) or (0, 0.0))
+    _local.stages = None
+    _local.active_stages = None
+    _local.queries = None
+    return ((stages or {}), query_count, query_duration)
+
+
+class QueryCountingCursor(object):
+    """
+    Cursor wrapper adding the queries it runs to the request collected in this thread.
+
+    Unlike the debug cursor of Django it keeps no query log.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _counted(self, method, *args):
+        start = time.time()
+        try:
+            return method(*args)
+        finally:
+            queries = getattr(_local, "queries", None)
+            if queries is not None:
+                queries[0] += 1
+                queries[1] += time.time() - start
+
+    def callproc(self, procname, params=None):
+        return self._counted(self.cursor.callproc, procname, params)
+
+    def execute(self, sql, params=None):
+        return self._counted(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self._counted(self.cursor.executemany, sql, param_list)
+
+
+def count_queries(connection):
+    """
+    Make the cursors of the database connection count their queries.
+
+    Connections are local to their thread and counting is only enabled
+    once per connection.
+
+    :type connection: django.db.backends.base.base.BaseDatabaseWrapper
+    """
+    if getattr(connection, "_public_api_counts_queries", False):
+        return
+    (make_cursor, make_debug_cursor) = (connection.make_cursor, connection.make_debug_cursor)
+    connection.make_cursor = lambda cursor: QueryCountingCursor(make_cursor(cursor))
+    connection.make_debug_cursor = lambda cursor: QueryCountingCursor(make_debug_cursor(cursor))
+    connection._public_api_counts_queries = True
+
+
+@contextmanager
+def timed(stage):
+    """
+    Add the time spent in the block to the given stage of the current request.
+
+    Outside of a collected request and inside a block of the same stage
+    this does nothing, so stages are never counted twice.
+
+    :type stage: str
+    """
+    stages = getattr(_local, "stages", None)
+    if stages is None or stage in _local.active_stages:
+        yield
+        return
+    _local.active_stages.add(stage)
+    start = time.time()
+    try:
+        yield
+    finally:
+        stages[stage] = stages.get(stage, 0.0) + (time.time() - start)
+        _local.active_stages.discard(stage)
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    :rtype: str
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def clear_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+class TimedSerializerMixin(object):
+    """
+    Record the time spent rendering a serializer as the ``serializer`` stage of the request.
+    """
+
+    def to_representation(self, instance):
+        with timed("serializer"):
+            return super(TimedSerializerMixin, self).to_representation(instance)
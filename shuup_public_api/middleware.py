@@ -0,0 +1,44 @@
+import time
+
+from django.db import connections
+
+from . import metrics
+
+
+class PublicAPIMetricsMiddleware(object):
+    """
+    Record the latency, database queries and stage durations of the public API routes.
+
+    Database queries are counted by wrapping the cursors of the
+    connections, without keeping query logs as debug cursors do.
+    Time spent while streaming a response is not included.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not metrics.is_enabled():
+            return None
+        resolver_match = request.resolver_match
+        if not resolver_match or 'public_api' not in resolver_match.namespaces:
+            return None
+        for connection in connections.all():
+            metrics.count_queries(connection)
+        request._public_api_metrics = (resolver_match.url_name, time.time())
+        metrics.start_request()
+        return None
+
+    def process_response(self, request, response):
+        recorded = getattr(request, '_public_api_metrics', None)
+        if not recorded:
+            return response
+        (route, start) = recorded
+        del request._public_api_metrics
+        duration = time.time() - start
+        (stages, query_count, query_duration) = metrics.finish_request()
+
+        method = request.method
+        metrics.REQUEST_DURATION.observe(duration, route, method)
+        metrics.DB_QUERIES.observe(query_count, route, method)
+        metrics.DB_DURATION.observe(query_duration, route, method)
+        for stage, stage_duration in stages.items():
+            metrics.STAGE_DURATION.observe(stage_duration, route, method, stage)
+        return response
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import uuid
+
+import enumfields.fields
+from django.db import migrations, models
+
+import shuup_public_api.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuup', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentJob',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, serialize=False)),
+                ('status', enumfields.fields.EnumIntegerField(
+                    default=0, db_index=True, enum=shuup_public_api.models.PaymentJobStatus, verbose_name='status')),
+                ('return_url', models.URLField(max_length=1000, verbose_name='return URL')),
+                ('cancel_url', models.URLField(max_length=1000, verbose_name='cancel URL')),
+                ('payment_url', models.URLField(max_length=1000, blank=True, verbose_name='payment URL')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created_on', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created on')),
+                ('modified_on', models.DateTimeField(auto_now=True, verbose_name='modified on')),
+                ('order', models.ForeignKey(related_name='+', to='shuup.Order', verbose_name='order')),
+            ],
+            options={
+                'verbose_name': 'payment job',
+                'verbose_name_plural': 'payment jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuup', '0001_initial'),
+        ('shuup_public_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallback',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='key')),
+                ('completed', models.BooleanField(default=False, verbose_name='completed')),
+                ('created_on', models.DateTimeField(auto_now_add=True, verbose_name='created on')),
+                ('completed_on', models.DateTimeField(null=True, blank=True, verbose_name='completed on')),
+                ('order', models.ForeignKey(related_name='+', to='shuup.Order', verbose_name='order')),
+            ],
+            options={
+                'verbose_name': 'payment callback',
+                'verbose_name_plural': 'payment callbacks',
+            },
+        ),
+    ]
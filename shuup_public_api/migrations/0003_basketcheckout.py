@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuup', '0001_initial'),
+        ('shuup_public_api', '0002_paymentcallback'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketCheckout',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('basket_key', models.CharField(max_length=128, verbose_name='basket key')),
+                ('idempotency_key', models.CharField(max_length=255, verbose_name='idempotency key')),
+                ('created_on', models.DateTimeField(auto_now_add=True, verbose_name='created on')),
+                ('order', models.ForeignKey(related_name='+', to='shuup.Order', verbose_name='order')),
+            ],
+            options={
+                'verbose_name': 'basket checkout',
+                'verbose_name_plural': 'basket checkouts',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='basketcheckout',
+            unique_together=set([('basket_key', 'idempotency_key')]),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuup_public_api', '0003_basketcheckout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('basket_key', models.CharField(max_length=128, unique=True, verbose_name='basket key')),
+                ('revision', models.PositiveIntegerField(default=0, verbose_name='revision')),
+            ],
+            options={
+                'verbose_name': 'basket revision',
+                'verbose_name_plural': 'basket revisions',
+            },
+        ),
+    ]
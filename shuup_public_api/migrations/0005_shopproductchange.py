@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuup_public_api', '0004_basketrevision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopProductChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shop_product_id', models.IntegerField(unique=True, verbose_name='shop product id')),
+                ('shop_id', models.IntegerField(db_index=True, verbose_name='shop id')),
+                ('product_id', models.IntegerField(verbose_name='product id')),
+                ('deleted', models.BooleanField(default=False, verbose_name='deleted')),
+                ('modified_on', models.DateTimeField(auto_now=True, db_index=True, verbose_name='modified on')),
+            ],
+            options={
+                'verbose_name': 'shop product change',
+                'verbose_name_plural': 'shop product changes',
+            },
+        ),
+    ]
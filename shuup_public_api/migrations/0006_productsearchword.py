@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import itertools
+
+from django.db import migrations, models
+
+from shuup_public_api.common.search import iterate_product_search_words
+
+
+def index_product_names(apps, schema_editor):
+    ProductTranslation = apps.get_model('shuup', 'ProductTranslation')
+    ProductSearchWord = apps.get_model('shuup_public_api', 'ProductSearchWord')
+    translations = ProductTranslation.objects.order_by('master_id').values_list('master_id', 'name')
+    search_words = iterate_product_search_words(translations.iterator())
+    while True:
+        batch = [
+            ProductSearchWord(product_id=product_id, word=word)
+            for (product_id, word) in itertools.islice(search_words, 500)
+        ]
+        if not batch:
+            return
+        ProductSearchWord.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuup', '0001_initial'),
+        ('shuup_public_api', '0005_shopproductchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchWord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=64, db_index=True, verbose_name='word')),
+                ('product_id', models.IntegerField(db_index=True, verbose_name='product id')),
+            ],
+            options={
+                'verbose_name': 'product search word',
+                'verbose_name_plural': 'product search words',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='productsearchword',
+            unique_together=set([('word', 'product_id')]),
+        ),
+        migrations.RunPython(index_product_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,123 @@
+import uuid
+
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+from enumfields import Enum, EnumIntegerField
+
+
+class PaymentJobStatus(Enum):
+    PENDING = 0
+    RUNNING = 1
+    SUCCEEDED = 2
+    FAILED = 3
+
+    class Labels:
+        PENDING = _('pending')
+        RUNNING = _('running')
+        SUCCEEDED = _('succeeded')
+        FAILED = _('failed')
+
+
+class PaymentJob(models.Model):
+    """
+    Payment initiation run outside of the request by the ``process_payment_jobs`` command.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey('shuup.Order', related_name='+', on_delete=models.CASCADE, verbose_name=_('order'))
+    status = EnumIntegerField(PaymentJobStatus, default=PaymentJobStatus.PENDING, db_index=True,
+                              verbose_name=_('status'))
+    return_url = models.URLField(max_length=1000, verbose_name=_('return URL'))
+    cancel_url = models.URLField(max_length=1000, verbose_name=_('cancel URL'))
+    payment_url = models.URLField(max_length=1000, blank=True, verbose_name=_('payment URL'))
+    error = models.TextField(blank=True, verbose_name=_('error'))
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_('created on'))
+    modified_on = models.DateTimeField(auto_now=True, verbose_name=_('modified on'))
+
+    class Meta:
+        verbose_name = _('payment job')
+        verbose_name_plural = _('payment jobs')
+
+
+class PaymentCallback(models.Model):
+    """
+    Payment return request already processed or being processed.
+
+    The unique key makes duplicate callbacks of a payment provider wait
+    for and reuse the outcome of the first one.
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name=_('key'))
+    order = models.ForeignKey('shuup.Order', related_name='+', on_delete=models.CASCADE, verbose_name=_('order'))
+    completed = models.BooleanField(default=False, verbose_name=_('completed'))
+    created_on = models.DateTimeField(auto_now_add=True, verbose_name=_('created on'))
+    completed_on = models.DateTimeField(null=True, blank=True, verbose_name=_('completed on'))
+
+    class Meta:
+        verbose_name = _('payment callback')
+        verbose_name_plural = _('payment callbacks')
+
+
+class BasketCheckout(models.Model):
+    """
+    Order created from a basket checkout with an idempotency key.
+
+    Retries of the checkout with the same key return this order.
+    """
+    basket_key = models.CharField(max_length=128, verbose_name=_('basket key'))
+    idempotency_key = models.CharField(max_length=255, verbose_name=_('idempotency key'))
+    order = models.ForeignKey('shuup.Order', related_name='+', on_delete=models.CASCADE, verbose_name=_('order'))
+    created_on = models.DateTimeField(auto_now_add=True, verbose_name=_('created on'))
+
+    class Meta:
+        unique_together = (('basket_key', 'idempotency_key'),)
+        verbose_name = _('basket checkout')
+        verbose_name_plural = _('basket checkouts')
+
+
+class BasketRevision(models.Model):
+    """
+    Latest saved revision of a stored basket.
+
+    Saves claim the next revision with a conditional update, so concurrent
+    saves of the same revision conflict instead of overwriting each other.
+    """
+    basket_key = models.CharField(max_length=128, unique=True, verbose_name=_('basket key'))
+    revision = models.PositiveIntegerField(default=0, verbose_name=_('revision'))
+
+    class Meta:
+        verbose_name = _('basket revision')
+        verbose_name_plural = _('basket revisions')
+
+
+class ShopProductChange(models.Model):
+    """
+    Latest change of a shop product, kept after the shop product is deleted.
+
+    The product export reads these to find the shop products changed or
+    deleted since a given time.
+    """
+    shop_product_id = models.IntegerField(unique=True, verbose_name=_('shop product id'))
+    shop_id = models.IntegerField(db_index=True, verbose_name=_('shop id'))
+    product_id = models.IntegerField(verbose_name=_('product id'))
+    deleted = models.BooleanField(default=False, verbose_name=_('deleted'))
+    modified_on = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_('modified on'))
+
+    class Meta:
+        verbose_name = _('shop product change')
+        verbose_name_plural = _('shop product changes')
+
+
+class ProductSearchWord(models.Model):
+    """
+    Word of a translated product name.
+
+    Product searches look up the words starting with each word of the
+    query through the index of the word column, instead of scanning the
+    product names.
+    """
+    word = models.CharField(max_length=64, db_index=True, verbose_name=_('word'))
+    product_id = models.IntegerField(db_index=True, verbose_name=_('product id'))
+
+    class Meta:
+        unique_together = (('word', 'product_id'),)
+        verbose_name = _('product search word')
+        verbose_name_plural = _('product search words')
@@ -0,0 +1,128 @@
+#: Spec string for the storage class used by the API baskets.
+#:
+#: The default stores every basket change to the database
+#: (``DatabaseAPIBasketStorage``). ``CacheAPIBasketStorage`` keeps the
+#: live basket data in the cache and only writes it through to the
+#: database when the basket is checked out or deleted, or when the
+#: persist interval has passed.
+SHUUP_PUBLIC_API_BASKET_STORAGE_CLASS_SPEC = (
+    "shuup_public_api.common.basket:DatabaseAPIBasketStorage")
+
+#: Alias of the Django cache used by ``CacheAPIBasketStorage``.
+SHUUP_PUBLIC_API_BASKET_CACHE_ALIAS = "default"
+
+#: Timeout in seconds of the basket data kept by ``CacheAPIBasketStorage``.
+SHUUP_PUBLIC_API_BASKET_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+#: Minimum number of seconds between two database writes of a basket
+#: stored with ``CacheAPIBasketStorage``. ``0`` writes on every save.
+#:
+#: Changes saved in between are written by the ``flush_baskets``
+#: management command, which should run at about this interval.
+SHUUP_PUBLIC_API_BASKET_PERSIST_INTERVAL = 5 * 60
+
+#: Whether the orderability of basket lines is checked in bulk.
+#:
+#: The bulk check evaluates the built-in orderability rules of Shuup
+#: in memory on prefetched data. Disable it if the project extends the
+#: orderability rules of shop products or supplier modules.
+SHUUP_PUBLIC_API_CHECK_ORDERABILITY_IN_BULK = True
+
+#: Number of seconds the computed prices of a basket revision are shared
+#: between requests.
+SHUUP_PUBLIC_API_BASKET_PRICING_CACHE_TIMEOUT = 60
+
+#: Default page size of the keyset (cursor) paginated product listing.
+SHUUP_PUBLIC_API_KEYSET_PAGE_SIZE = 100
+
+#: Maximum page size clients may request from the keyset paginated product listing.
+SHUUP_PUBLIC_API_KEYSET_MAX_PAGE_SIZE = 1000
+
+#: Number of seconds rendered product representations are cached.
+#: Changes to products, their media, attributes, package links and
+#: taxes invalidate them before that.
+SHUUP_PUBLIC_API_PRODUCT_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+#: Number of products fetched and rendered at a time by the
+#: streaming product export.
+SHUUP_PUBLIC_API_EXPORT_CHUNK_SIZE = 500
+
+#: Whether product names are searched from an in-process inverted index
+#: instead of the indexed name words in the database. Both match the same
+#: products. With None the in-process index is used on SQLite only.
+SHUUP_PUBLIC_API_IN_PROCESS_SEARCH_INDEX = None
+
+#: Whether payments are initiated by the ``process_payment_jobs``
+#: command instead of the request. Creating a payment then answers with
+#: a job whose status is polled for the payment URL.
+SHUUP_PUBLIC_API_ASYNC_PAYMENT_INITIATION = False
+
+#: Number of seconds a payment job may run. Jobs still running after
+#: that are considered abandoned by a dead worker and marked failed.
+SHUUP_PUBLIC_API_PAYMENT_JOB_TIMEOUT = 60 * 5
+
+#: Number of seconds after which an unfinished payment callback is
+#: considered abandoned, so a duplicate of it is processed again.
+SHUUP_PUBLIC_API_PAYMENT_CALLBACK_LOCK_TIMEOUT = 10
+
+#: Number of times a checkout is retried after a deadlock, lock wait
+#: timeout or serialization failure.
+SHUUP_PUBLIC_API_TRANSACTION_RETRIES = 3
+
+#: Seconds to wait before the first retry of a failed transaction, the
+#: delay doubles on every further retry.
+SHUUP_PUBLIC_API_TRANSACTION_RETRY_DELAY = 0.05
+
+#: Number of times a basket change is applied again on top of a
+#: concurrent save before answering with 409 Conflict.
+SHUUP_PUBLIC_API_BASKET_SAVE_RETRIES = 3
+
+#: Age in days of the active baskets purged by the ``purge_baskets``
+#: command, None keeps them.
+SHUUP_PUBLIC_API_ABANDONED_BASKET_AGE_DAYS = 30
+
+#: Age in days of the deleted baskets purged by the ``purge_baskets``
+#: command, None keeps them.
+SHUUP_PUBLIC_API_DELETED_BASKET_AGE_DAYS = 7
+
+#: Age in days of the checked out baskets purged by the
+#: ``purge_baskets`` command, None keeps them.
+SHUUP_PUBLIC_API_FINISHED_BASKET_AGE_DAYS = 7
+
+#: Age in days of the payment callbacks purged by the
+#: ``purge_baskets`` command, None keeps them. Duplicate callbacks
+#: arriving later are processed again.
+SHUUP_PUBLIC_API_PAYMENT_CALLBACK_AGE_DAYS = 7
+
+#: Age in days of the checkout idempotency records purged by the
+#: ``purge_baskets`` command, None keeps them. Checkouts retried later
+#: with the same key are no longer recognized.
+SHUUP_PUBLIC_API_BASKET_CHECKOUT_AGE_DAYS = 7
+
+#: Age in days of the succeeded and failed payment jobs purged by the
+#: ``purge_baskets`` command, None keeps them.
+SHUUP_PUBLIC_API_PAYMENT_JOB_AGE_DAYS = 7
+
+#: Number of seconds the shipping and payment methods available for a
+#: basket are shared between requests.
+SHUUP_PUBLIC_API_METHOD_AVAILABILITY_CACHE_TIMEOUT = 30
+
+#: Number of seconds product prices are shared between baskets of
+#: customers getting the same prices.
+SHUUP_PUBLIC_API_PRICE_CACHE_TIMEOUT = 60
+
+#: Maximum number of product prices kept per process, the least
+#: recently used prices are evicted first.
+SHUUP_PUBLIC_API_PRICE_CACHE_SIZE = 10000
+
+#: Whether `shuup_public_api.middleware.PublicAPIMetricsMiddleware`
+#: collects metrics of the public API routes and ``/public/metrics/``
+#: exposes them to Prometheus.
+SHUUP_PUBLIC_API_METRICS_ENABLED = False
+
+#: Token Prometheus sends as ``Authorization: Bearer <token>`` to read
+#: ``/public/metrics/``, staff users may always read the metrics.
+SHUUP_PUBLIC_API_METRICS_TOKEN = None
+
+#: Addresses allowed to read ``/public/metrics/`` without a token.
+SHUUP_PUBLIC_API_METRICS_ALLOWED_IPS = ()
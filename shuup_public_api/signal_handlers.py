@@ -0,0 +1,99 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save
+
+from .common import versions
+from .common.search import clear_product_search_index, update_product_search_words
+from .common.shop import clear_shop_cache
+from .common.tax import clear_tax_class_cache
+
+
+def connect_change_signals(handler, models):
+    """
+    Connect a handler to the saves and deletes of the given models and their translations.
+    """
+    senders = []
+    for model in models:
+        senders.append(model)
+        parler_meta = getattr(model, '_parler_meta', None)
+        if parler_meta:
+            senders.append(parler_meta.root_model)
+    for sender in senders:
+        for signal, signal_name in ((post_save, 'save'), (post_delete, 'delete')):
+            signal.connect(
+                handler,
+                sender=sender,
+                dispatch_uid='shuup_public_api:%s_on_%s_%s' % (handler.__name__, sender.__name__, signal_name)
+            )
+
+
+def invalidate_shop_cache(sender, instance, **kwargs):
+    clear_shop_cache()
+
+
+def invalidate_tax_class_cache(sender, instance, **kwargs):
+    clear_tax_class_cache()
+
+
+def invalidate_product_search_index(sender, instance, **kwargs):
+    clear_product_search_index()
+
+
+def index_product_search_words(sender, instance, **kwargs):
+    product_id = _get_product_id(instance)
+    if product_id:
+        update_product_search_words(product_id)
+
+
+def bump_catalog_version(sender, instance, **kwargs):
+    versions.bump_catalog_version(getattr(instance, 'shop_id', None))
+
+
+def _get_product_id(instance):
+    from shuup.core.models import Product, ProductPackageLink
+    if isinstance(instance, Product):
+        return instance.pk
+    if isinstance(instance, ProductPackageLink):
+        return instance.parent_id
+    if hasattr(instance, 'master_id'):  # A translation
+        try:
+            return _get_product_id(instance.master)
+        except ObjectDoesNotExist:
+            return None
+    return getattr(instance, 'product_id', None)
+
+
+def bump_product_version(sender, instance, **kwargs):
+    versions.bump_product_version(_get_product_id(instance))
+
+
+def bump_stock_version(sender, instance, **kwargs):
+    from shuup.core.models import ProductPackageLink, Supplier
+    if isinstance(instance, Supplier):
+        versions.bump_stock_version()
+        return
+    versions.bump_stock_version(instance.product_id)
+    # Packages are orderable only as long as their children are
+    parent_ids = ProductPackageLink.objects.filter(child_id=instance.product_id).values_list('parent_id', flat=True)
+    for parent_id in parent_ids:
+        versions.bump_stock_version(parent_id)
+
+
+def record_shop_product_change(sender, instance, signal, **kwargs):
+    from shuup.core.models import ShopProduct
+    from .models import ShopProductChange
+    if hasattr(instance, 'master_id'):  # A translation
+        try:
+            instance = instance.master
+        except ObjectDoesNotExist:
+            return
+    if isinstance(instance, ShopProduct):
+        shop_products = [(instance.pk, instance.shop_id, instance.product_id)]
+        deleted = (signal is post_delete)
+    else:
+        shop_products = ShopProduct.objects.filter(product_id=instance.pk).values_list('pk', 'shop_id', 'product_id')
+        deleted = False
+    for (shop_product_id, shop_id, product_id) in shop_products:
+        ShopProductChange.objects.update_or_create(
+            shop_product_id=shop_product_id,
+            defaults=dict(shop_id=shop_id, product_id=product_id, deleted=deleted)
+        )
@@ -1,13 +1,14 @@
 from django.conf.urls import url, include
 from rest_framework_extensions.routers import ExtendedSimpleRouter
 
-from .api.payment import OrderPaymentViewSet
+from .api.payment import OrderPaymentViewSet, PaymentJobViewSet
 from .api.shipping_method import ShippingMethodViewSet
 from .api.payment_method import PaymentMethodViewSet
 from .api.basket import APIBasketLineViewSet, APIBasketViewSet
 from .api.product import PublicShopProductViewSet
 from .api.order import PublicOrderViewSet
 from .api.shop import PublicShopViewSet
+from .views import metrics_view
 
 router = ExtendedSimpleRouter()
 shop_router = router.register('shops', PublicShopViewSet, base_name='shops')
@@ -33,6 +34,9 @@ basket_router = shop_router.register(r'baskets', APIBasketViewSet,
 order_router.register(r'payments', OrderPaymentViewSet,
                       base_name='payments',
                       parents_query_lookups=['shop__identifier', 'order__key'])
+order_router.register(r'payment_jobs', PaymentJobViewSet,
+                      base_name='payment_jobs',
+                      parents_query_lookups=['shop__identifier', 'order__key'])
 
 # basket route
 basket_router.register(r'lines', APIBasketLineViewSet,
@@ -40,5 +44,7 @@ basket_router.register(r'lines', APIBasketLineViewSet,
                        parents_query_lookups=['shop__identifier', 'basket__key'])
 
 urlpatterns = [
-    url(r'^public/', include(router.urls, namespace='public_api'))
+    url(r'^public/', include(router.urls + [
+        url(r'^metrics/$', metrics_view, name='metrics'),
+    ], namespace='public_api'))
 ]
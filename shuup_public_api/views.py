@@ -0,0 +1,15 @@
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+from .metrics import can_read_metrics, is_enabled, render_metrics
+
+
+def metrics_view(request):
+    """
+    Expose the collected metrics to Prometheus.
+    """
+    if not is_enabled():
+        raise Http404
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,163 @@
+import json
+
+import pytest
+from django.core.urlresolvers import reverse
+from rest_framework.test import APIClient
+from shuup.testing.factories import create_product, get_default_shop, get_default_supplier
+
+from shuup_public_api.api.mixins import BasketConflict, get_active_basket, save_basket_mutation
+from shuup_public_api.common.basket import APIBasket, BasketRevisionConflict
+
+
+def get_url(name, **kwargs):
+    kwargs['parent_lookup_shop__identifier'] = get_default_shop().identifier
+    return reverse('public_api:%s' % name, kwargs=kwargs)
+
+
+def get_content(response):
+    assert response.status_code == 200, response.content
+    return json.loads(response.content.decode('utf-8'))
+
+
+@pytest.mark.django_db
+def test_basket_mutations_respond_like_a_reload():
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    products = [
+        create_product('test-%d' % index, shop=shop, supplier=supplier, default_price=10 + index)
+        for index in range(3)
+    ]
+    client = APIClient()
+    key = get_content(client.post(get_url('baskets-list')))['key']
+    basket_url = get_url('baskets-detail', key=key)
+    lines_url = get_url('basket_lines-list', parent_lookup_basket__key=key)
+
+    for product in products:
+        content = get_content(client.post(lines_url, {'product': product.pk, 'quantity': 2}, format='json'))
+        assert content == get_content(client.get(basket_url))
+    assert len(content['lines']) == len(products)
+
+    line_url = get_url('basket_lines-detail', parent_lookup_basket__key=key, line_id=content['lines'][0]['line_id'])
+    content = get_content(client.patch(line_url, {'quantity': 5}, format='json'))
+    assert content == get_content(client.get(basket_url))
+    assert content['lines'][0]['quantity'] == 5
+
+    content = get_content(client.delete(line_url))
+    assert content == get_content(client.get(basket_url))
+    assert len(content['lines']) == len(products) - 1
+
+
+@pytest.mark.django_db
+def test_basket_etag_follows_stock_changes():
+    from shuup.simple_supplier.models import StockCount
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test-stock', shop=shop, supplier=supplier, default_price=10)
+    client = APIClient()
+    key = get_content(client.post(get_url('baskets-list')))['key']
+    basket_url = get_url('baskets-detail', key=key)
+    get_content(client.post(
+        get_url('basket_lines-list', parent_lookup_basket__key=key), {'product': product.pk, 'quantity': 1},
+        format='json'))
+
+    etag = client.get(basket_url)['ETag']
+    assert client.get(basket_url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    StockCount.objects.create(supplier=supplier, product=product, logical_count=0, physical_count=0)
+    response = client.get(basket_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_basket_lines_fetch_product_fragments_at_once(monkeypatch):
+    from shuup_public_api.api.basket import _serializers
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    products = [
+        create_product('test-fragment-%d' % index, shop=shop, supplier=supplier, default_price=10)
+        for index in range(3)
+    ]
+    client = APIClient()
+    key = get_content(client.post(get_url('baskets-list')))['key']
+    lines_url = get_url('basket_lines-list', parent_lookup_basket__key=key)
+    for product in products:
+        get_content(client.post(lines_url, {'product': product.pk, 'quantity': 1}, format='json'))
+
+    calls = []
+    get_product_fragments = _serializers.get_product_fragments
+
+    def record_product_fragments(products, request, render):
+        calls.append(sorted(product.pk for product in products))
+        return get_product_fragments(products, request, render)
+
+    monkeypatch.setattr(_serializers, 'get_product_fragments', record_product_fragments)
+    content = get_content(client.get(get_url('baskets-detail', key=key)))
+    assert calls == [sorted(product.pk for product in products)]
+    assert [line['product']['id'] for line in content['lines']] == [product.pk for product in products]
+
+
+@pytest.mark.django_db
+def test_adding_a_product_of_another_shop_is_a_bad_request():
+    product = create_product('test-no-shop')
+    client = APIClient()
+    key = get_content(client.post(get_url('baskets-list')))['key']
+    response = client.post(
+        get_url('basket_lines-list', parent_lookup_basket__key=key), {'product': product.pk, 'quantity': 1},
+        format='json')
+    assert response.status_code == 400
+    assert json.loads(response.content.decode('utf-8'))['code'] == 'product_not_available'
+
+
+@pytest.mark.django_db
+def test_conflicting_basket_mutation_is_applied_on_the_saved_basket():
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    (first_product, second_product) = [
+        create_product('test-conflict-%d' % index, shop=shop, supplier=supplier, default_price=10)
+        for index in range(2)
+    ]
+    key = get_content(APIClient().post(get_url('baskets-list')))['key']
+    basket = get_active_basket(key, shop)
+    concurrent_basket = get_active_basket(key, shop)
+    concurrent_basket.add_product(supplier=supplier, shop=shop, product=first_product, quantity=1)
+    concurrent_basket.save()
+
+    mutations = []
+
+    def add_product(basket):
+        mutations.append(basket.revision)
+        basket.add_product(supplier=supplier, shop=shop, product=second_product, quantity=2)
+
+    basket = save_basket_mutation(basket, add_product)
+    assert mutations == [1, 2]
+    basket = get_active_basket(key, shop)
+    assert basket.revision == 3
+    assert sorted((line.product.pk, line.quantity) for line in basket.get_lines()) == [
+        (first_product.pk, 1), (second_product.pk, 2)]
+
+
+@pytest.mark.django_db
+def test_persistently_conflicting_basket_mutation_is_a_conflict(monkeypatch, settings):
+    settings.SHUUP_PUBLIC_API_BASKET_SAVE_RETRIES = 2
+    shop = get_default_shop()
+    product = create_product('test-conflict', shop=shop, supplier=get_default_supplier(), default_price=10)
+    client = APIClient()
+    key = get_content(client.post(get_url('baskets-list')))['key']
+
+    saves = []
+
+    def conflicting_save(basket):
+        saves.append(basket.key)
+        raise BasketRevisionConflict()
+
+    monkeypatch.setattr(APIBasket, 'save', conflicting_save)
+    with pytest.raises(BasketConflict):
+        save_basket_mutation(get_active_basket(key, shop), lambda basket: None)
+    assert len(saves) == 3
+
+    response = client.post(
+        get_url('basket_lines-list', parent_lookup_basket__key=key), {'product': product.pk, 'quantity': 1},
+        format='json')
+    assert response.status_code == 409
+    assert json.loads(response.content.decode('utf-8'))['code'] == 'basket_conflict'
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from django.core.urlresolvers import reverse
+from django.db import transaction
+from rest_framework.test import APIClient
+from shuup.core.defaults.order_statuses import create_default_order_statuses
+from shuup.core.models import Order
+from shuup.front.models import StoredBasket
+from shuup.testing.factories import (
+    create_product, get_default_payment_method, get_default_shipping_method, get_default_shop, get_default_supplier
+)
+
+from shuup_public_api.api.basket import _views
+from shuup_public_api.common.basket import APIBasket, BasketRevisionConflict
+
+ADDRESS = {
+    'name': 'Test Customer',
+    'street': 'Test Street 1',
+    'city': 'Helsinki',
+    'postal_code': '00100',
+    'country': 'FI',
+}
+
+
+def get_url(name, **kwargs):
+    kwargs['parent_lookup_shop__identifier'] = get_default_shop().identifier
+    return reverse('public_api:%s' % name, kwargs=kwargs)
+
+
+def create_basket(client):
+    create_default_order_statuses()
+    product = create_product('test', shop=get_default_shop(), supplier=get_default_supplier(), default_price=10)
+    key = json.loads(client.post(get_url('baskets-list')).content.decode('utf-8'))['key']
+    response = client.post(
+        get_url('basket_lines-list', parent_lookup_basket__key=key), {'product': product.pk, 'quantity': 1},
+        format='json')
+    assert response.status_code == 200, response.content
+    return key
+
+
+def checkout(client, key, **headers):
+    return client.post(get_url('baskets-checkout', key=key), {
+        'payment_method': get_default_payment_method().pk,
+        'shipping_method': get_default_shipping_method().pk,
+        'shipping_address': ADDRESS,
+        'billing_address': ADDRESS,
+    }, format='json', **headers)
+
+
+@pytest.mark.django_db
+def test_checkout_retry_with_idempotency_key_returns_the_first_order():
+    client = APIClient()
+    key = create_basket(client)
+    first = checkout(client, key, HTTP_IDEMPOTENCY_KEY='checkout-1')
+    assert first.status_code == 200, first.content
+    retry = checkout(client, key, HTTP_IDEMPOTENCY_KEY='checkout-1')
+    assert retry.status_code == 200, retry.content
+    assert json.loads(retry.content.decode('utf-8'))['id'] == json.loads(first.content.decode('utf-8'))['id']
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_checkout_locks_and_finalizes_the_basket_in_one_transaction(monkeypatch):
+    client = APIClient()
+    key = create_basket(client)
+    lock_stored_basket = _views.lock_stored_basket
+    locked_in_atomic_block = []
+
+    def record_lock(basket_key):
+        locked_in_atomic_block.append(transaction.get_connection().in_atomic_block)
+        lock_stored_basket(basket_key)
+
+    def conflicting_save(basket):
+        assert StoredBasket.objects.get(key=basket.key).finished
+        raise BasketRevisionConflict()
+
+    monkeypatch.setattr(_views, 'lock_stored_basket', record_lock)
+    monkeypatch.setattr(APIBasket, 'save', conflicting_save)
+    assert checkout(client, key).status_code == 409
+    assert locked_in_atomic_block == [True]
+    # Finalizing the basket was rolled back along with the order
+    assert not StoredBasket.objects.get(key=key).finished
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_payment_detail_is_found_by_its_identifier():
+    client = APIClient()
+    order = Order.objects.get(pk=json.loads(checkout(client, create_basket(client)).content.decode('utf-8'))['id'])
+    payment = order.create_payment(order.taxful_total_price, payment_identifier='test-payment')
+    response = client.get(get_url(
+        'payments-detail', parent_lookup_order__key=order.key, identifier=payment.payment_identifier))
+    assert response.status_code == 200, response.content
+    assert json.loads(response.content.decode('utf-8'))['payment_identifier'] == 'test-payment'
@@ -0,0 +1,163 @@
+import json
+
+import pytest
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from shuup.core.models import ShopProduct
+from shuup.testing.factories import create_product, get_default_category, get_default_shop, get_default_supplier
+from six.moves.urllib.parse import parse_qs, urlparse
+
+from shuup_public_api.api.product import PublicShopProductViewSet
+
+
+def create_catalog(shop, size):
+    supplier = get_default_supplier()
+    category = get_default_category()
+    shop_products = []
+    for index in range(size):
+        product = create_product('test-%d' % index, shop=shop, supplier=supplier, default_price=10 + index)
+        shop_product = product.get_shop_instance(shop)
+        shop_product.primary_category = category
+        shop_product.save()
+        shop_product.categories.add(category)
+        shop_products.append(shop_product)
+    # A package of the next two products and a variation parent of the two after
+    products = [shop_product.product for shop_product in shop_products]
+    products[0].make_package({products[1]: 1, products[2]: 2})
+    for child in products[4:6]:
+        child.link_to_parent(products[3])
+    return shop_products
+
+
+def request_products(shop, action, params=None, **kwargs):
+    view = PublicShopProductViewSet.as_view({'get': action})
+    request = APIRequestFactory().get('/', params or {})
+    response = view(request, parent_lookup_shop__identifier=shop.identifier, **kwargs)
+    response.render()
+    assert response.status_code == 200, response.content
+    return response.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', [6, 30])
+def test_product_list_query_count(django_assert_num_queries, size):
+    shop = get_default_shop()
+    create_catalog(shop, size)
+    # The first request looks up the shop, the package links and the taxes
+    with django_assert_num_queries(11):
+        data = request_products(shop, 'list', params={'limit': size})
+    assert len(data['results']) == size
+    with django_assert_num_queries(8):
+        request_products(shop, 'list', params={'limit': size})
+
+
+@pytest.mark.django_db
+def test_product_detail_query_count(django_assert_num_queries):
+    shop = get_default_shop()
+    shop_products = create_catalog(shop, 6)
+    with django_assert_num_queries(10):
+        data = request_products(shop, 'retrieve', pk=shop_products[0].pk)
+    assert len(data['product']['package_content']) == 2
+    for shop_product in shop_products[1:]:
+        with django_assert_num_queries(8):
+            request_products(shop, 'retrieve', pk=shop_product.pk)
+
+
+def export_products(shop, params=None):
+    view = PublicShopProductViewSet.as_view({'get': 'export'})
+    response = view(APIRequestFactory().get('/', params or {}), parent_lookup_shop__identifier=shop.identifier)
+    assert response.status_code == 200
+    return [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+
+
+@pytest.mark.django_db
+def test_product_export_updated_since():
+    shop = get_default_shop()
+    shop_products = create_catalog(shop, 6)
+    assert len(export_products(shop)) == 6
+
+    updated_since = timezone.now()
+    shop_products[0].default_price_value = 20
+    shop_products[0].save()
+    shop_products[1].product.soft_delete()
+    shop_products[2].delete()
+
+    records = export_products(shop, {'updated_since': updated_since.isoformat()})
+    assert records[0]['product']['id'] == shop_products[0].product.pk
+    assert records[0]['default_price'] == '20.00'
+    assert sorted(records[1:], key=lambda record: record['product']['id']) == [
+        {'product': {'id': shop_product.product.pk}, 'deleted': True} for shop_product in shop_products[1:3]
+    ]
+    assert len(export_products(shop)) == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ['products-list', 'payment_methods-list', 'shipping_methods-list'])
+def test_etag_follows_language_and_host(settings, name):
+    settings.LANGUAGES = [('en', 'English'), ('fi', 'Finnish')]
+    settings.ALLOWED_HOSTS = ['testserver', 'other.example.com']
+    shop = get_default_shop()
+    create_catalog(shop, 6)
+    client = APIClient()
+    url = reverse('public_api:%s' % name, kwargs={'parent_lookup_shop__identifier': shop.identifier})
+
+    response = client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+    assert response.status_code == 200
+    assert 'Accept-Language' in response['Vary']
+    etag = response['ETag']
+    assert client.get(url, HTTP_ACCEPT_LANGUAGE='en', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(url, HTTP_ACCEPT_LANGUAGE='fi', HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert client.get(
+        url, HTTP_ACCEPT_LANGUAGE='en', HTTP_HOST='other.example.com', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def get_cursor(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+@pytest.mark.django_db
+def test_keyset_pages_are_stable_across_inserts():
+    shop = get_default_shop()
+    shop_products = create_catalog(shop, 6)
+    data = request_products(shop, 'list', params={'pagination': 'cursor', 'limit': 4})
+    assert 'count' not in data
+    seen = [item['product']['id'] for item in data['results']]
+    assert seen == [shop_product.product_id for shop_product in shop_products[:4]]
+
+    supplier = get_default_supplier()
+    added = [
+        create_product('added-%d' % index, shop=shop, supplier=supplier).get_shop_instance(shop)
+        for index in range(3)
+    ]
+    while data['next']:
+        data = request_products(shop, 'list', params={'cursor': get_cursor(data['next']), 'limit': 4})
+        seen.extend(item['product']['id'] for item in data['results'])
+    assert seen == [shop_product.product_id for shop_product in shop_products + added]
+
+
+@pytest.mark.django_db
+def test_keyset_pages_seek_on_the_primary_key():
+    shop = get_default_shop()
+    create_catalog(shop, 6)
+    data = request_products(shop, 'list', params={'pagination': 'cursor', 'limit': 2})
+    with CaptureQueriesContext(connection) as queries:
+        request_products(shop, 'list', params={'cursor': get_cursor(data['next']), 'limit': 2})
+    pk_column = '%s.%s' % (
+        connection.ops.quote_name(ShopProduct._meta.db_table), connection.ops.quote_name(ShopProduct._meta.pk.column))
+    page_queries = [query['sql'] for query in queries if 'ORDER BY %s ASC' % pk_column in query['sql']]
+    assert len(page_queries) == 1
+    assert '%s > ' % pk_column in page_queries[0]
+
+
+@pytest.mark.django_db
+def test_keyset_count_is_only_included_on_request():
+    shop = get_default_shop()
+    create_catalog(shop, 6)
+    data = request_products(shop, 'list', params={'pagination': 'cursor', 'limit': 2})
+    assert 'count' not in data
+    data = request_products(shop, 'list', params={'pagination': 'cursor', 'limit': 2, 'count': 'true'})
+    assert data['count'] == 6
+    assert len(data['results']) == 2
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+from django.core.urlresolvers import reverse
+from rest_framework.test import APIClient
+from shuup.testing.factories import get_default_shop
+
+
+@pytest.mark.django_db
+def test_shop_detail():
+    shop = get_default_shop()
+    response = APIClient().get(reverse('public_api:shops-detail', kwargs={'identifier': shop.identifier}))
+    assert response.status_code == 200, response.content
+    assert json.loads(response.content.decode('utf-8'))['identifier'] == shop.identifier
+
+
+@pytest.mark.django_db
+def test_shop_detail_of_missing_shop_is_not_found():
+    get_default_shop()
+    response = APIClient().get(reverse('public_api:shops-detail', kwargs={'identifier': 'missing'}))
+    assert response.status_code == 404
@@ -0,0 +1,228 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import override
+from shuup.core.models import MutableAddress, ShippingMethod
+from shuup.front.models import StoredBasket
+from shuup.testing.factories import (
+    create_product, get_default_shipping_method, get_default_shop, get_default_supplier, get_default_tax
+)
+
+from shuup_public_api.common import basket as basket_module
+from shuup_public_api.common.basket import (
+    APIBasket, BasketLineIndex, BasketPricing, BasketRevisionConflict, CacheAPIBasketStorage,
+    DatabaseAPIBasketStorage, flush_baskets
+)
+
+
+def test_line_index_removes_child_lines_of_replaced_line():
+    lines = [
+        {'line_id': 'parent', 'product_id': 1, 'supplier_id': 1, 'shop_id': 1, 'quantity': 1},
+        {'line_id': 'child', 'parent_line_id': 'parent', 'product_id': 2, 'supplier_id': 1, 'shop_id': 1},
+        {'line_id': 'other', 'product_id': 3, 'supplier_id': 1, 'shop_id': 1, 'quantity': 1},
+    ]
+    index = BasketLineIndex(lines)
+    replacement = dict(lines[0], quantity=2)
+    index.add_or_replace(replacement)
+    assert [line['line_id'] for line in lines] == ['parent', 'other']
+    assert index.get('parent') is replacement
+    assert index.get('child') is None
+    assert index.get('other') is lines[1]
+    assert index.get_child_lines('parent') == []
+    assert index.get_product_lines(2, 1, 1) == []
+    assert index.get_product_lines(3, 1, 1) == [lines[1]]
+
+
+@pytest.mark.django_db
+def test_updating_parent_line_removes_child_lines():
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    parent = create_product('parent', shop=shop, supplier=supplier, default_price=10)
+    child = create_product('child', shop=shop, supplier=supplier, default_price=5)
+    basket = APIBasket('test-basket', shop)
+    (parent_line, child_line) = basket.add_product_with_child_product(supplier, shop, parent, child, 1)
+    assert basket.find_lines_by_parent_line_id(parent_line.line_id)
+    basket.update_line(basket.find_line_by_line_id(parent_line.line_id), quantity=2)
+    assert basket.find_line_by_line_id(child_line.line_id) is None
+    assert [line['line_id'] for line in basket._data_lines] == [parent_line.line_id]
+
+
+@pytest.mark.django_db
+def test_flush_writes_cached_basket_changes(monkeypatch, settings):
+    monkeypatch.setattr(basket_module, 'get_storage', CacheAPIBasketStorage)
+    settings.SHUUP_PUBLIC_API_BASKET_PERSIST_INTERVAL = 60 * 60
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+
+    basket = APIBasket('test-basket', shop)
+    basket.save()
+    basket.add_product(supplier=supplier, shop=shop, product=product, quantity=2)
+    basket.save()
+    stored_basket = StoredBasket.objects.get(key=basket.key)
+    assert stored_basket.data['revision'] == 1
+    assert stored_basket.product_count == 0
+
+    assert flush_baskets() == 1
+    stored_basket = StoredBasket.objects.get(key=basket.key)
+    assert stored_basket.data['revision'] == 2
+    assert stored_basket.product_count == 2
+    assert list(stored_basket.products.all()) == [product]
+    assert flush_baskets() == 0
+
+
+@pytest.mark.django_db
+def test_basket_pricing_follows_price_changes():
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+    basket = APIBasket('test-basket', shop)
+    basket.add_product(supplier=supplier, shop=shop, product=product, quantity=2)
+    basket.save()
+    assert APIBasket('test-basket', shop).pricing.taxful_total_price.value == 20
+
+    shop_product = product.get_shop_instance(shop)
+    shop_product.default_price_value = 15
+    shop_product.save()
+    assert APIBasket('test-basket', shop).pricing.taxful_total_price.value == 30
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('discounts, computations', [
+    ([], 1),
+    ([{'text': 'Campaign', 'discount_amount': 1}], 2),
+])
+def test_basket_pricing_is_shared_between_languages_without_discounts(monkeypatch, discounts, computations):
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+    basket = APIBasket('test-basket', shop)
+    basket.add_product(supplier=supplier, shop=shop, product=product, quantity=2)
+    basket.save()
+
+    calls = []
+
+    def compute_pricing(basket):
+        calls.append(basket)
+        return BasketPricing({}, discounts, None, None, None)
+
+    monkeypatch.setattr(APIBasket, '_compute_pricing', compute_pricing)
+    for language in ('en', 'fi', 'en', 'fi'):
+        with override(language):
+            assert APIBasket('test-basket', shop).pricing.discounts == discounts
+    assert len(calls) == computations
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('storage_class', [DatabaseAPIBasketStorage, CacheAPIBasketStorage])
+def test_saving_a_stale_revision_conflicts(monkeypatch, storage_class):
+    monkeypatch.setattr(basket_module, 'get_storage', storage_class)
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+    APIBasket('test-basket', shop).save()
+
+    (first, second) = (APIBasket('test-basket', shop), APIBasket('test-basket', shop))
+    assert first.revision == second.revision == 1
+    first.add_product(supplier=supplier, shop=shop, product=product, quantity=1)
+    first.save()
+    second.add_product(supplier=supplier, shop=shop, product=product, quantity=5)
+    with pytest.raises(BasketRevisionConflict):
+        second.save()
+
+    basket = APIBasket('test-basket', shop)
+    assert basket.revision == 2
+    assert basket.product_count == 1
+
+
+@pytest.mark.django_db
+def test_cached_basket_saves_continue_after_the_basket_is_evicted(monkeypatch, settings):
+    monkeypatch.setattr(basket_module, 'get_storage', CacheAPIBasketStorage)
+    settings.SHUUP_PUBLIC_API_BASKET_PERSIST_INTERVAL = 60 * 60
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+    APIBasket('test-basket', shop).save()
+    for quantity in (1, 2):
+        basket = APIBasket('test-basket', shop)
+        basket.add_product(supplier=supplier, shop=shop, product=product, quantity=quantity)
+        basket.save()
+    assert StoredBasket.objects.get(key='test-basket').data['revision'] == 1
+
+    # The changes not yet written behind are lost with the evicted basket,
+    # but the revisions claimed for them don't block saving it again
+    CacheAPIBasketStorage().evict(['test-basket'])
+    (first, second) = (APIBasket('test-basket', shop), APIBasket('test-basket', shop))
+    assert first.load_active() and second.load_active()
+    assert first.revision == second.revision == 1
+    first.add_product(supplier=supplier, shop=shop, product=product, quantity=4)
+    first.save()
+    with pytest.raises(BasketRevisionConflict):
+        second.save()
+
+    basket = APIBasket('test-basket', shop)
+    assert basket.revision == 2
+    basket.add_product(supplier=supplier, shop=shop, product=product, quantity=1)
+    basket.save()
+    assert APIBasket('test-basket', shop).product_count == 5
+
+    CacheAPIBasketStorage().evict(['test-basket'])
+    basket = APIBasket('test-basket', shop)
+    assert basket.load_active()
+    assert basket.revision == 1
+    basket.save()
+    assert APIBasket('test-basket', shop).revision == 2
+
+
+@pytest.mark.django_db
+def test_method_availability_is_reused_until_the_basket_changes(monkeypatch):
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+    shipping_method = get_default_shipping_method()
+    basket = APIBasket('test-basket', shop)
+    basket.add_product(supplier=supplier, shop=shop, product=product, quantity=1)
+    basket.save()
+
+    checks = []
+    is_available_for = ShippingMethod.is_available_for
+
+    def record_check(method, source):
+        checks.append(source.method_availability_fingerprint)
+        return is_available_for(method, source)
+
+    monkeypatch.setattr(ShippingMethod, 'is_available_for', record_check)
+    for attempt in range(2):
+        basket = APIBasket('test-basket', shop)
+        assert basket.get_available_shipping_methods() == [shipping_method]
+        assert basket.get_available_shipping_methods() == [shipping_method]
+    assert len(checks) == 1
+
+    basket.update_line(basket._data_lines[0], quantity=2)
+    basket.get_available_shipping_methods()
+    assert len(checks) == 2
+
+    basket.shipping_address = MutableAddress(name='Test', street='Test Street 1', city='Helsinki', country='FI')
+    basket.get_available_shipping_methods()
+    basket.shipping_address.city = 'Turku'
+    basket.get_available_shipping_methods()
+    assert len(checks) == 4
+    assert len(set(checks)) == 4
+
+
+@pytest.mark.django_db
+def test_basket_taxes_take_constant_queries():
+    get_default_tax()
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    basket = APIBasket('test-basket', shop)
+    query_counts = []
+    for index in range(3):
+        product = create_product('test-%d' % index, shop=shop, supplier=supplier, default_price=10)
+        basket.add_product(supplier=supplier, shop=shop, product=product, quantity=1)
+        lines = basket.get_lines()
+        with CaptureQueriesContext(connection) as queries:
+            basket._calculate_taxes(lines)
+        assert all(line.taxes for line in lines)
+        query_counts.append(len(queries))
+    assert query_counts == [1, 0, 0]
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+import pytest
+from django.test import RequestFactory
+from django.utils.timezone import now
+from shuup.core.models import PaymentMethod
+from shuup.testing.factories import create_empty_order, get_default_payment_method, get_default_shop
+
+from shuup_public_api.common.payment import (
+    get_payment_callback_key, PaymentCallbackInProgress, process_payment_callback, process_pending_payment_jobs
+)
+from shuup_public_api.models import PaymentCallback, PaymentJob, PaymentJobStatus
+
+
+@pytest.mark.django_db
+def test_stale_running_payment_jobs_fail(settings):
+    settings.SHUUP_PUBLIC_API_PAYMENT_JOB_TIMEOUT = 60
+    order = create_empty_order(shop=get_default_shop())
+    order.save()
+    stale_job, running_job = [
+        PaymentJob.objects.create(
+            order=order, status=PaymentJobStatus.RUNNING, return_url='http://example.com/return/',
+            cancel_url='http://example.com/cancel/')
+        for index in range(2)
+    ]
+    PaymentJob.objects.filter(pk=stale_job.pk).update(modified_on=now() - timedelta(seconds=61))
+
+    assert process_pending_payment_jobs() == 0
+    stale_job.refresh_from_db()
+    assert stale_job.status == PaymentJobStatus.FAILED
+    assert stale_job.error
+    running_job.refresh_from_db()
+    assert running_job.status == PaymentJobStatus.RUNNING
+
+
+@pytest.fixture
+def paid_order(monkeypatch):
+    order = create_empty_order(shop=get_default_shop())
+    order.payment_method = get_default_payment_method()
+    order.save()
+    order.return_requests = []
+    monkeypatch.setattr(
+        PaymentMethod, 'process_payment_return_request',
+        lambda payment_method, order, request: order.return_requests.append(request))
+    return order
+
+
+def make_callback_request(body, **headers):
+    return RequestFactory().post('/', data=body, content_type='application/json', **headers)
+
+
+def run_callback(order, request):
+    return process_payment_callback(order, request, get_payment_callback_key(order, request))
+
+
+@pytest.mark.django_db
+def test_duplicate_of_completed_payment_callback_is_replayed(paid_order):
+    assert run_callback(paid_order, make_callback_request('{"transaction": "1"}'))
+    assert not run_callback(paid_order, make_callback_request('{"transaction": "1"}'))
+    assert len(paid_order.return_requests) == 1
+    assert PaymentCallback.objects.get().completed
+
+
+@pytest.mark.django_db
+def test_duplicate_of_payment_callback_in_progress_is_rejected_at_once(paid_order):
+    request = make_callback_request('{"transaction": "1"}')
+    PaymentCallback.objects.create(key=get_payment_callback_key(paid_order, request), order=paid_order)
+    with pytest.raises(PaymentCallbackInProgress):
+        run_callback(paid_order, request)
+    assert not paid_order.return_requests
+    # The first callback has not been abandoned, so it keeps the key
+    assert PaymentCallback.objects.filter(completed=False).exists()
+
+
+@pytest.mark.django_db
+def test_duplicate_of_abandoned_payment_callback_releases_the_key(paid_order, settings):
+    settings.SHUUP_PUBLIC_API_PAYMENT_CALLBACK_LOCK_TIMEOUT = 10
+    request = make_callback_request('{"transaction": "1"}')
+    key = get_payment_callback_key(paid_order, request)
+    callback = PaymentCallback.objects.create(key=key, order=paid_order)
+    PaymentCallback.objects.filter(pk=callback.pk).update(created_on=now() - timedelta(seconds=11))
+    with pytest.raises(PaymentCallbackInProgress):
+        run_callback(paid_order, request)
+    assert not PaymentCallback.objects.exists()
+    assert run_callback(paid_order, request)
+    assert len(paid_order.return_requests) == 1
+
+
+@pytest.mark.django_db
+def test_payment_callback_key_comes_from_body_without_idempotency_key(paid_order):
+    assert run_callback(paid_order, make_callback_request('{"transaction": "1"}'))
+    assert run_callback(paid_order, make_callback_request('{"transaction": "2"}'))
+    assert run_callback(paid_order, make_callback_request('{"transaction": "3"}', HTTP_IDEMPOTENCY_KEY='retry'))
+    assert not run_callback(paid_order, make_callback_request('{"transaction": "4"}', HTTP_IDEMPOTENCY_KEY='retry'))
+    assert len(paid_order.return_requests) == 3
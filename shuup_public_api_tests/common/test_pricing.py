@@ -0,0 +1,105 @@
+import pytest
+from shuup.campaigns.models import CatalogCampaign
+from shuup.core.models import AnonymousContact, PersonContact, Product
+from shuup.core.pricing import PricingContext
+from shuup.testing.factories import (
+    create_product, create_random_contact_group, get_default_shop, get_default_supplier
+)
+
+from shuup_public_api.common import pricing as pricing_module
+from shuup_public_api.common.basket import APIBasket
+from shuup_public_api.common.pricing import clear_price_cache, get_price_info
+
+
+@pytest.fixture
+def price_computations(monkeypatch):
+    clear_price_cache()
+    computations = []
+    get_product_price_info = Product.get_price_info
+
+    def record_price_info(product, context, quantity=1):
+        computations.append((product.pk, quantity))
+        return get_product_price_info(product, context, quantity=quantity)
+
+    monkeypatch.setattr(Product, 'get_price_info', record_price_info)
+    yield computations
+    clear_price_cache()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pricing_module.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.mark.django_db
+def test_prices_are_keyed_by_customers_and_quantity(price_computations):
+    shop = get_default_shop()
+    product = create_product('test', shop=shop, supplier=get_default_supplier(), default_price=10)
+    context = PricingContext(shop, AnonymousContact())
+    for attempt in range(2):
+        assert get_price_info(context, product, 1, None, '1.1').price.value == 10
+        assert get_price_info(context, product, 5, None, '1.1').price.value == 50
+        get_price_info(context, product, 1, (1, (2,)), '1.1')
+        get_price_info(context, product, 1, (1, (2, 3)), '1.1')
+    assert price_computations == [(product.pk, 1), (product.pk, 5), (product.pk, 1), (product.pk, 1)]
+
+
+@pytest.mark.django_db
+def test_prices_expire(settings, price_computations, clock):
+    settings.SHUUP_PUBLIC_API_PRICE_CACHE_TIMEOUT = 60
+    shop = get_default_shop()
+    product = create_product('test', shop=shop, supplier=get_default_supplier(), default_price=10)
+    context = PricingContext(shop, AnonymousContact())
+    get_price_info(context, product, 1, None, '1.1')
+    clock[0] += 59
+    get_price_info(context, product, 1, None, '1.1')
+    assert len(price_computations) == 1
+    clock[0] += 2
+    get_price_info(context, product, 1, None, '1.1')
+    assert len(price_computations) == 2
+
+
+@pytest.mark.django_db
+def test_least_recently_used_prices_are_evicted(settings, price_computations):
+    settings.SHUUP_PUBLIC_API_PRICE_CACHE_SIZE = 2
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    (first, second, third) = [
+        create_product('test-%d' % index, shop=shop, supplier=supplier, default_price=10) for index in range(3)]
+    context = PricingContext(shop, AnonymousContact())
+    for product in (first, second, first, third, first, second):
+        get_price_info(context, product, 1, None, '1.1')
+    assert [pk for (pk, quantity) in price_computations] == [first.pk, second.pk, third.pk, second.pk]
+
+
+@pytest.mark.django_db
+def test_basket_prices_follow_customer_groups_campaigns_and_prices(price_computations):
+    shop = get_default_shop()
+    supplier = get_default_supplier()
+    product = create_product('test', shop=shop, supplier=supplier, default_price=10)
+    customer = PersonContact.objects.create(first_name='Test', last_name='Customer')
+
+    def get_basket_price():
+        basket = APIBasket('test-basket', shop, customer=customer)
+        basket.add_product(supplier=supplier, shop=shop, product=product, quantity=1)
+        return basket._compute_pricing().taxful_total_price.value
+
+    assert get_basket_price() == 10
+    assert get_basket_price() == 10
+    assert len(price_computations) == 1
+
+    customer.groups.add(create_random_contact_group())
+    get_basket_price()
+    assert len(price_computations) == 2
+
+    CatalogCampaign.objects.create(shop=shop, name='Campaign', active=True)
+    get_basket_price()
+    assert len(price_computations) == 3
+
+    shop_product = product.get_shop_instance(shop)
+    shop_product.default_price_value = 15
+    shop_product.save()
+    assert get_basket_price() == 15
+    assert len(price_computations) == 4
@@ -0,0 +1,85 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+from shuup.front.models import StoredBasket
+from shuup.testing.factories import create_empty_order, get_default_shop
+
+from shuup_public_api.common.purge import purge_baskets
+from shuup_public_api.models import BasketCheckout, PaymentCallback, PaymentJob, PaymentJobStatus
+
+
+def create_stored_basket(key, **kwargs):
+    shop = get_default_shop()
+    stored_basket = StoredBasket.objects.create(
+        key=key, shop=shop, currency=shop.currency, prices_include_tax=shop.prices_include_tax, data={}, **kwargs)
+    StoredBasket.objects.filter(pk=stored_basket.pk).update(updated_on=now() - timedelta(days=2))
+    return stored_basket
+
+
+@pytest.mark.django_db
+def test_purge_only_abandoned_api_baskets():
+    abandoned = create_stored_basket(uuid.uuid4().hex)
+    persistent = create_stored_basket(uuid.uuid4().hex, persistent=True)
+    front = create_stored_basket('FrontBasketKeyOfThirtyTwoChars00')
+
+    stats = purge_baskets(abandoned_age=timedelta(days=1), deleted_age=None, finished_age=None)
+    assert stats.purged == 1
+    assert set(StoredBasket.objects.values_list('pk', flat=True)) == set([persistent.pk, front.pk])
+    assert not StoredBasket.objects.filter(pk=abandoned.pk).exists()
+
+
+def create_order():
+    order = create_empty_order(shop=get_default_shop())
+    order.save()
+    return order
+
+
+def make_old(record, field, days):
+    type(record).objects.filter(pk=record.pk).update(**{field: now() - timedelta(days=days)})
+
+
+def purge_records(**kwargs):
+    return purge_baskets(abandoned_age=None, deleted_age=None, finished_age=None, **kwargs)
+
+
+@pytest.mark.django_db
+def test_purge_old_payment_callbacks():
+    order = create_order()
+    old = PaymentCallback.objects.create(key='old', order=order, completed=True)
+    make_old(old, 'created_on', 8)
+    new = PaymentCallback.objects.create(key='new', order=order, completed=True)
+
+    assert purge_records(callback_age=timedelta(days=7)).records_purged == 1
+    assert list(PaymentCallback.objects.values_list('pk', flat=True)) == [new.pk]
+
+
+@pytest.mark.django_db
+def test_purge_old_basket_checkouts():
+    order = create_order()
+    old = BasketCheckout.objects.create(basket_key='basket', idempotency_key='old', order=order)
+    make_old(old, 'created_on', 8)
+    new = BasketCheckout.objects.create(basket_key='basket', idempotency_key='new', order=order)
+
+    assert purge_records(checkout_age=timedelta(days=7)).records_purged == 1
+    assert list(BasketCheckout.objects.values_list('pk', flat=True)) == [new.pk]
+
+
+@pytest.mark.django_db
+def test_purge_old_completed_payment_jobs():
+    order = create_order()
+    jobs = dict(
+        (status, PaymentJob.objects.create(
+            order=order, status=status, return_url='http://example.com/', cancel_url='http://example.com/'))
+        for status in PaymentJobStatus
+    )
+    for job in jobs.values():
+        make_old(job, 'modified_on', 8)
+    new = PaymentJob.objects.create(
+        order=order, status=PaymentJobStatus.SUCCEEDED, return_url='http://example.com/',
+        cancel_url='http://example.com/')
+
+    assert purge_records(payment_job_age=timedelta(days=7)).records_purged == 2
+    assert set(PaymentJob.objects.values_list('pk', flat=True)) == set([
+        jobs[PaymentJobStatus.PENDING].pk, jobs[PaymentJobStatus.RUNNING].pk, new.pk])
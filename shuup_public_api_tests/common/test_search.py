@@ -0,0 +1,85 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from shuup.core.models import Product
+from shuup.testing.factories import create_product, get_default_shop
+
+from shuup_public_api.api.product import _filters
+from shuup_public_api.common.search import rebuild_product_search_words, search_product_ids
+from shuup_public_api.common.versions import bump_search_version
+from shuup_public_api.models import ProductSearchWord
+
+
+def create_named_product(sku, name, shop):
+    product = create_product(sku, shop=shop)
+    product.name = name
+    product.save()
+    return product
+
+
+@pytest.mark.django_db
+def test_search_follows_shared_version():
+    shop = get_default_shop()
+    product = create_named_product('test-gadget', 'Gadget', shop)
+    assert search_product_ids('gad') == set([product.pk])
+    # Another process renaming the product only bumps the shared version
+    Product._parler_meta.root_model.objects.filter(master=product).update(name='Gizmo')
+    assert search_product_ids('giz') == set()
+    bump_search_version()
+    assert search_product_ids('giz') == set([product.pk])
+    assert search_product_ids('gad') == set()
+
+
+@pytest.mark.django_db
+def test_search_with_many_indexed_matches(monkeypatch):
+    monkeypatch.setattr(_filters, 'MAX_INDEXED_SEARCH_MATCHES', 1)
+    shop = get_default_shop()
+    widgets = [create_named_product('test-widget-%d' % index, 'Widget %d' % index, shop) for index in range(3)]
+    create_named_product('test-gadget', 'Gadget', shop)
+    with CaptureQueriesContext(connection) as queries:
+        assert search_shop_products(shop, 'wid') == [product.pk for product in widgets]
+    # The matches are looked up from the search words instead of being bound as a list of ids
+    assert ProductSearchWord._meta.db_table in queries[-1]['sql']
+
+
+def search_shop_products(shop, search):
+    queryset = _filters.PublicShopProductFilter().filter_search(shop.shop_products.all(), search)
+    return sorted(queryset.values_list('product_id', flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('in_process', [True, False])
+def test_search_matches_word_prefixes(settings, in_process):
+    settings.SHUUP_PUBLIC_API_IN_PROCESS_SEARCH_INDEX = in_process
+    shop = get_default_shop()
+    blue_widget = create_named_product('test-blue-widget', 'Blue Widget', shop)
+    red_widget = create_named_product('test-red-widget', 'Red widget', shop)
+    gadget = create_named_product('test-gadget', 'Gadget-widgets', shop)
+    create_named_product('test-bluewidget', 'Bluewidget', shop)
+    assert search_shop_products(shop, 'WID') == [blue_widget.pk, red_widget.pk, gadget.pk]
+    assert search_shop_products(shop, 'blue wid') == [blue_widget.pk]
+    assert search_shop_products(shop, 'idget') == []
+    assert search_shop_products(shop, '--') == []
+
+
+@pytest.mark.django_db
+def test_search_words_follow_product_changes():
+    product = create_named_product('test-gadget', 'Gadget', get_default_shop())
+    product.set_current_language('fi')
+    product.name = 'Vempain'
+    product.save()
+    assert set(ProductSearchWord.objects.values_list('product_id', 'word')) == set([
+        (product.pk, 'gadget'), (product.pk, 'vempain')])
+    product.name = 'Laite'
+    product.save()
+    assert set(ProductSearchWord.objects.values_list('word', flat=True)) == set(['gadget', 'laite'])
+
+
+@pytest.mark.django_db
+def test_rebuilding_search_words():
+    shop = get_default_shop()
+    product = create_named_product('test-gadget', 'Gadget gadget', shop)
+    Product._parler_meta.root_model.objects.filter(master=product).update(name='Gizmo Gadget')
+    assert rebuild_product_search_words(batch_size=1) == 2
+    assert set(ProductSearchWord.objects.values_list('product_id', 'word')) == set([
+        (product.pk, 'gadget'), (product.pk, 'gizmo')])
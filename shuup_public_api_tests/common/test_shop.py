@@ -0,0 +1,46 @@
+import pytest
+from shuup.core.models import Shop
+from shuup.testing.factories import get_default_shop
+
+from shuup_public_api.common.shop import get_shop_by_identifier
+from shuup_public_api.common.versions import bump_shop_version
+
+
+@pytest.mark.django_db
+def test_shop_is_looked_up_once(django_assert_num_queries):
+    shop = get_default_shop()
+    with django_assert_num_queries(1):
+        assert get_shop_by_identifier(shop.identifier) == shop
+    with django_assert_num_queries(0):
+        assert get_shop_by_identifier(shop.identifier) == shop
+
+
+@pytest.mark.django_db
+def test_shop_cache_is_cleared_on_save(django_assert_num_queries):
+    shop = get_default_shop()
+    get_shop_by_identifier(shop.identifier)
+    shop.public_name = 'Renamed'
+    shop.save()
+    with django_assert_num_queries(1):
+        assert get_shop_by_identifier(shop.identifier).public_name == 'Renamed'
+
+
+@pytest.mark.django_db
+def test_shop_cache_follows_shared_version(django_assert_num_queries):
+    shop = get_default_shop()
+    get_shop_by_identifier(shop.identifier)
+    # Another process saving the shop only bumps the shared version
+    Shop.objects.filter(pk=shop.pk).update(maintenance_mode=True)
+    bump_shop_version()
+    with django_assert_num_queries(1):
+        assert get_shop_by_identifier(shop.identifier).maintenance_mode
+
+
+@pytest.mark.django_db
+def test_shop_cache_is_cleared_on_delete(django_assert_num_queries):
+    shop = Shop.objects.create(identifier='deleted', name='Deleted', public_name='Deleted')
+    assert get_shop_by_identifier('deleted') == shop
+    shop.delete()
+    with django_assert_num_queries(1):
+        with pytest.raises(Shop.DoesNotExist):
+            get_shop_by_identifier('deleted')
@@ -0,0 +1,82 @@
+import pytest
+from shuup.core.models import MutableAddress
+from shuup.core.pricing import TaxfulPrice
+from shuup.core.taxing import TaxingContext
+from shuup.default_tax.module import DefaultTaxModule
+from shuup.testing.factories import get_default_tax, get_default_tax_class
+
+from shuup_public_api.common.tax import CachedDefaultTaxModule, get_rendered_tax_class, get_tax_groups
+from shuup_public_api.common.versions import bump_tax_version
+
+
+class CountingRenderer(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, tax_class):
+        self.calls += 1
+        return {'id': tax_class.pk, 'calls': self.calls}
+
+
+@pytest.mark.django_db
+def test_rendered_tax_class_is_cached():
+    tax_class = get_default_tax_class()
+    render = CountingRenderer()
+    assert get_rendered_tax_class(tax_class, render) == {'id': tax_class.pk, 'calls': 1}
+    assert get_rendered_tax_class(tax_class, render) == {'id': tax_class.pk, 'calls': 1}
+
+
+@pytest.mark.django_db
+def test_rendered_tax_class_cache_is_cleared_on_tax_change():
+    tax_class = get_default_tax_class()
+    render = CountingRenderer()
+    get_rendered_tax_class(tax_class, render)
+    tax = get_default_tax()
+    tax.save()
+    assert get_rendered_tax_class(tax_class, render)['calls'] == 2
+
+
+@pytest.mark.django_db
+def test_rendered_tax_class_cache_follows_shared_version():
+    tax_class = get_default_tax_class()
+    render = CountingRenderer()
+    get_rendered_tax_class(tax_class, render)
+    # Another process changing the taxes only bumps the shared version
+    bump_tax_version()
+    assert get_rendered_tax_class(tax_class, render)['calls'] == 2
+
+
+@pytest.mark.django_db
+def test_tax_groups_are_cached(django_assert_num_queries):
+    tax = get_default_tax()
+    tax_class = get_default_tax_class()
+    context = TaxingContext(location=MutableAddress(country='FI', postal_code='00100'))
+    with django_assert_num_queries(1):
+        assert get_tax_groups(context, tax_class) == [[tax]]
+    with django_assert_num_queries(0):
+        assert get_tax_groups(context, tax_class) == [[tax]]
+
+
+@pytest.mark.django_db
+def test_tax_groups_cache_is_cleared_on_tax_change():
+    tax = get_default_tax()
+    tax_class = get_default_tax_class()
+    context = TaxingContext()
+    assert get_tax_groups(context, tax_class) == [[tax]]
+    tax.enabled = False
+    tax.save()
+    assert get_tax_groups(context, tax_class) == []
+
+
+@pytest.mark.django_db
+def test_cached_default_tax_module_gives_default_taxes():
+    get_default_tax()
+    tax_class = get_default_tax_class()
+    context = TaxingContext()
+    price = TaxfulPrice(15, 'EUR')
+    cached = CachedDefaultTaxModule().get_taxed_price(context, price, tax_class)
+    default = DefaultTaxModule().get_taxed_price(context, price, tax_class)
+    assert cached.taxless == default.taxless
+    assert cached.taxful == default.taxful
+    assert [(line_tax.tax, line_tax.amount) for line_tax in cached.taxes] == [
+        (line_tax.tax, line_tax.amount) for line_tax in default.taxes]
@@ -0,0 +1,58 @@
+import pytest
+from django.db import OperationalError
+
+from shuup_public_api.common import transaction as transaction_module
+from shuup_public_api.common.transaction import run_atomic_with_retry
+
+
+@pytest.fixture
+def sleeps(monkeypatch, settings):
+    settings.SHUUP_PUBLIC_API_TRANSACTION_RETRIES = 3
+    settings.SHUUP_PUBLIC_API_TRANSACTION_RETRY_DELAY = 0.05
+    delays = []
+    monkeypatch.setattr(transaction_module.time, 'sleep', delays.append)
+    return delays
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lock_failures_are_retried_with_backoff_and_raised(sleeps):
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise OperationalError('database is locked')
+
+    with pytest.raises(OperationalError):
+        run_atomic_with_retry(fail)
+    assert len(calls) == 4
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0.05 * (2 ** attempt) / 2 <= delay <= 0.05 * (2 ** attempt)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lock_failure_is_retried_until_success(sleeps):
+    results = [OperationalError('deadlock'), 'ok']
+
+    def fail_once():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert run_atomic_with_retry(fail_once) == 'ok'
+    assert len(sleeps) == 1
+
+
+@pytest.mark.django_db
+def test_lock_failures_are_not_retried_in_an_outer_transaction(sleeps):
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise OperationalError('deadlock')
+
+    with pytest.raises(OperationalError):
+        run_atomic_with_retry(fail)
+    assert calls == [1]
+    assert sleeps == []
@@ -0,0 +1,17 @@
+"""
+Django settings for the shuup_public_api tests.
+
+The tests run against the workbench project with an in memory cache.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workbench'))
+
+from workbench.settings import *  # noqa
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -0,0 +1,87 @@
+import pytest
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from shuup.core.models import Shop
+from shuup.testing.factories import create_product, get_default_shop, get_default_supplier
+
+from shuup_public_api import metrics
+
+
+@pytest.fixture
+def metrics_enabled(settings):
+    get_default_shop()
+    settings.SHUUP_PUBLIC_API_METRICS_ENABLED = True
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+    yield
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+
+
+@pytest.mark.django_db
+def test_counted_queries_are_added_to_the_current_request():
+    metrics.count_queries(connection)
+    metrics.count_queries(connection)
+    get_default_shop()
+    metrics.start_request()
+    with CaptureQueriesContext(connection) as queries:
+        list(Shop.objects.all())
+        Shop.objects.count()
+    (stages, query_count, query_duration) = metrics.finish_request()
+    assert query_count == len(queries) == 2
+    assert query_duration > 0
+    Shop.objects.count()
+    assert metrics.finish_request() == ({}, 0, 0.0)
+
+
+@pytest.mark.django_db
+def test_middleware_records_queries_without_query_logs(metrics_enabled):
+    shop = get_default_shop()
+    create_product('test', shop=shop, supplier=get_default_supplier(), default_price=10)
+    url = reverse('public_api:products-list', kwargs={'parent_lookup_shop__identifier': shop.identifier})
+    client = APIClient()
+    for attempt in range(2):
+        assert client.get(url).status_code == 200
+        assert not connection.force_debug_cursor
+        assert len(connection.queries_log) == 0
+    values = metrics.DB_QUERIES._values[('products-list', 'GET')]
+    assert values['count'] == 2
+    assert values['sum'] > 0
+    assert metrics.REQUEST_DURATION._values[('products-list', 'GET')]['count'] == 2
+
+
+@pytest.mark.django_db
+def test_metrics_are_not_found_when_disabled(settings, client):
+    get_default_shop()
+    settings.SHUUP_PUBLIC_API_METRICS_ENABLED = False
+    settings.SHUUP_PUBLIC_API_METRICS_ALLOWED_IPS = ('127.0.0.1',)
+    assert client.get(reverse('public_api:metrics')).status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('token, allowed_ips, headers, status_code', [
+    (None, (), {}, 403),
+    ('secret', (), {}, 403),
+    ('secret', (), {'HTTP_AUTHORIZATION': 'Bearer wrong'}, 403),
+    ('secret', (), {'HTTP_AUTHORIZATION': 'Bearer secret'}, 200),
+    (None, (), {'HTTP_AUTHORIZATION': 'Bearer None'}, 403),
+    (None, ('10.0.0.1',), {'REMOTE_ADDR': '10.0.0.1'}, 200),
+    (None, ('10.0.0.1',), {'REMOTE_ADDR': '10.0.0.2'}, 403),
+])
+def test_metrics_require_token_or_allowed_ip(
+        settings, client, metrics_enabled, token, allowed_ips, headers, status_code):
+    settings.SHUUP_PUBLIC_API_METRICS_TOKEN = token
+    settings.SHUUP_PUBLIC_API_METRICS_ALLOWED_IPS = allowed_ips
+    response = client.get(reverse('public_api:metrics'), **headers)
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert b'# TYPE shuup_public_api_request_duration_seconds histogram' in response.content
+
+
+@pytest.mark.django_db
+def test_metrics_are_readable_by_staff(metrics_enabled, client, admin_user):
+    assert client.get(reverse('public_api:metrics')).status_code == 403
+    client.login(username=admin_user.username, password='password')
+    assert client.get(reverse('public_api:metrics')).status_code == 200
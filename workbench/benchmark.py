@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+"""
+Benchmark the public API routes against a synthetic catalog on SQLite.
+
+A fresh database is migrated and filled with deterministic shops,
+products (including packages and variations), tax rules, campaigns,
+baskets and orders. Every route of ``shuup_public_api.urls`` is then
+requested through the Django test client and its latency percentiles
+and query counts are written as JSON, so runs can be compared::
+
+    python benchmark.py --scale 1 --output results.json
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "workbench.settings")
+
+PRODUCTS_PER_SHOP = 200
+BASKETS_PER_SHOP = 20
+ORDERS_PER_SHOP = 5
+
+ADDRESS = {
+    "name": "Benchmark Customer",
+    "street": "Benchmark Street 1",
+    "city": "Helsinki",
+    "postal_code": "00100",
+    "country": "FI",
+}
+
+
+def setup_django(database_path):
+    import django
+    from django.conf import settings
+    settings.DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": database_path,
+        }
+    }
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ["testserver"]
+    settings.SHUUP_PUBLIC_API_METRICS_ENABLED = True
+    settings.SHUUP_PUBLIC_API_METRICS_ALLOWED_IPS = ["127.0.0.1"]
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", interactive=False, verbosity=0)
+
+    # Requests clear the query log as they start, which would hide their
+    # queries from the CaptureQueriesContext wrapped around them
+    from django.core.signals import request_started
+    from django.db import reset_queries
+    request_started.disconnect(reset_queries)
+
+
+class DataGenerator(object):
+    """
+    Generate the same synthetic data for the same seed and scale.
+    """
+
+    def __init__(self, seed, scale):
+        self.random = random.Random(seed)
+        self.scale = scale
+
+    def generate(self, shop_count):
+        from django.db import transaction
+        from shuup.core.defaults.order_statuses import create_default_order_statuses
+        from shuup.testing.factories import get_default_supplier, get_default_tax_class
+
+        self.supplier = get_default_supplier()
+        self.tax_class = get_default_tax_class()
+        shops = []
+        with transaction.atomic():
+            create_default_order_statuses()
+            self.create_tax_rules()
+            for index in range(shop_count):
+                shop = self.create_shop(index)
+                shops.append({
+                    "shop": shop,
+                    "products": self.create_products(shop, index),
+                    "payment_method": self.create_payment_method(shop, index),
+                    "shipping_method": self.create_shipping_method(shop, index),
+                })
+                self.create_campaigns(shop, index, shops[-1]["products"])
+        return shops
+
+    def create_tax_rules(self):
+        from shuup.core.models import Tax
+        from shuup.default_tax.models import TaxRule
+
+        for index, rate in enumerate(("0.24", "0.14", "0.10")):
+            tax = Tax.objects.create(code="bench-%d" % index, name="Benchmark tax %d" % index, rate=Decimal(rate))
+            rule = TaxRule.objects.create(tax=tax, priority=index)
+            rule.tax_classes.add(self.tax_class)
+
+    def create_shop(self, index):
+        from shuup.core.models import Shop, ShopStatus
+
+        return Shop.objects.create(
+            identifier="bench-shop-%d" % index,
+            name="Benchmark shop %d" % index,
+            public_name="Benchmark shop %d" % index,
+            domain="bench-shop-%d" % index,
+            currency="EUR",
+            prices_include_tax=True,
+            status=ShopStatus.ENABLED,
+        )
+
+    def create_products(self, shop, shop_index):
+        from shuup.testing.factories import create_product
+
+        words = ["red", "blue", "green", "shirt", "shoe", "hat", "bag", "lamp", "chair", "table", "cup", "pen"]
+        products = []
+        for index in range(PRODUCTS_PER_SHOP * self.scale):
+            product = create_product(
+                "bench-%d-%d" % (shop_index, index), shop=shop, supplier=self.supplier,
+                default_price=Decimal(self.random.randint(100, 10000)) / 100,
+                name=" ".join(self.random.sample(words, 3)),
+            )
+            products.append(product)
+
+        # Every 20th product is a variation parent of the next three products
+        # and every 40th product, offset by ten, a package of the next three
+        # products; the offsets keep the two sets of products disjoint.
+        for index in range(0, len(products) - 3, 20):
+            for child in products[index + 1:index + 4]:
+                child.link_to_parent(products[index])
+        for index in range(10, len(products) - 3, 40):
+            products[index].make_package(dict((child, 2) for child in products[index + 1:index + 4]))
+        return products
+
+    def create_payment_method(self, shop, index):
+        from shuup.core.models import CustomPaymentProcessor
+
+        processor = CustomPaymentProcessor.objects.create(name="Benchmark payment %d" % index)
+        return processor.create_service(
+            "manual", shop=shop, enabled=True, tax_class=self.tax_class, name="Benchmark payment %d" % index)
+
+    def create_shipping_method(self, shop, index):
+        from shuup.core.models import CustomCarrier
+
+        carrier = CustomCarrier.objects.create(name="Benchmark carrier %d" % index)
+        return carrier.create_service(
+            "manual", shop=shop, enabled=True, tax_class=self.tax_class, name="Benchmark shipping %d" % index)
+
+    def create_campaigns(self, shop, index, products):
+        from shuup.campaigns.models import BasketCampaign, CatalogCampaign, Coupon
+        from shuup.campaigns.models.basket_effects import BasketDiscountAmount
+        from shuup.campaigns.models.catalog_filters import ProductFilter
+        from shuup.campaigns.models.product_effects import ProductDiscountPercentage
+
+        catalog_campaign = CatalogCampaign.objects.create(
+            shop=shop, name="Benchmark sale %d" % index, public_name="Benchmark sale %d" % index, active=True)
+        product_filter = ProductFilter.objects.create()
+        product_filter.products.add(*self.random.sample(products, len(products) // 10))
+        catalog_campaign.filters.add(product_filter)
+        ProductDiscountPercentage.objects.create(campaign=catalog_campaign, discount_percentage=Decimal("0.1"))
+        catalog_campaign.save()
+
+        coupon = Coupon.objects.create(code="BENCH%d" % index, active=True)
+        basket_campaign = BasketCampaign.objects.create(
+            shop=shop, name="Benchmark coupon %d" % index, public_name="Benchmark coupon %d" % index,
+            active=True, coupon=coupon)
+        BasketDiscountAmount.objects.create(campaign=basket_campaign, discount_amount=Decimal(5))
+
+
+class Benchmark(object):
+    def __init__(self, shops, iterations, seed):
+        from django.test import Client
+        self.client = Client()
+        self.shops = shops
+        self.iterations = iterations
+        self.random = random.Random(seed)
+        self.results = {}
+
+    def url(self, name, shop, **kwargs):
+        from django.core.urlresolvers import reverse
+        kwargs["parent_lookup_shop__identifier"] = shop.identifier
+        return reverse("public_api:%s" % name, kwargs=kwargs)
+
+    def request(self, method, path, data=None, headers=None):
+        from django.db import connection, reset_queries
+        from django.test.utils import CaptureQueriesContext
+
+        kwargs = dict((("HTTP_%s" % key.upper().replace("-", "_")), value) for key, value in (headers or {}).items())
+        # The query log is bounded, so it is emptied before it fills up
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            try:
+                if method == "get":
+                    response = self.client.get(path, **kwargs)
+                else:
+                    response = getattr(self.client, method)(
+                        path, data=(json.dumps(data) if data is not None else ""),
+                        content_type="application/json", **kwargs)
+                if getattr(response, "streaming", False):
+                    for chunk in response.streaming_content:
+                        pass
+                status = response.status_code
+            except Exception as exc:  # The test client re-raises the exceptions of views
+                response = None
+                status = type(exc).__name__
+            duration = time.time() - start
+        return (response, status, duration, len(queries))
+
+    def measure(self, name, method, get_path, get_data=None, headers=None):
+        """
+        Request a route the configured number of times and record its latencies and query counts.
+        """
+        durations = []
+        query_counts = []
+        statuses = {}
+        response = None
+        for iteration in range(self.iterations):
+            (response, status, duration, query_count) = self.request(
+                method, get_path(), (get_data() if get_data else None), headers)
+            durations.append(duration)
+            query_counts.append(query_count)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        self.results[name] = summarize(durations, query_counts, statuses)
+        return response
+
+    def create_basket(self, shop_data, line_count=3):
+        shop = shop_data["shop"]
+        (response, status, duration, query_count) = self.request("post", self.url("baskets-list", shop), {})
+        key = json.loads(response.content.decode("utf-8"))["key"]
+        for product in self.random.sample(shop_data["products"], line_count):
+            self.request("post", self.url("basket_lines-list", shop, parent_lookup_basket__key=key), {
+                "product": product.pk, "quantity": self.random.randint(1, 3)})
+        return key
+
+    def checkout(self, shop_data, key, headers=None):
+        return self.request("post", self.url("baskets-checkout", shop_data["shop"], key=key), {
+            "payment_method": shop_data["payment_method"].pk,
+            "shipping_method": shop_data["shipping_method"].pk,
+            "shipping_address": ADDRESS,
+            "billing_address": ADDRESS,
+        }, headers)
+
+    def run(self):
+        from django.core.urlresolvers import reverse
+        from django.test.utils import override_settings
+        from shuup.core.models import Order
+
+        shop_data = self.shops[0]
+        shop = shop_data["shop"]
+        products = shop_data["products"]
+        for other_shop_data in self.shops:
+            for index in range(BASKETS_PER_SHOP):
+                self.create_basket(other_shop_data)
+            for index in range(ORDERS_PER_SHOP):
+                self.checkout(other_shop_data, self.create_basket(other_shop_data))
+
+        self.measure("shops-detail", "get", lambda: reverse("public_api:shops-detail", kwargs={
+            "identifier": shop.identifier}))
+        self.measure("payment_methods-list", "get", lambda: self.url("payment_methods-list", shop))
+        self.measure("shipping_methods-list", "get", lambda: self.url("shipping_methods-list", shop))
+        self.measure("products-list", "get", lambda: self.url("products-list", shop))
+        self.measure("products-list-cursor", "get", lambda: self.url("products-list", shop) + "?pagination=cursor")
+        self.measure("products-list-search", "get", lambda: self.url("products-list", shop) + "?search=red+shirt")
+        self.measure("products-list-filter", "get", lambda: (
+            self.url("products-list", shop) + "?price_min=10&price_max=50"))
+        self.measure("products-detail", "get", lambda: self.url(
+            "products-detail", shop, pk=self.random.choice(products).get_shop_instance(shop).pk))
+        self.measure("products-export", "get", lambda: self.url("products-export-list", shop))
+
+        self.measure("baskets-create", "post", lambda: self.url("baskets-list", shop), lambda: {})
+        key = self.create_basket(shop_data, line_count=5)
+        self.measure("baskets-detail", "get", lambda: self.url("baskets-detail", shop, key=key))
+
+        # Every request of the basket mutations gets a basket of its own,
+        # so their baskets don't grow or shrink over the iterations.
+        for (suffix, line_count) in (("", 5), ("-25-lines", 25)):
+            keys = iter(self.create_baskets(shop_data, line_count))
+            self.measure("basket_lines-create%s" % suffix, "post", lambda: self.url(
+                "basket_lines-list", shop, parent_lookup_basket__key=next(keys)
+            ), lambda: {"product": self.random.choice(products).pk, "quantity": 1})
+        line_id = self.get_basket(shop, key)["lines"][0]["line_id"]
+        self.measure("basket_lines-partial_update", "patch", lambda: self.url(
+            "basket_lines-detail", shop, parent_lookup_basket__key=key, line_id=line_id
+        ), lambda: {"quantity": self.random.randint(1, 5)})
+        discount_keys = self.create_baskets(shop_data, 5)
+        keys = iter(discount_keys)
+        self.measure("baskets-add_discount", "post", lambda: self.url(
+            "baskets-add-discount", shop, key=next(keys)), lambda: {"code": "BENCH0"})
+        keys = iter(discount_keys)
+        self.measure("baskets-remove_discount", "post", lambda: self.url(
+            "baskets-remove-discount", shop, key=next(keys)), lambda: {"code": "BENCH0"})
+        keys = iter(self.create_baskets(shop_data, 5))
+        self.measure("basket_lines-destroy", "delete", lambda: self.get_last_line_url(shop, next(keys)))
+
+        checkout_keys = iter(self.create_baskets(shop_data, 3))
+        self.measure("baskets-checkout", "post", lambda: self.url(
+            "baskets-checkout", shop, key=next(checkout_keys)
+        ), lambda: {
+            "payment_method": shop_data["payment_method"].pk,
+            "shipping_method": shop_data["shipping_method"].pk,
+            "shipping_address": ADDRESS,
+            "billing_address": ADDRESS,
+        })
+
+        order = Order.objects.filter(shop=shop).order_by("-pk").first()
+        self.measure("orders-detail", "get", lambda: self.url("orders-detail", shop, key=order.key))
+        payment_kwargs = {"parent_lookup_order__key": order.key}
+        self.measure("payments-list", "get", lambda: self.url("payments-list", shop, **payment_kwargs))
+        self.measure("payments-create", "post", lambda: self.url("payments-list", shop, **payment_kwargs), lambda: {})
+        self.measure("payments-callback", "post", lambda: self.url(
+            "payments-callback-list", shop, **payment_kwargs), lambda: {"transaction": uuid.uuid4().hex})
+        # Not implemented, it always responds with 500
+        self.measure("payments-cancel", "post", lambda: self.url("payments-cancel-list", shop, **payment_kwargs))
+        payment = order.create_payment(order.taxful_total_price, payment_identifier="bench-%s" % order.key)
+        self.measure("payments-detail", "get", lambda: self.url(
+            "payments-detail", shop, identifier=payment.payment_identifier, **payment_kwargs))
+
+        # Payment jobs only exist with asynchronous payment initiation
+        with override_settings(SHUUP_PUBLIC_API_ASYNC_PAYMENT_INITIATION=True):
+            response = self.measure("payments-create-async", "post", lambda: self.url(
+                "payments-list", shop, **payment_kwargs), lambda: {})
+            job_id = json.loads(response.content.decode("utf-8"))["id"]
+            self.measure("payment_jobs-detail", "get", lambda: self.url(
+                "payment_jobs-detail", shop, pk=job_id, **payment_kwargs))
+        self.measure("metrics", "get", lambda: reverse("public_api:metrics"))
+        return self.results
+
+    def create_baskets(self, shop_data, line_count):
+        return [self.create_basket(shop_data, line_count) for index in range(self.iterations)]
+
+    def get_basket(self, shop, key):
+        response = self.client.get(self.url("baskets-detail", shop, key=key))
+        return json.loads(response.content.decode("utf-8"))
+
+    def get_last_line_url(self, shop, key):
+        return self.url("basket_lines-detail", shop, parent_lookup_basket__key=key,
+                        line_id=self.get_basket(shop, key)["lines"][-1]["line_id"])
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def summarize(durations, query_counts, statuses):
+    return {
+        "requests": len(durations),
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+        "max_ms": round(max(durations) * 1000, 3),
+        "queries_p50": percentile(query_counts, 50),
+        "queries_max": max(query_counts),
+        "statuses": statuses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="Scale factor of the generated data.")
+    parser.add_argument("--shops", type=int, default=2, help="Number of shops generated.")
+    parser.add_argument("--iterations", type=int, default=20, help="Requests per route.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the generated data and requests.")
+    parser.add_argument("--database", default=None, help="SQLite database file, a temporary one by default.")
+    parser.add_argument("--output", default=None, help="File the JSON results are written to.")
+    args = parser.parse_args(argv)
+
+    database_path = args.database or os.path.join(tempfile.mkdtemp(prefix="shuup_public_api_bench_"), "db.sqlite3")
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    start = time.time()
+    setup_django(database_path)
+    shops = DataGenerator(args.seed, args.scale).generate(args.shops)
+    setup_duration = time.time() - start
+
+    import django
+    results = {
+        "meta": {
+            "scale": args.scale,
+            "shops": args.shops,
+            "products_per_shop": PRODUCTS_PER_SHOP * args.scale,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "started_on": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+            "setup_seconds": round(setup_duration, 3),
+        },
+        "routes": Benchmark(shops, args.iterations, args.seed).run(),
+    }
+
+    print("%-32s %10s %10s %10s %8s" % ("route", "p50 ms", "p95 ms", "max ms", "queries"))
+    for name, result in sorted(results["routes"].items()):
+        print("%-32s %10.2f %10.2f %10.2f %8s" % (
+            name, result["p50_ms"], result["p95_ms"], result["max_ms"], result["queries_p50"]))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
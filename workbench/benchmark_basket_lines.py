@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Benchmark the basket line lookups for baskets of 10, 100 and 1000 lines.
+
+The indexed lookup, coalescing and replacement of ``BasketLineIndex``
+are compared with the linear scans of shuup's basket, on plain line
+data without a database::
+
+    python benchmark_basket_lines.py --sizes 10 100 1000
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import six
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "workbench.settings")
+
+
+def make_lines(size):
+    return [
+        {
+            "line_id": "line-%d" % index,
+            "product_id": index,
+            "supplier_id": 1,
+            "shop_id": 1,
+            "quantity": 1,
+        }
+        for index in range(size)
+    ]
+
+
+def find_line_linear(lines, line_id):
+    for line in lines:
+        if six.text_type(line.get("line_id")) == six.text_type(line_id):
+            return line
+
+
+def find_product_line_linear(lines, product_id, supplier_id, shop_id):
+    for line in lines:
+        if (line.get("product_id"), line.get("supplier_id"), line.get("shop_id")) == (
+                product_id, supplier_id, shop_id):
+            return line
+
+
+def replace_line_linear(lines, line):
+    line_ids = [x["line_id"] for x in lines]
+    index = line_ids.index(line["line_id"])
+    lines = [x for x in lines if x["line_id"] != line["line_id"]]
+    lines.insert(index, line)
+    return list(lines)
+
+
+def measure(statement, number):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def run(sizes, number):
+    from shuup_public_api.common.basket import BasketLineIndex
+
+    results = {}
+    for size in sizes:
+        lines = make_lines(size)
+        index = BasketLineIndex(lines)
+        last = lines[-1]
+        replacement = dict(last, quantity=2)
+        results[size] = {
+            "build_index_us": measure(lambda: BasketLineIndex(list(lines)), number),
+            "find_line_indexed_us": measure(lambda: index.get(last["line_id"]), number),
+            "find_line_linear_us": measure(lambda: find_line_linear(lines, last["line_id"]), number),
+            "coalesce_indexed_us": measure(lambda: index.get_product_lines(last["product_id"], 1, 1), number),
+            "coalesce_linear_us": measure(lambda: find_product_line_linear(lines, last["product_id"], 1, 1), number),
+            "replace_indexed_us": measure(lambda: index.add_or_replace(replacement), number),
+            "replace_linear_us": measure(lambda: replace_line_linear(lines, replacement), number),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Numbers of basket lines.")
+    parser.add_argument("--number", type=int, default=1000, help="Executions per measurement.")
+    parser.add_argument("--output", default=None, help="File the JSON results are written to.")
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    results = run(args.sizes, args.number)
+
+    print("%-8s %-12s %12s %12s" % ("lines", "operation", "indexed us", "linear us"))
+    for size in args.sizes:
+        for operation in ("find_line", "coalesce", "replace"):
+            print("%-8d %-12s %12.2f %12.2f" % (
+                size, operation, results[size]["%s_indexed_us" % operation],
+                results[size]["%s_linear_us" % operation]))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
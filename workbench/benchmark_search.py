@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Benchmark the product listing search and filters of the public API on 100k products.
+
+A fresh SQLite database is filled with generated products in bulk. The
+first keyset page of the product listing, with its total count, is then
+requested through the Django test client with searches and category,
+SKU and price filters, and its latency percentiles and query counts are
+written as JSON. Searches are measured from the in-process name index
+and from the indexed name words in the database::
+
+    python benchmark_search.py --products 100000 --output results.json
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from benchmark import Benchmark, setup_django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "workbench.settings")
+
+BATCH_SIZE = 500
+CATEGORY_COUNT = 20
+
+COLORS = ["red", "blue", "green", "black", "white", "yellow", "purple", "orange"]
+NOUNS = ["widget", "gadget", "gizmo", "sprocket", "bracket", "lever", "valve", "spring"]
+
+SEARCHES = [
+    ("search-many", "search=widget"),
+    ("search-prefix", "search=wid"),
+    ("search-two-words", "search=blue+widget"),
+    ("search-none", "search=zzz"),
+]
+
+
+class DisableMigrations(object):
+    """
+    Create the tables right from the models, as migrating a fresh database takes minutes.
+    """
+
+    def __contains__(self, app_label):
+        return True
+
+    def __getitem__(self, app_label):
+        return "notmigrations"
+
+
+def generate(count, seed):
+    """
+    Generate a shop with the given number of products, bypassing the model signals.
+    """
+    from django.db import transaction
+    from shuup.core.models import Category, Product, Shop, ShopProduct, ShopStatus
+    from shuup.testing.factories import get_default_product_type, get_default_sales_unit, get_default_tax_class
+    from shuup_public_api.common.search import rebuild_product_search_words
+
+    rng = random.Random(seed)
+    ProductTranslation = Product._parler_meta.root_model
+    ShopProductCategory = ShopProduct.categories.through
+    with transaction.atomic():
+        shop = Shop.objects.create(
+            identifier="bench-search", name="Benchmark search", public_name="Benchmark search",
+            currency="EUR", prices_include_tax=True, status=ShopStatus.ENABLED)
+        categories = [
+            Category.objects.create(identifier="bench-%d" % index, name="Category %d" % index)
+            for index in range(CATEGORY_COUNT)
+        ]
+        (product_type, sales_unit, tax_class) = (
+            get_default_product_type(), get_default_sales_unit(), get_default_tax_class())
+        for start in range(1, count + 1, BATCH_SIZE):
+            product_ids = range(start, min(start + BATCH_SIZE, count + 1))
+            category_ids = dict((product_id, rng.choice(categories).pk) for product_id in product_ids)
+            Product.objects.bulk_create([
+                Product(id=product_id, sku="bench-%d" % product_id, type=product_type, sales_unit=sales_unit,
+                        tax_class=tax_class)
+                for product_id in product_ids
+            ])
+            ProductTranslation.objects.bulk_create([
+                ProductTranslation(master_id=product_id, language_code="en", name="%s %s %s-%d" % (
+                    rng.choice(COLORS), rng.choice(NOUNS), rng.choice(NOUNS), product_id))
+                for product_id in product_ids
+            ])
+            ShopProduct.objects.bulk_create([
+                ShopProduct(id=product_id, shop=shop, product_id=product_id,
+                            primary_category_id=category_ids[product_id],
+                            default_price_value=Decimal(rng.randint(100, 10000)) / 100)
+                for product_id in product_ids
+            ])
+            ShopProductCategory.objects.bulk_create([
+                ShopProductCategory(shopproduct_id=product_id, category_id=category_ids[product_id])
+                for product_id in product_ids
+            ])
+        rebuild_product_search_words()
+    return (shop, categories)
+
+
+def run(shop, categories, count, iterations, seed):
+    from django.conf import settings
+    from shuup_public_api.common.search import clear_product_search_index, search_product_ids
+
+    rng = random.Random(seed)
+    benchmark = Benchmark([], iterations, seed)
+    url = benchmark.url("products-list", shop) + "?pagination=cursor&count=true"
+    filters = [
+        ("category", lambda: "category=%d" % rng.choice(categories).pk),
+        ("sku", lambda: "sku=%s" % ",".join("bench-%d" % rng.randint(1, count) for index in range(5))),
+        ("price", lambda: "price_min=10&price_max=20"),
+        ("search-category-price", lambda: "search=blue&category=%d&price_max=50" % rng.choice(categories).pk),
+    ]
+
+    def measure(name, get_query):
+        response = benchmark.measure(name, "get", lambda: "%s&%s" % (url, get_query()))
+        benchmark.results[name]["matches"] = json.loads(response.content.decode("utf-8"))["count"]
+
+    for (name, get_query) in filters:
+        measure(name, get_query)
+
+    results = {}
+    for (mode, in_process) in (("in_process", True), ("database", False)):
+        settings.SHUUP_PUBLIC_API_IN_PROCESS_SEARCH_INDEX = in_process
+        if in_process:
+            clear_product_search_index()
+            start = time.time()
+            search_product_ids("")
+            results["build_index_ms"] = round((time.time() - start) * 1000, 3)
+        for (name, query) in SEARCHES:
+            measure("%s-%s" % (name, mode), lambda: query)
+    settings.SHUUP_PUBLIC_API_IN_PROCESS_SEARCH_INDEX = None
+    results["routes"] = benchmark.results
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000, help="Number of products.")
+    parser.add_argument("--iterations", type=int, default=20, help="Requests per measurement.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated data and requests.")
+    parser.add_argument("--database", default=None, help="SQLite database file, a temporary one by default.")
+    parser.add_argument("--output", default=None, help="File the JSON results are written to.")
+    args = parser.parse_args(argv)
+
+    database_path = args.database or os.path.join(tempfile.mkdtemp(prefix="shuup_public_api_bench_"), "db.sqlite3")
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    start = time.time()
+    from django.conf import settings
+    settings.MIGRATION_MODULES = DisableMigrations()
+    setup_django(database_path)
+    (shop, categories) = generate(args.products, args.seed)
+    setup_duration = time.time() - start
+
+    import django
+    results = run(shop, categories, args.products, args.iterations, args.seed)
+    results["meta"] = {
+        "products": args.products,
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "started_on": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+        "setup_seconds": round(setup_duration, 3),
+    }
+
+    print("build in-process index: %.1f ms" % results["build_index_ms"])
+    print("%-34s %10s %10s %8s %8s" % ("request", "p50 ms", "p95 ms", "queries", "matches"))
+    for name, result in sorted(results["routes"].items()):
+        print("%-34s %10.2f %10.2f %8s %8s" % (
+            name, result["p50_ms"], result["p95_ms"], result["queries_p50"], result.get("matches", "")))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
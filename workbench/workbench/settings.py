@@ -96,6 +96,7 @@ MIDDLEWARE_CLASSES = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'shuup.front.middleware.ProblemMiddleware',
     'shuup.front.middleware.ShuupFrontMiddleware',
+    'shuup_public_api.middleware.PublicAPIMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'workbench.urls'